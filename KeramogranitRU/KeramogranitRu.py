@@ -1,285 +1,278 @@
-import requests
-from bs4 import BeautifulSoup
-import json
 from datetime import datetime
 import time
 import os
+import sys
 import asyncio
-import aiohttp
+from concurrent.futures import ProcessPoolExecutor
 
 start_time = time.time()
 
 # Определяем директорию скрипта
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+# Общие модули (scraper_core) лежат в корне репозитория
+sys.path.insert(0, os.path.dirname(SCRIPT_DIR))
+from scraper_core.async_writer import AsyncWriter
+from scraper_core.concurrency import AimdLimiter
+from scraper_core.durability import DurabilityPolicy
+from scraper_core.failures import FailureLedger
+from scraper_core.html_archive import open_archive
+from scraper_core.http_cache import open_cache
+from scraper_core.retry import RetryPolicy
+from scraper_core.fetch_engine import FetchEngine, HostBudget, host_of
+from scraper_core.http_session import HttpSettings
+from scraper_core.storage import open_storage
+from scraper_core.work_queue import WorkQueue
+from KeramogranitRu_parser import parse_catalog_page, parse_page, parse_pages_count
 cur_data_file = datetime.now().strftime("%m.%Y")
 
+# Политика сохранения карточек: запись каждые N карточек и/или каждые T секунд.
+# Запись идёт в фоновом потоке, загрузка страниц диска не ждёт.
+# Например, DurabilityPolicy(every_records=50, every_seconds=10) — реже fsync, быстрее на HDD
+DURABILITY = DurabilityPolicy(every_records=1, fsync=True)
+
+# Хранилище карточек: 'journal' (JSON + журнал .jsonl) или 'sqlite' (база магазина в режиме WAL).
+# В обоих случаях в конце прохода формируется data_MM.YYYY_*.json для Main_scraping_Russia.py
+STORAGE_BACKEND = 'journal'
+STORAGE_DB = os.path.join(SCRIPT_DIR, 'KeramogranitRu.sqlite3')
+# Снимки данных каждые 1000 карточек и в конце прохода; хранятся последние N.
+# Восстановление: python -m scraper_core restore <data_MM.YYYY_*.json> [имя снимка]
+SNAPSHOTS_KEEP = 5
+# Архив исходного HTML карточек и страниц каталога (сжатый, с дедупликацией) для повторного разбора
+# и локального стенда (python -m scraper_core bench) без загрузки сайта. None — выключен, например: os.path.join(SCRIPT_DIR, 'html_archive')
+HTML_ARCHIVE_DIR = None
+html_archive = open_archive(HTML_ARCHIVE_DIR)
+# Кеш страниц для условных запросов: если сайт прислал ETag/Last-Modified, следующая загрузка
+# идёт с If-None-Match/If-Modified-Since и неизменившаяся страница (304) берётся с диска.
+# None — выключен. Каталог создаётся при первой записи; сверх HTTP_CACHE_MAX_MB (сжатые страницы)
+# удаляются давно не использованные страницы
+HTTP_CACHE_DIR = os.path.join(SCRIPT_DIR, 'http_cache')
+HTTP_CACHE_MAX_MB = 500
+http_cache = open_cache(HTTP_CACHE_DIR, max_bytes=HTTP_CACHE_MAX_MB * 1024 * 1024)
+
 # Настройки для асинхронных запросов
-CONCURRENT_REQUESTS = 6  # Количество одновременных запросов
+# Число одновременных запросов подбирается само (AIMD): растёт, пока сайт отвечает быстро,
+# и уменьшается вдвое при таймаутах, 429/5xx и росте задержки. Окно общее для всех этапов
+CONCURRENCY = AimdLimiter(initial=6, min_limit=1, max_limit=24)
+# Бюджет частоты запросов к сайту (token bucket): в среднем не больше RATE_LIMIT запросов в секунду
+# и не больше RATE_BURST подряд после паузы. None — частоту ограничивает только окно CONCURRENCY
+RATE_LIMIT = None
+RATE_BURST = None
 REQUEST_TIMEOUT = 30  # Таймаут запроса в секундах
+# Таймауты, обрывы соединения, 429 и 5xx повторяются сразу с экспоненциальной паузой и разбросом:
+# до max_attempts попыток на URL и не больше run_budget повторов за запуск. Повторный проход
+# остаётся только для того, что не загрузилось и после этого
+RETRY = RetryPolicy(max_attempts=4, base_delay=1.0, max_delay=30.0, run_budget=2000)
+# Одна HTTP-сессия на весь запуск: пул соединений с keep-alive (limit_per_host — не меньше
+# максимального окна запросов), кеш DNS на dns_ttl секунд, сжатые ответы
+HTTP_SETTINGS = HttpSettings(limit_per_host=CONCURRENCY.max_limit, keepalive_timeout=60, dns_ttl=600,
+                             total_timeout=REQUEST_TIMEOUT)
+# Ссылки на товары идут в обработку сразу по мере разбора страниц каталога (один конвейер).
+# URL_LIST_OUTPUT — дополнительно записывать их в url_list_*.txt (для get_data() без сбора каталога)
+URL_LIST_OUTPUT = True
+# Разбор HTML (lxml, см. KeramogranitRu_parser.py) идёт в пуле процессов, цикл asyncio только
+# загружает страницы. Извлечение полей держит GIL, поэтому процессы, а не потоки. None — по числу ядер
+PARSE_WORKERS = None
+
+# Каталог плитки (страницы — ?p=N)
+CATALOG_URL = 'https://www.keramogranit.ru/catalog-products/keramicheskaya-plitka/'
 
 headers = {
     "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/118.0.0.0 Safari/537.36"
 }
 
 
-def load_existing_data():
-    """Загружает существующие данные из JSON файла текущего месяца"""
+def open_data_storage():
+    """Открывает хранилище карточек текущего месяца (журнал или SQLite, см. STORAGE_BACKEND)"""
     file_name = f"data_{cur_data_file}_KeramogranitRu.json"
-    file_path = os.path.join(SCRIPT_DIR, file_name)
-
-    if os.path.exists(file_path):
-        try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-            print(f"✓ Загружен существующий файл: {file_name}")
-            print(f"✓ Найдено записей: {len(data)}")
-            return data
-        except Exception as e:
-            print(f"⚠ Ошибка при чтении файла: {e}")
-            return []
+    storage = open_storage(os.path.join(SCRIPT_DIR, file_name), STORAGE_BACKEND,
+                           db_path=STORAGE_DB, policy=DURABILITY)
+
+    if storage.exists():
+        print(f"✓ Загружен существующий файл: {file_name}")
+        print(f"✓ Найдено записей: {storage.count()}")
     else:
         print(f"Файл {file_name} не найден, начинаем с нуля")
-        return []
+    return storage
 
 
-def get_processed_urls(existing_data):
-    """Извлекает список уже обработанных URL из существующих данных"""
-    processed = set()
-    for item in existing_data:
-        if 'Ссылка' in item and item['Ссылка']:
-            processed.add(item['Ссылка'])
+def get_processed_urls(storage):
+    """Извлекает список уже обработанных URL из хранилища"""
+    processed = storage.processed_urls()
     print(f"✓ Уже обработано URL: {len(processed)}")
     return processed
 
 
-def save_data_incrementally(data_dict, file_path):
-    """Сохраняет данные после каждой обработанной карточки с принудительной записью на диск"""
-    try:
-        # Сначала записываем во временный файл
-        temp_file = file_path + '.tmp'
-        with open(temp_file, 'w', encoding="utf-8") as json_file:
-            json.dump(data_dict, json_file, indent=4, ensure_ascii=False)
-            json_file.flush()  # Принудительно сбрасываем буфер Python
-            os.fsync(json_file.fileno())  # Принудительно записываем на диск (OS level)
-
-        # Атомарная замена: если запись успешна, заменяем основной файл
-        if os.path.exists(file_path):
-            os.replace(temp_file, file_path)
-        else:
-            os.rename(temp_file, file_path)
+def archive_page(url, content, file_path, kind='product'):
+    """Сохраняет исходный HTML карточки или страницы каталога в архив (если задан HTML_ARCHIVE_DIR)"""
+    if html_archive is not None:
+        html_archive.put(url, content, dataset=os.path.basename(file_path), kind=kind)
+
 
+def save_snapshot(storage):
+    """Снимок данных (жёсткие ссылки, хранятся SNAPSHOTS_KEEP последних поколений)"""
+    try:
+        path = storage.snapshot(keep=SNAPSHOTS_KEEP)
+        print(f"💾 Снимок данных: {storage.count()} записей ({os.path.basename(path)})")
     except Exception as e:
-        print(f"✗ Ошибка при сохранении: {e}")
-        # Удаляем временный файл в случае ошибки
-        if os.path.exists(temp_file):
-            try:
-                os.remove(temp_file)
-            except:
-                pass
+        print(f"⚠ Ошибка создания снимка: {e}")
 
 
-def save_backup_copy(data_dict, file_path):
-    """Создает резервную копию, которая перезаписывается при каждом вызове"""
-    try:
-        backup_path = file_path.replace('.json', '_BACKUP.json')
-        temp_backup = backup_path + '.tmp'
+def open_parse_pool():
+    """Пул процессов для разбора страниц"""
+    return ProcessPoolExecutor(max_workers=PARSE_WORKERS)
 
-        with open(temp_backup, 'w', encoding="utf-8") as json_file:
-            json.dump(data_dict, json_file, indent=4, ensure_ascii=False)
-            json_file.flush()
-            os.fsync(json_file.fileno())
 
-        # Заменяем старую резервную копию новой
-        if os.path.exists(backup_path):
-            os.replace(temp_backup, backup_path)
-        else:
-            os.rename(temp_backup, backup_path)
+async def parse_in_pool(parse_pool, func, *args):
+    """Выполняет функцию разбора в пуле, не блокируя загрузку остальных страниц"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(parse_pool, func, *args)
 
-        print(f"💾 Резервная копия обновлена: {len(data_dict)} записей")
 
-    except Exception as e:
-        print(f"⚠ Ошибка создания резервной копии: {e}")
-        if os.path.exists(temp_backup):
-            try:
-                os.remove(temp_backup)
-            except:
-                pass
+def open_engine(resolve=None):
+    """Движок загрузки: HTTP-сессия, бюджет сайта, повторы и кеш (см. scraper_core/fetch_engine.py)"""
+    budget = HostBudget(rate=RATE_LIMIT, burst=RATE_BURST, limiter=CONCURRENCY)
+    return FetchEngine(HTTP_SETTINGS, headers, hosts={host_of(CATALOG_URL): budget},
+                       retry=RETRY, cache=http_cache, resolve=resolve)
 
 
-def save_broken_urls(break_line):
-    """Сохраняет сломанные ссылки в файл"""
-    if break_line:
-        file_path = os.path.join(SCRIPT_DIR, f'url_break_list_{cur_data_file}_KeramogranitRu.txt')
-        with open(file_path, 'w', encoding='utf-8') as file:
-            for url in break_line:
-                file.write(f'{url}\n')
+async def with_http(phase, resolve=None):
+    """Запускает этап (сбор ссылок, основной или повторный проход) с движком загрузки и пулом разбора.
+    resolve — перенаправление запросов (локальный стенд, python -m scraper_core bench)"""
+    with open_parse_pool() as parse_pool:
+        async with open_engine(resolve) as engine:
+            try:
+                return await phase(engine, parse_pool)
+            finally:
+                engine.print_summary()
 
 
-async def fetch_page_async(session, url, page_num=None, total_pages=None):
-    """Асинхронная загрузка страницы"""
+async def fetch_page_async(engine, url, page_num=None, total_pages=None, raise_errors=False):
+    """Асинхронная загрузка страницы с повтором временных ошибок (raise_errors — пробросить последнюю)"""
     try:
-        async with session.get(url, headers=headers, timeout=aiohttp.ClientTimeout(total=REQUEST_TIMEOUT)) as response:
-            if page_num:
-                print(f'Обработал {page_num} из {total_pages} страниц')
-            return await response.text()
+        html = await engine.fetch(url)
+        if page_num:
+            print(f'Обработал {page_num} из {total_pages} страниц')
+        return html
     except Exception as e:
         print(f"✗ Ошибка загрузки {url}: {str(e)[:50]}")
+        if raise_errors:
+            raise
         return None
 
 
-async def get_url_tile_async():
-    """Асинхронный сбор ссылок на товары"""
-    url = 'https://www.keramogranit.ru/catalog-products/keramicheskaya-plitka/'
+def url_list_path():
+    return os.path.join(SCRIPT_DIR, f'url_list_{cur_data_file}_KeramogranitRu.txt')
 
-    # Получаем количество страниц
-    q = requests.get(url=url, headers=headers)
-    result = q.content
-    soup = BeautifulSoup(result, 'lxml')
 
-    pages_counts = int(soup.find_all('a', class_='pager__link')[-1].text)
+async def discover_catalog_async(engine, parse_pool, on_url=None, save_list=True):
+    """Обходит страницы каталога; для каждой новой ссылки на товар вызывает await on_url(url)"""
+    # Получаем количество страниц (через ту же сессию, соединение потом переиспользуется)
+    html = await fetch_page_async(engine, CATALOG_URL, raise_errors=True)
+    await asyncio.to_thread(archive_page, CATALOG_URL, html, url_list_path(), 'catalog')
+    pages_counts = parse_pages_count(html)
     print(f"Всего страниц для сбора: {pages_counts}")
 
-    url_list = []
-
-    # Создаем асинхронную сессию
-    async with aiohttp.ClientSession() as session:
-        # Создаем задачи для всех страниц
-        tasks = []
-        for i in range(1, pages_counts + 1):
-            page_url = f'https://www.keramogranit.ru/catalog-products/keramicheskaya-plitka/?p={i}'
-            tasks.append(fetch_page_async(session, page_url, i, pages_counts))
-
-        # Выполняем все запросы параллельно с ограничением
-        semaphore = asyncio.Semaphore(CONCURRENT_REQUESTS)
+    # Ссылки пишутся в файл по мере сбора, страницы каталога в памяти не копятся
+    url_set = set()
+    file = open(url_list_path(), 'w', encoding='utf-8') if save_list else None
 
-        async def fetch_with_semaphore(task):
-            async with semaphore:
-                return await task
+    async def process_catalog_page(page_num):
+        page_url = f'{CATALOG_URL}?p={page_num}'
+        html = await fetch_page_async(engine, page_url, page_num, pages_counts)
+        if not html:
+            return
+        await asyncio.to_thread(archive_page, page_url, html, url_list_path(), 'catalog')
+        # Страница разбирается в пуле процессов, воркер тем временем не занимает цикл
+        for product_url in await parse_in_pool(parse_pool, parse_catalog_page, html):
+            if product_url in url_set:
+                continue
+            url_set.add(product_url)
+            if file is not None:
+                file.write(f'{product_url}\n')
+            if on_url is not None:
+                await on_url(product_url)
 
-        results = await asyncio.gather(*[fetch_with_semaphore(task) for task in tasks])
+    try:
+        # Ограниченная очередь страниц; одновременные запросы ограничивает CONCURRENCY
+        queue = WorkQueue(process_catalog_page, workers=CONCURRENCY.max_limit)
+        await queue.run(range(1, pages_counts + 1))
+    finally:
+        if file is not None:
+            file.close()
 
-        # Обрабатываем результаты
-        for html in results:
-            if html:
-                soup = BeautifulSoup(html, 'lxml')
-                pages = soup.find_all('div', class_='cat-card__desc')
-                for page in pages:
-                    try:
-                        page_url = "https://www.keramogranit.ru" + page.find('a', class_='cat-card__title-link').get('href')
-                        if 'менеджеров' not in page.find('div', class_='cat-card__price').text.strip():
-                            url_list.append(page_url)
-                    except:
-                        pass
+    print(f"✓ Собрано уникальных ссылок: {len(url_set)}")
+    return url_set
 
-    url_list = list(set(url_list))
-    url_file_path = os.path.join(SCRIPT_DIR, f'url_list_{cur_data_file}_KeramogranitRu.txt')
-    with open(url_file_path, 'w', encoding='utf-8') as file:
-        for line in url_list:
-            file.write(f'{line}\n')
 
-    print(f"✓ Собрано уникальных ссылок: {len(url_list)}")
+async def get_url_tile_async(engine, parse_pool):
+    """Асинхронный сбор ссылок на товары (только файл url_list_*.txt)"""
+    await discover_catalog_async(engine, parse_pool)
 
 
 def get_url_tile():
     """Синхронная обертка для асинхронной функции"""
-    asyncio.run(get_url_tile_async())
+    asyncio.run(with_http(get_url_tile_async))
 
 
-async def process_product_async(session, url, data_dict, break_line, lock, file_path, idx, total):
+def save_card(storage, failures, url, html, card, idx, total):
+    """Сохраняет карточку (выполняется в потоке записи, см. AsyncWriter)"""
+    archive_page(url, html, storage.file_path)
+    # Сохранение каждой карточки (журнал или SQLite)
+    storage.append(card)
+    failures.resolve(url)
+
+    # Снимок данных каждые 1000 записей
+    if storage.count() % 1000 == 0:
+        save_snapshot(storage)
+
+    position = f'{idx}/{total}' if total else idx
+    print(f'✓ Обработано: {position} | Всего в базе: {storage.count()}')
+
+
+def save_failure(storage, failures, url, error, html, idx, total):
+    """Записывает неудачу в журнал (выполняется в потоке записи)"""
+    if html is not None:
+        # Страница загрузилась, но не разобралась — в архиве её можно будет пересобрать
+        archive_page(url, html, storage.file_path)
+    failure = failures.record(url, error, html)
+    position = f'{idx}/{total}' if total else idx
+    print(f'✗ Ошибка {failure["kind"]} ({position}): {str(error)[:50]}')
+
+
+async def process_product_async(engine, parse_pool, writer, url, storage, failures, idx, total):
     """Асинхронная обработка одного товара"""
+    html = None
     try:
-        html = await fetch_page_async(session, url)
-        if not html:
-            async with lock:
-                break_line.append(url)
-            return
+        html = await fetch_page_async(engine, url, raise_errors=True)
 
-        soup = BeautifulSoup(html, 'lxml')
         cur_data = datetime.now().strftime("%d.%m.%Y")
         cur_time = datetime.now().strftime("%H:%M")
 
-        try:
-            name = soup.find("div", class_='page-title').text.strip()
-        except:
-            name = "None"
-
-        try:
-            new_price = soup.find("span", class_='cat-price__cur').text.replace(' ', '').strip()
-        except:
-            new_price = 'Error'
-
-        try:
-            old_price = soup.find('del', class_='cat-price__del').text.replace(' ', '').strip()
-        except:
-            old_price = new_price
-
-        try:
-            price_units = soup.find("span", class_='cat-price__measure').text.strip()
-        except:
-            price_units = 'Error'
-
-        try:
-            stocs = soup.find('span', class_='cat-availibility__in').text
-        except:
-            stocs = None
-
-        left_spec = []
-        right_spec = []
-
-        specs = soup.find('div', class_='cat-article-params').find_all('dt')
-        for spec in specs:
-            left_spec.append(spec.text.strip())
-
-        rspecs = soup.find('div', class_='cat-article-params').find_all('dd')
-        for spec in rspecs:
-            right_spec.append(spec.text.strip())
-
-        specs_dict = {left_spec[i].strip(): right_spec[i].strip() for i in range(len(left_spec))}
-
-        data = {
-            "Полное наименование": name,
-            "Действующая цена": new_price,
-            'Цена без скидки': old_price,
-            "Единица измерения цены": price_units,
-            'В наличии': stocs,
-            "Ссылка": url,
-            "Дата мониторинга": cur_data,
-            "Время мониторинга": cur_time,
-            "Магазин": "Keramogranit_ru",
-        }
-
-        # Потокобезопасное добавление данных
-        async with lock:
-            data_dict.append(data | specs_dict)
-
-            # Сохранение после каждых 50 карточек
-            if len(data_dict) % 50 == 0:
-                save_data_incrementally(data_dict, file_path)
-
-            # Резервное копирование каждые 1000 записей
-            if len(data_dict) % 1000 == 0:
-                save_backup_copy(data_dict, file_path)
-
-            print(f'✓ Обработано: {idx}/{total} | Всего в базе: {len(data_dict)}')
+        # Разбор в пуле процессов: пока страница разбирается, остальные загрузки идут
+        card = await parse_in_pool(parse_pool, parse_page, html, url, cur_data, cur_time)
+
+        # Архив, хранилище и снимки — в задаче записи, воркер сразу берёт следующий URL
+        await writer.submit(save_card, storage, failures, url, html, card, idx, total)
 
     except Exception as e:
-        async with lock:
-            break_line.append(url)
-        print(f'✗ Ошибка ({idx}/{total}): {str(e)[:50]}')
+        await writer.submit(save_failure, storage, failures, url, e, html, idx, total)
 
 
-async def get_data_async():
+async def get_data_async(engine, parse_pool):
     """Асинхронная обработка всех товаров"""
     print("\n" + "="*60)
     print("ОБРАБОТКА ТОВАРОВ")
     print("="*60)
 
     # 1. Загружаем существующие данные
-    data_dict = load_existing_data()
-    processed_urls = get_processed_urls(data_dict)
+    storage = open_data_storage()
+    processed_urls = get_processed_urls(storage)
+    file_path = os.path.join(SCRIPT_DIR, f"data_{cur_data_file}_KeramogranitRu.json")
+    # Журнал неудачных загрузок (класс ошибки, число попыток, время)
+    failures = FailureLedger(file_path)
 
     # 2. Читаем список URL
-    url_file_path = os.path.join(SCRIPT_DIR, f'url_list_{cur_data_file}_KeramogranitRu.txt')
+    url_file_path = url_list_path()
 
     if not os.path.exists(url_file_path):
         print(f"⚠ Файл не найден: {url_file_path}")
@@ -288,161 +281,188 @@ async def get_data_async():
     with open(url_file_path, 'r', encoding='utf-8') as file:
         all_lines = [line.strip() for line in file.readlines()]
 
-    # 3. Фильтруем - пропускаем уже обработанные
+    # 3. Фильтруем - пропускаем уже обработанные и постоянные ошибки (404)
     lines = [line for line in all_lines if line not in processed_urls]
+    permanent = [line for line in lines if failures.is_permanent(line)]
+    if permanent:
+        lines = [line for line in lines if not failures.is_permanent(line)]
 
     print(f"Всего URL в файле: {len(all_lines)}")
     print(f"Уже обработано: {len(processed_urls)}")
+    print(f"Постоянные ошибки (пропуск): {len(permanent)}")
     print(f"Осталось обработать: {len(lines)}")
     print("="*60 + "\n")
 
     if not lines:
         print("✓ Все URL уже обработаны!")
+        storage.finalize()
         return
 
-    break_line = []
-    file_path = os.path.join(SCRIPT_DIR, f"data_{cur_data_file}_KeramogranitRu.json")
     total_urls = len(lines)
 
-    # Создаем асинхронную сессию и блокировку для потокобезопасности
-    lock = asyncio.Lock()
-
-    async with aiohttp.ClientSession() as session:
-        # Создаем задачи для всех товаров
-        tasks = []
-        for idx, url in enumerate(lines, 1):
-            tasks.append(process_product_async(session, url, data_dict, break_line, lock, file_path, idx, total_urls))
+    async with AsyncWriter() as writer:
 
-        # Выполняем с ограничением одновременных запросов
-        semaphore = asyncio.Semaphore(CONCURRENT_REQUESTS)
+        async def process_item(item):
+            idx, url = item
+            await process_product_async(engine, parse_pool, writer, url, storage, failures, idx, total_urls)
 
-        async def process_with_semaphore(task):
-            async with semaphore:
-                return await task
-
-        await asyncio.gather(*[process_with_semaphore(task) for task in tasks])
+        # Ограниченная очередь URL вместо задачи на каждый URL; одновременные запросы ограничивает CONCURRENCY
+        queue = WorkQueue(process_item, workers=CONCURRENCY.max_limit)
+        await queue.run(enumerate(lines, 1))
+    print(f"💾 Фоновая запись: {writer.summary()}")
 
     # Финальное сохранение
-    print(f'\n✓ Обработано новых: {len(lines) - len(break_line)}')
-    print(f'✗ Ошибок: {len(break_line)}')
-    print(f'✓ Всего в базе: {len(data_dict)}')
+    print(f'\n✓ Обработано новых: {len(lines) - len(failures.failed_now)}')
+    print(f'✗ Ошибок: {len(failures.failed_now)}')
+    print(f'✓ Всего в базе: {storage.count()}')
 
-    # Финальная резервная копия
-    if len(data_dict) > 0:
-        save_backup_copy(data_dict, file_path)
-        save_data_incrementally(data_dict, file_path)
+    # Формируем итоговый JSON, финальный снимок
+    if storage.count() > 0:
+        storage.finalize()
+        save_snapshot(storage)
 
-    # Сохраняем сломанные ссылки
-    if break_line:
-        save_broken_urls(break_line)
+    # Неудачные загрузки (для повторного прохода)
+    failures.print_summary(processed_urls)
+    failures.close()
 
 
 def get_data():
     """Синхронная обертка для асинхронной функции"""
-    asyncio.run(get_data_async())
+    asyncio.run(with_http(get_data_async))
 
 
-async def retry_broken_urls_async():
+async def retry_broken_urls_async(engine, parse_pool):
     """Асинхронная повторная обработка сломанных ссылок"""
     print("\n" + "="*60)
     print("ПОВТОРНАЯ ОБРАБОТКА СЛОМАННЫХ ССЫЛОК")
     print("="*60)
 
     # 1. Загружаем существующие данные
-    data_dict = load_existing_data()
-    processed_urls = get_processed_urls(data_dict)
-
-    # 2. Проверяем наличие файла со сломанными ссылками
-    broken_urls_file = os.path.join(SCRIPT_DIR, f'url_break_list_{cur_data_file}_KeramogranitRu.txt')
-
-    if not os.path.exists(broken_urls_file):
-        print(f"✓ Файл со сломанными ссылками не найден")
-        return
-
-    # 3. Читаем список сломанных URL
-    with open(broken_urls_file, 'r', encoding='utf-8') as file:
-        all_broken_urls = [line.strip() for line in file.readlines() if line.strip()]
-
-    # 4. Фильтруем - пропускаем уже обработанные
-    lines = [line for line in all_broken_urls if line not in processed_urls]
+    storage = open_data_storage()
+    processed_urls = get_processed_urls(storage)
+    file_path = os.path.join(SCRIPT_DIR, f"data_{cur_data_file}_KeramogranitRu.json")
+    failures = FailureLedger(file_path)
 
-    print(f"Всего сломанных URL: {len(all_broken_urls)}")
-    print(f"Уже обработано ранее: {len(all_broken_urls) - len(lines)}")
-    print(f"К повторной обработке: {len(lines)}")
+    # 2. Из журнала неудач берём только URL, у которых истекла пауза;
+    # уже обработанные и постоянные ошибки (404, исчерпан лимит попыток) пропускаем
+    lines = failures.due_for_retry(processed_urls)
     print("="*60 + "\n")
 
     if not lines:
-        print("✓ Все сломанные URL уже обработаны!")
+        print("✓ Нет ссылок, готовых к повторной обработке")
+        storage.finalize()
         return
 
-    break_line = []
-    file_path = os.path.join(SCRIPT_DIR, f"data_{cur_data_file}_KeramogranitRu.json")
     total_urls = len(lines)
 
-    # Создаем асинхронную сессию с увеличенным таймаутом
-    lock = asyncio.Lock()
+    async with AsyncWriter() as writer:
 
-    async with aiohttp.ClientSession() as session:
-        tasks = []
-        for idx, url in enumerate(lines, 1):
-            tasks.append(process_product_async(session, url, data_dict, break_line, lock, file_path, idx, total_urls))
+        async def process_item(item):
+            idx, url = item
+            await process_product_async(engine, parse_pool, writer, url, storage, failures, idx, total_urls)
 
-        # Меньше одновременных запросов для проблемных ссылок
-        semaphore = asyncio.Semaphore(10)
-
-        async def process_with_semaphore(task):
-            async with semaphore:
-                await asyncio.sleep(0.5)  # Дополнительная задержка
-                return await task
-
-        await asyncio.gather(*[process_with_semaphore(task) for task in tasks])
+        # Окно одновременных запросов общее с основным проходом: если сайт перегружен,
+        # CONCURRENCY уже уменьшил его, отдельные задержки не нужны
+        queue = WorkQueue(process_item, workers=CONCURRENCY.max_limit)
+        await queue.run(enumerate(lines, 1))
+    print(f"💾 Фоновая запись: {writer.summary()}")
 
     print(f'\n{"="*60}')
-    print(f'✓ Успешно обработано: {len(lines) - len(break_line)}')
-    print(f'✗ Всё ещё сломано: {len(break_line)}')
-    print(f'✓ Всего записей в базе: {len(data_dict)}')
+    print(f'✓ Успешно обработано: {len(lines) - len(failures.failed_now)}')
+    print(f'✗ Всё ещё сломано: {len(failures.failed_now)}')
+    print(f'✓ Всего записей в базе: {storage.count()}')
     print("="*60)
 
     # Финальное сохранение
-    if len(data_dict) > 0:
-        save_backup_copy(data_dict, file_path)
-        save_data_incrementally(data_dict, file_path)
-
-    # Обновляем список сломанных ссылок
-    if break_line:
-        save_broken_urls(break_line)
-        print(f"\n✓ Обновлён список сломанных ссылок: {len(break_line)} шт.")
-    else:
-        # Удаляем файл со сломанными ссылками, если все успешно
-        try:
-            if os.path.exists(broken_urls_file):
-                os.remove(broken_urls_file)
-                print(f"\n✓ Все ссылки успешно обработаны! Файл удалён.")
-        except:
-            pass
+    if storage.count() > 0:
+        storage.finalize()
+        save_snapshot(storage)
+
+    # Итог по журналу неудач
+    print()
+    failures.print_summary(processed_urls)
+    failures.close()
 
 
 def get_data_break():
     """Синхронная обертка для асинхронной функции"""
-    asyncio.run(retry_broken_urls_async())
+    asyncio.run(with_http(retry_broken_urls_async))
 
 
-def main():
+async def crawl_async(engine, parse_pool):
+    """Сбор ссылок и обработка товаров одним конвейером: товар загружается, как только найден"""
+    print("\n" + "="*60)
+    print("СБОР ССЫЛОК И ОБРАБОТКА ТОВАРОВ")
     print("="*60)
-    print("ПАРСЕР KERAMOGRANIT.RU С АСИНХРОННОЙ ОБРАБОТКОЙ")
-    print(f"Количество одновременных запросов: {CONCURRENT_REQUESTS}")
+
+    storage = open_data_storage()
+    processed_urls = get_processed_urls(storage)
+    file_path = os.path.join(SCRIPT_DIR, f"data_{cur_data_file}_KeramogranitRu.json")
+    failures = FailureLedger(file_path)
     print("="*60 + "\n")
 
-    # 1. Сбор ссылок из каталога
-    get_url_tile()
+    counts = {'queued': 0, 'processed': 0, 'permanent': 0}
+
+    async def process_item(item):
+        idx, url = item
+        # Общее число товаров до конца обхода каталога неизвестно
+        await process_product_async(engine, parse_pool, writer, url, storage, failures, idx, None)
+
+    # Воркеры товаров работают параллельно с обходом каталога; put ждёт места в очереди,
+    # поэтому каталог не убегает далеко вперёд загрузки товаров
+    async with AsyncWriter() as writer, WorkQueue(process_item, workers=CONCURRENCY.max_limit) as products:
+
+        async def on_url(url):
+            # Уже обработанные и постоянные ошибки (404) не загружаем
+            if url in processed_urls:
+                counts['processed'] += 1
+            elif failures.is_permanent(url):
+                counts['permanent'] += 1
+            else:
+                counts['queued'] += 1
+                await products.put((counts['queued'], url))
 
-    # 2. Основная обработка всех ссылок
-    get_data()
+        await discover_catalog_async(engine, parse_pool, on_url, save_list=URL_LIST_OUTPUT)
+    print(f"💾 Фоновая запись: {writer.summary()}")
+
+    print(f'\n✓ Обработано новых: {counts["queued"] - len(failures.failed_now)}')
+    print(f'✓ Уже были обработаны: {counts["processed"]}')
+    print(f'Постоянные ошибки (пропуск): {counts["permanent"]}')
+    print(f'✗ Ошибок: {len(failures.failed_now)}')
+    print(f'✓ Всего в базе: {storage.count()}')
+
+    if storage.count() > 0:
+        storage.finalize()
+        save_snapshot(storage)
+
+    failures.print_summary(processed_urls)
+    failures.close()
+
+
+def crawl():
+    """Синхронная обертка для асинхронной функции"""
+    asyncio.run(with_http(crawl_async))
+
+
+async def run_all_async(engine, parse_pool):
+    """Все этапы в одной HTTP-сессии: соединения с сайтом переиспользуются между этапами"""
+    # 1-2. Сбор ссылок из каталога и обработка товаров по мере их нахождения
+    await crawl_async(engine, parse_pool)
 
     # 3. Повторная обработка сломанных ссылок
     retry_question = input('\nВы желаете повторить обработку сломанных ссылок? ("1" - Да; "0" - Нет): ')
     if retry_question == "1":
-        get_data_break()
+        await retry_broken_urls_async(engine, parse_pool)
+
+
+def main():
+    print("="*60)
+    print("ПАРСЕР KERAMOGRANIT.RU С АСИНХРОННОЙ ОБРАБОТКОЙ")
+    print(f"Одновременных запросов: от {CONCURRENCY.limit} (подбирается автоматически, "
+          f"{CONCURRENCY.min_limit}-{CONCURRENCY.max_limit})")
+    print("="*60 + "\n")
+
+    asyncio.run(with_http(run_all_async))
 
 
 if __name__ == '__main__':
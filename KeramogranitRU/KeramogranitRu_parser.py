@@ -0,0 +1,171 @@
+"""
+Извлечение данных из страниц товаров Keramogranit.ru
+
+Используется основным парсером (KeramogranitRu.py) и повторным разбором архива HTML:
+
+    python KeramogranitRU/KeramogranitRu_parser.py [--month MM.YYYY] [--workers N]
+
+Поля извлекаются через lxml (scraper_core/extract.py); прежний разбор через
+BeautifulSoup оставлен для сравнения на страницах архива:
+
+    python KeramogranitRU/KeramogranitRu_parser.py --bench [--limit N]
+"""
+import os
+import sys
+from bs4 import BeautifulSoup
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+# Общие модули (scraper_core) лежат в корне репозитория
+sys.path.insert(0, os.path.dirname(SCRIPT_DIR))
+from scraper_core.extract import find, find_all, find_text, html_tree, require, select, text
+
+
+# Селекторы полей карточки и каталога (компилируются один раз, см. scraper_core/extract.py)
+NAME = select('div', cls='page-title')
+PRICE = select('span', cls='cat-price__cur')
+OLD_PRICE = select('del', cls='cat-price__del')
+PRICE_UNITS = select('span', cls='cat-price__measure')
+STOCK = select('span', cls='cat-availibility__in')
+PARAMS = select('div', cls='cat-article-params')
+PARAM_NAMES = select('dt')
+PARAM_VALUES = select('dd')
+PAGER_LINK = select('a', cls='pager__link')
+CATALOG_CARD = select('div', cls='cat-card__desc')
+CATALOG_LINK = select('a', cls='cat-card__title-link')
+CATALOG_PRICE = select('div', cls='cat-card__price')
+
+
+def parse_product(tree, url, cur_data, cur_time):
+    """Карточка товара со страницы (дерево lxml). Исключение — страница не распознана"""
+    name = find_text(tree, NAME)
+    if name is None:
+        name = "None"
+
+    element = find(tree, PRICE)
+    new_price = text(element).replace(' ', '').strip() if element is not None else 'Error'
+
+    element = find(tree, OLD_PRICE)
+    old_price = text(element).replace(' ', '').strip() if element is not None else new_price
+
+    price_units = find_text(tree, PRICE_UNITS)
+    if price_units is None:
+        price_units = 'Error'
+
+    element = find(tree, STOCK)
+    stocs = text(element) if element is not None else None
+
+    # Характеристики: названия (dt) и значения (dd) внутри одного блока
+    params = require(tree, PARAMS)
+    left_spec = [text(spec).strip() for spec in find_all(params, PARAM_NAMES)]
+    right_spec = [text(spec).strip() for spec in find_all(params, PARAM_VALUES)]
+
+    specs_dict = {left_spec[i]: right_spec[i] for i in range(len(left_spec))}
+
+    data = {
+        "Полное наименование": name,
+        "Действующая цена": new_price,
+        'Цена без скидки': old_price,
+        "Единица измерения цены": price_units,
+        'В наличии': stocs,
+        "Ссылка": url,
+        "Дата мониторинга": cur_data,
+        "Время мониторинга": cur_time,
+        "Магазин": "Keramogranit_ru",
+    }
+
+    return data | specs_dict
+
+
+def parse_page(html, url, cur_data, cur_time):
+    """Карточка из HTML страницы товара (выполняется в пуле процессов основного парсера)"""
+    return parse_product(html_tree(html), url, cur_data, cur_time)
+
+
+def parse_pages_count(html):
+    """Число страниц каталога (по последней ссылке пагинации)"""
+    return int(text(find_all(html_tree(html), PAGER_LINK)[-1]))
+
+
+def parse_catalog_page(html):
+    """Ссылки на товары со страницы каталога, кроме товаров с ценой по запросу у менеджеров"""
+    url_list = []
+    for card in find_all(html_tree(html), CATALOG_CARD):
+        link = find(card, CATALOG_LINK)
+        price = find(card, CATALOG_PRICE)
+        if link is None or price is None or link.get('href') is None:
+            continue
+        if 'менеджеров' not in text(price).strip():
+            url_list.append("https://www.keramogranit.ru" + link.get('href'))
+    return url_list
+
+
+def parse_card(pages, url, dataset, cur_data, cur_time):
+    """Карточка из сохранённой страницы архива"""
+    return parse_page(pages['product'], url, cur_data, cur_time)
+
+
+# Прежний разбор через BeautifulSoup — эталон для сравнения скорости и результата:
+#     python KeramogranitRU/KeramogranitRu_parser.py --bench
+
+def parse_product_bs(soup, url, cur_data, cur_time):
+    """Карточка товара со страницы (BeautifulSoup)"""
+    try:
+        name = soup.find("div", class_='page-title').text.strip()
+    except:
+        name = "None"
+
+    try:
+        new_price = soup.find("span", class_='cat-price__cur').text.replace(' ', '').strip()
+    except:
+        new_price = 'Error'
+
+    try:
+        old_price = soup.find('del', class_='cat-price__del').text.replace(' ', '').strip()
+    except:
+        old_price = new_price
+
+    try:
+        price_units = soup.find("span", class_='cat-price__measure').text.strip()
+    except:
+        price_units = 'Error'
+
+    try:
+        stocs = soup.find('span', class_='cat-availibility__in').text
+    except:
+        stocs = None
+
+    left_spec = []
+    right_spec = []
+
+    specs = soup.find('div', class_='cat-article-params').find_all('dt')
+    for spec in specs:
+        left_spec.append(spec.text.strip())
+
+    rspecs = soup.find('div', class_='cat-article-params').find_all('dd')
+    for spec in rspecs:
+        right_spec.append(spec.text.strip())
+
+    specs_dict = {left_spec[i].strip(): right_spec[i].strip() for i in range(len(left_spec))}
+
+    data = {
+        "Полное наименование": name,
+        "Действующая цена": new_price,
+        'Цена без скидки': old_price,
+        "Единица измерения цены": price_units,
+        'В наличии': stocs,
+        "Ссылка": url,
+        "Дата мониторинга": cur_data,
+        "Время мониторинга": cur_time,
+        "Магазин": "Keramogranit_ru",
+    }
+
+    return data | specs_dict
+
+
+def parse_card_bs(pages, url, dataset, cur_data, cur_time):
+    return parse_product_bs(BeautifulSoup(pages['product'], 'lxml'), url, cur_data, cur_time)
+
+
+if __name__ == '__main__':
+    from scraper_core.reparse import reparse_main
+    reparse_main(parse_card, SCRIPT_DIR, reference=parse_card_bs)
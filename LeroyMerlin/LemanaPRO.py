@@ -1,162 +1,145 @@
 import json
 import time
 import os
-import undetected_chromedriver as uc
+import sys
 from bs4 import BeautifulSoup
 from datetime import datetime
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.webdriver.common.by import By
+from functools import partial
 from selenium.common.exceptions import NoSuchElementException, ElementNotInteractableException
 
 start_time = time.time()
 
 # Определяем директорию скрипта
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+# Общие модули (scraper_core) лежат в корне репозитория
+sys.path.insert(0, os.path.dirname(SCRIPT_DIR))
+from scraper_core.chrome_driver import DriverSettings, close_driver, new_driver
+from scraper_core.driver_pool import DriverPool
+from scraper_core.durability import DurabilityPolicy
+from scraper_core.extract import html_tree, select
+from scraper_core.failures import PARSE_ERROR, FailureLedger
+from scraper_core.html_archive import open_archive
+from scraper_core.network_capture import NetworkCapture, captured, embedded_state
+from scraper_core.resource_blocking import DEFAULT_BLOCKLIST, ResourceBlocker
+from scraper_core.storage import open_storage
+from scraper_core.waits import Waits, all_of, document_ready, present, rendered
+from LemanaPRO_parser import process_online_only_product, parse_store_stock, parse_stock_json, parse_product, build_card
+from LemanaPRO_parser import NAME, ONLINE_ONLY, OUT_OF_STOCK, STORE_ROW
 cur_data_file = datetime.now().strftime("%m.%Y")
 
-options = uc.ChromeOptions()
-prefs = {
-    "profile.managed_default_content_settings.images": 2,
-    "profile.default_content_setting_values.images": 2,
-    "profile.managed_default_content_settings.media": 2
-}
-options.add_experimental_option("prefs", prefs)
-
-# Инициализация undetected_chromedriver
-driver = uc.Chrome(
-    options=options,
-    use_subprocess=True,
-    version_main=144  # Указываем версию Chrome явно
-)
-time.sleep(5)
-
-
-def end_driver():
+# Политика сохранения карточек: запись каждые N карточек и/или каждые T секунд.
+# Запись идёт в фоновом потоке, загрузка страниц диска не ждёт.
+# Например, DurabilityPolicy(every_records=50, every_seconds=10) — реже fsync, быстрее на HDD
+DURABILITY = DurabilityPolicy(every_records=1, fsync=True)
+
+# Хранилище карточек: 'journal' (JSON + журнал .jsonl) или 'sqlite' (база магазина в режиме WAL).
+# В обоих случаях в конце прохода формируется data_MM.YYYY_*.json для Main_scraping_Russia.py
+STORAGE_BACKEND = 'journal'
+STORAGE_DB = os.path.join(SCRIPT_DIR, 'LemanaPRO.sqlite3')
+# Снимки данных каждые 1000 карточек и в конце прохода; хранятся последние N.
+# Восстановление: python -m scraper_core restore <data_MM.YYYY_*.json> [имя снимка]
+SNAPSHOTS_KEEP = 5
+# Архив исходного HTML карточек (сжатый, с дедупликацией) для повторного разбора
+# без загрузки сайта. None — выключен, например: os.path.join(SCRIPT_DIR, 'html_archive')
+HTML_ARCHIVE_DIR = None
+html_archive = open_archive(HTML_ARCHIVE_DIR)
+# Число браузеров, параллельно загружающих карточки из общего списка URL
+# (scraper_core/driver_pool.py). Нагрузка на сайт растёт примерно во столько же раз;
+# при капче или массовых таймаутах уменьшите. 1 — один браузер, как раньше
+PARALLEL_DRIVERS = 3
+
+# Вместо фиксированных пауз браузер ждёт нужных узлов страницы (scraper_core/waits.py).
+# Таймауты в секундах по видам ожидания; фактическое время ожиданий печатается в конце прохода
+WAITS = Waits({
+    'browser': 10,       # новый браузер готов: стартовая вкладка загружена
+    'product': 15,       # карточка отрисована: название и признак «только онлайн» / кнопка складов
+    'stock_button': 10,  # кнопка «Наличие в магазинах»
+    'stock': 10,         # строки окна складов отрисованы
+    'stock_json': 3,     # ответ сайта с остатками после клика (STOCK_SOURCE = 'network')
+    'catalog': 15,       # товары на странице каталога
+})
+
+# Откуда брать остатки по складам товара «в магазинах»:
+# 'modal'   — клик по «Наличие в магазинах», ожидание окна и разбор страницы с ним;
+# 'network' — JSON складов из состояния страницы или ответа сайта (перехват через DevTools,
+#             scraper_core/network_capture.py): сначала без клика, затем ответ на клик без
+#             повторного разбора страницы; если JSON складов не найден — как в 'modal'.
+# В конце прохода печатается, сколько остатков получено из JSON и сколько из окна
+STOCK_SOURCE = 'modal'
+# Части адресов ответов сайта, в которых ищется JSON складов
+STOCK_API_PATTERNS = ('/api/', 'stock', 'store', 'availability')
+
+STOCK_BUTTON = "//*[@data-qa='stock-in-stores-title-interactive']"
+CATALOG_PRODUCT = select('a', attrs={'data-qa': 'product-name'})
+
+# Ресурсы, которые браузер не загружает (шаблоны адресов по группам, CDP Network.setBlockedURLs;
+# scraper_core/resource_blocking.py): шрифты, картинки, видео, аналитика, виджеты.
+# measure=True — ничего не блокировать, а в конце прохода напечатать, сколько запросов и КБ
+# на страницу пришлось бы на каждую группу (сравните время загрузки с обычным проходом)
+RESOURCES = ResourceBlocker(DEFAULT_BLOCKLIST, measure=False)
+# Браузер (scraper_core/chrome_driver.py): 'eager' — driver.get возвращается, как только готов DOM,
+# дальше парсер ждёт нужных узлов (WAITS); 'normal' — после загрузки всех ресурсов, как раньше.
+# headless=True — без окна, если сайт его пропускает; меньше окно — меньше отрисовки
+DRIVER = DriverSettings(page_load_strategy='eager', headless=False, window_size=(1280, 800))
+
+
+def create_driver():
+    """Новый браузер по настройкам DRIVER (журнал событий сети — для STOCK_SOURCE = 'network')"""
+    driver = new_driver(DRIVER, resources=RESOURCES, performance_log=STOCK_SOURCE == 'network')
+    # Вместо паузы 5 с — до готовности стартовой вкладки; страницы дальше ждут своих узлов (WAITS)
+    WAITS.until(driver, 'browser', document_ready(), required=False)
+    return driver
+
+
+def end_driver(driver):
     """Безопасное закрытие драйвера браузера"""
-    try:
-        if driver:
-            driver.quit()
-            time.sleep(0.5)
-    except Exception:
-        # Игнорируем ошибки закрытия, например "Неверный дескриптор"
-        pass
+    close_driver(driver, RESOURCES)
 
 
-def load_existing_data():
-    """Загружает существующие данные из JSON файла текущего месяца"""
+def open_data_storage():
+    """Открывает хранилище карточек текущего месяца (журнал или SQLite, см. STORAGE_BACKEND)"""
     file_name = f"data_{cur_data_file}_Tiles_LemanaPRO.json"
-    file_path = os.path.join(SCRIPT_DIR, file_name)
+    storage = open_storage(os.path.join(SCRIPT_DIR, file_name), STORAGE_BACKEND,
+                           db_path=STORAGE_DB, policy=DURABILITY)
 
-    if os.path.exists(file_path):
-        try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-            print(f"✓ Загружен существующий файл: {file_name}")
-            print(f"✓ Найдено записей: {len(data)}")
-            return data
-        except Exception as e:
-            print(f"⚠ Ошибка при чтении файла: {e}")
-            return []
+    if storage.exists():
+        print(f"✓ Загружен существующий файл: {file_name}")
+        print(f"✓ Найдено записей: {storage.count()}")
     else:
         print(f"Файл {file_name} не найден, начинаем с нуля")
-        return []
+    return storage
 
 
-def get_processed_urls(existing_data):
-    """Извлекает список уже обработанных URL из существующих данных"""
-    processed = set()
-    for item in existing_data:
-        if 'Ссылка' in item and item['Ссылка']:
-            processed.add(item['Ссылка'])
+def get_processed_urls(storage):
+    """Извлекает список уже обработанных URL из хранилища"""
+    processed = storage.processed_urls()
     print(f"✓ Уже обработано URL: {len(processed)}")
     return processed
 
 
-def save_data_incrementally(data_dict, file_path):
-    """Сохраняет данные после каждой обработанной карточки с принудительной записью на диск"""
-    try:
-        # Сначала записываем во временный файл
-        temp_file = file_path + '.tmp'
-        with open(temp_file, 'w', encoding="utf-8") as json_file:
-            json.dump(data_dict, json_file, indent=4, ensure_ascii=False)
-            json_file.flush()  # Принудительно сбрасываем буфер Python
-            os.fsync(json_file.fileno())  # Принудительно записываем на диск (OS level)
-
-        # Атомарная замена: если запись успешна, заменяем основной файл
-        if os.path.exists(file_path):
-            os.replace(temp_file, file_path)
-        else:
-            os.rename(temp_file, file_path)
+def archive_page(url, content, file_path, kind='product'):
+    """Сохраняет исходный HTML карточки в архив (если задан HTML_ARCHIVE_DIR)"""
+    if html_archive is not None:
+        html_archive.put(url, content, dataset=os.path.basename(file_path), kind=kind)
 
-    except Exception as e:
-        print(f"✗ Ошибка при сохранении: {e}")
-        # Удаляем временный файл в случае ошибки
-        if os.path.exists(temp_file):
-            try:
-                os.remove(temp_file)
-            except:
-                pass
 
-
-def save_backup_copy(data_dict, file_path):
-    """Создает резервную копию, которая перезаписывается при каждом вызове"""
+def save_snapshot(storage):
+    """Снимок данных (жёсткие ссылки, хранятся SNAPSHOTS_KEEP последних поколений)"""
     try:
-        backup_path = file_path.replace('.json', '_BACKUP.json')
-        temp_backup = backup_path + '.tmp'
-
-        with open(temp_backup, 'w', encoding="utf-8") as json_file:
-            json.dump(data_dict, json_file, indent=4, ensure_ascii=False)
-            json_file.flush()
-            os.fsync(json_file.fileno())
-
-        # Заменяем старую резервную копию новой
-        if os.path.exists(backup_path):
-            os.replace(temp_backup, backup_path)
-        else:
-            os.rename(temp_backup, backup_path)
-
-        print(f"💾 Резервная копия обновлена: {len(data_dict)} записей")
-
+        path = storage.snapshot(keep=SNAPSHOTS_KEEP)
+        print(f"💾 Снимок данных: {storage.count()} записей ({os.path.basename(path)})")
     except Exception as e:
-        print(f"⚠ Ошибка создания резервной копии: {e}")
-        if os.path.exists(temp_backup):
-            try:
-                os.remove(temp_backup)
-            except:
-                pass
-
-
-def keep_only_digits_as_int(input_string):
-    digits_str = ''.join(filter(str.isdigit, input_string))
-    return int(digits_str) if digits_str else 0
-
-
-def safe_find(soup, *args, **kwargs):
-    """Безопасное извлечение данных с обработкой исключений"""
-    try:
-        element = soup.find(*args, **kwargs)
-        return element.text.strip() if element else None
-    except (AttributeError, Exception):
-        return None
+        print(f"⚠ Ошибка создания снимка: {e}")
 
 
 def retry_click(driver, xpath, max_attempts=3, wait_time=2):
     """Повторные попытки клика по элементу с ожиданием"""
     for attempt in range(max_attempts):
         try:
-            # Ждем появления элемента до 10 секунд
-            element = WebDriverWait(driver, 10).until(
-                EC.presence_of_element_located((By.XPATH, xpath))
-            )
-            # Дополнительная задержка для загрузки
-            time.sleep(1)
-            # Скроллим к элементу
+            # Ждем появления элемента (клик через JavaScript не требует анимации прокрутки)
+            element = WAITS.until(driver, 'stock_button', present(xpath))
             driver.execute_script("arguments[0].scrollIntoView(true);", element)
-            time.sleep(0.5)
-            # Кликаем через JavaScript
             driver.execute_script("arguments[0].click();", element)
-            time.sleep(1)  # Ждем после клика
             return True
         except Exception as e:
             print(f"Попытка клика {attempt + 1}/{max_attempts}: {str(e)[:50]}")
@@ -166,120 +149,136 @@ def retry_click(driver, xpath, max_attempts=3, wait_time=2):
     return False
 
 
-def parse_price(soup):
-    """Извлекает цену, скидку и единицы измерения"""
-    new_price = None
-    discount = None
-    price_units = None
-
-    price_selectors = [
-        # Вариант 1: с блоком скидки
-        (
-            lambda s: s.find('div', {'data-qa': 'prices_mf-pdp'}).find('div', {'data-testid': 'price-block-price'}).find('span', {'data-testid': 'price'}),
-        ),
-        # Вариант 2: без блока скидки
-        (
-            lambda s: s.find('div', {'data-qa': 'prices_mf-pdp'}).find('span', {'data-testid': 'price'}),
-        ),
-        # Вариант 3: цена за единицу
-        (
-            lambda s: s.find('div', {'data-qa': 'prices_mf-pdp'}).find('div', {'data-testid': 'price-block-unitprice'}),
-        )
-    ]
+def read_stock_json(tree, capture):
+    """Остатки без клика: из состояния страницы или уже пришедших ответов сайта. (склады, JSON) или None"""
+    for data in embedded_state(tree) + [data for _, data in capture.responses()]:
+        stock = parse_stock_json(data)
+        if stock:
+            return stock, data
+    return None
 
-    for price_selector in price_selectors:
-        try:
-            price_element = price_selector(soup)
-            if price_element:
-                new_price = safe_find(price_element, 'span', {'data-testid': 'price-integer'})
-                price_units = safe_find(price_element, 'span', {'data-testid': 'price-unit'})
-                break
-        except (AttributeError, Exception):
-            continue
 
-    # Отдельная проверка наличия скидки
-    try:
-        discount_block = soup.find('div', {'data-testid': 'price-block-discount'})
-        if discount_block:
-            discount_span = discount_block.find('span', {'data-testid': 'marker-text'})
-            if discount_span:
-                discount = discount_span.text.strip()
-    except (AttributeError, Exception):
-        pass
+def process_store_product(driver, capture=None):
+    """Обработка товара в магазинах - С кликом на склады. Возвращает (склады, {вид: страница для архива})"""
 
-    return new_price, discount, price_units
+    try:
+        # Кликаем на кнопку складов
+        retry_click(driver, STOCK_BUTTON)
 
+        if capture is not None:
+            # Окно складов заполняется ответом сайта — берём остатки из него, без разбора страницы
+            found = WAITS.until(driver, 'stock_json', captured(capture, parse_stock_json), required=False)
+            if found:
+                stock, data = found
+                return stock, {'stock_json': json.dumps(data, ensure_ascii=False)}
 
-def process_online_only_product(soup):
-    """Обработка товара 'Только онлайн-заказ' - БЕЗ клика"""
-    print("🌐 Товар только для онлайн-заказа")
+        # Окно складов готово, когда строки появились и их число перестало меняться
+        WAITS.until(driver, 'stock', rendered(STORE_ROW))
 
-    stocks_counter = 0
-    stocks_mesure = None
-    quant_stock_dict = {}  # Пустой - складов нет
+        # Обновляем HTML после клика
+        content = driver.page_source
+        return parse_store_stock(html_tree(content)), {'stock': content}
 
-    # Ищем "Доступно для заказа N кор./шт."
-    import re
-    try:
-        page_text = soup.get_text()
-        # Ищем паттерн
-        pattern = r'доступно\s+для\s+заказа\s+(\d+)\s*(кор\.|шт\.)'
-        match = re.search(pattern, page_text.lower())
-        if match:
-            stocks_counter = int(match.group(1))
-            stocks_mesure = match.group(2)
-            print(f"✓ Найдено: {stocks_counter} {stocks_mesure}")
     except Exception as e:
-        print(f"⚠ Не удалось извлечь онлайн-остаток: {e}")
-
-    return quant_stock_dict, stocks_counter, stocks_mesure
-
-
-def process_store_product(driver, soup):
-    """Обработка товара в магазинах - С кликом на склады"""
-    print("🏪 Товар в магазинах")
+        print(f"⚠ Ошибка при обработке складов: {e}")
 
-    quant_stock_dict = {}
-    stocks_counter = 0
-    stocks_mesure = None
+    return ({}, 0, None), {}
 
-    try:
-        # Кликаем на кнопку складов
-        retry_click(driver, "//*[@data-qa='stock-in-stores-title-interactive']")
 
-        print("Ожидание загрузки данных складов...")
-        WebDriverWait(driver, 10).until(
-            EC.presence_of_element_located((By.CLASS_NAME, "m1e45js0_pdp"))
-        )
-        time.sleep(2)
+def load_product(driver, url, timeout=None):
+    """Загрузка товара в браузере воркера: (страницы {вид: HTML}, товар, склады, дата, время)"""
+    # Время загрузки и (в режиме замера) ресурсы страницы вместе с окном складов
+    with RESOURCES.page(driver):
+        capture = None
+        if STOCK_SOURCE == 'network':
+            # Ответы сайта ловим с начала загрузки страницы, ответы прошлой карточки отбрасываем
+            capture = NetworkCapture(driver, STOCK_API_PATTERNS)
+            capture.clear()
+        driver.get(url=url)
+        # Карточка отрисована, когда есть название и видно, онлайн-товар это или складской.
+        # Не дождались (404, капча, другая вёрстка) — разбираем то, что есть, как и раньше
+        WAITS.until(driver, 'product', all_of(present(NAME), present(ONLINE_ONLY, STOCK_BUTTON, OUT_OF_STOCK)),
+                    timeout=timeout, required=False)
 
-        # Обновляем HTML после клика
         content = driver.page_source
-        soup = BeautifulSoup(content, 'lxml')
+        tree = html_tree(content)
+        cur_data = datetime.now().strftime("%d.%m.%Y")
+        cur_time = datetime.now().strftime("%H:%M")
+        pages = {'product': content}
+
+        # Извлечение основных данных
+        product = parse_product(tree)
+        stock = None
+        if product is not None:
+            # ВЫБОР СТРАТЕГИИ: Онлайн или Магазин
+            if product['is_online_only']:
+                stock = process_online_only_product(tree)
+            else:
+                found = read_stock_json(tree, capture) if capture is not None else None
+                if found:
+                    stock, data = found
+                    stock_pages = {'stock_json': json.dumps(data, ensure_ascii=False)}
+                else:
+                    stock, stock_pages = process_store_product(driver, capture)
+                # Окно складов или JSON складов — для пересборки остатков из архива
+                pages.update(stock_pages)
+        return pages, product, stock, cur_data, cur_time
+
+
+def process_urls(lines, storage, failures, file_path, timeout=None, retry=False):
+    """Загружает URL в PARALLEL_DRIVERS браузерах; карточки и неудачи записывает этот поток"""
+    total_urls = len(lines)
+    processed_count = 0
+    # Источник остатков товаров «в магазинах»: JSON, окно складов, не получены
+    stock_sources = {'stock_json': 0, 'stock': 0, None: 0}
+    pool = DriverPool(create_driver, workers=PARALLEL_DRIVERS, close_driver=end_driver)
+
+    for idx, (line, result, error) in enumerate(pool.run(lines, partial(load_product, timeout=timeout)), 1):
+        if error is not None:
+            failure = failures.record(line, error)
+            label = 'повторной обработки ' if retry else ''
+            print(f'✗ Ошибка {label}{failure["kind"]} ({idx}/{total_urls}): {str(error)[:100]}')
+            continue
 
-        # Собираем остатки по складам
-        quant_stock = soup.find_all('div', class_='m1e45js0_pdp')
-        for spec in quant_stock:
-            store_name = safe_find(spec, "div", class_='m19407om_pdp')
-            stock_text = safe_find(spec, "span", {'data-qa': 'modal-store-item-in-stock-text'})
+        pages, product, stock, cur_data, cur_time = result
+        for kind, content in pages.items():
+            archive_page(line, content, file_path, kind=kind)
 
-            if store_name and stock_text:
-                quant_stock_dict[store_name] = stock_text
-                stocks_counter += keep_only_digits_as_int(stock_text)
+        # Проверка: если название не получено, пропускаем товар
+        if product is None:
+            failure = failures.record(line, PARSE_ERROR, pages['product'])
+            reason = 'название по-прежнему недоступно' if retry else 'не удалось получить название товара'
+            print(f"⚠ [{idx}/{total_urls}] Пропуск: {reason} ({failure['kind']}): {line}")
+            continue
 
-                if stocks_mesure is None:
-                    stocks_mesure = 'шт.' if 'шт.' in stock_text else 'кор.'
+        if not product['is_online_only']:
+            stock_sources['stock_json' if 'stock_json' in pages else 'stock' if 'stock' in pages else None] += 1
+        quant_stock_dict, stocks_counter, stocks_mesure = stock
+        card = build_card(product, line, cur_data, cur_time, quant_stock_dict, stocks_counter, stocks_mesure)
 
-        print(f"✓ Найдено {len(quant_stock_dict)} складов, остаток: {stocks_counter} {stocks_mesure}")
+        # СОХРАНЕНИЕ ПОСЛЕ КАЖДОЙ КАРТОЧКИ (защита от сбоев)
+        storage.append(card)
+        failures.resolve(line)
 
-    except Exception as e:
-        print(f"⚠ Ошибка при обработке складов: {e}")
+        # СНИМОК ДАННЫХ каждые 1000 записей
+        if storage.count() % 1000 == 0:
+            save_snapshot(storage)
 
-    return quant_stock_dict, stocks_counter, stocks_mesure
+        processed_count += 1
+        print(f"✓ [{idx}/{total_urls}] {'Магазины' if not product['is_online_only'] else 'Онлайн'}: {line}")
+
+    print(f"⚙ Браузеры: {pool.summary()}")
+    if any(stock_sources.values()):
+        print(f"⚙ Остатки по складам: из JSON {stock_sources['stock_json']}, из окна складов "
+              f"{stock_sources['stock']}, не получены {stock_sources[None]}")
+    WAITS.print_summary()
+    RESOURCES.print_summary()
+    return processed_count
 
 
 def get_pages():
     """Собирает ссылки на товары из всех категорий"""
+    driver = create_driver()
     groups = [
         "keramogranit",
         "keramicheskaya-plitka",
@@ -292,10 +291,7 @@ def get_pages():
         for group in groups:
             url = f'https://lemanapro.ru/catalogue/{group}/?deliveryType=Самовывоз+в+магазине_Пункты+выдачи_Доставка+курьером'
             driver.get(url=url)
-            WebDriverWait(driver, 10).until(
-                EC.presence_of_element_located((By.TAG_NAME, "body"))
-            )
-            time.sleep(5)
+            WAITS.until(driver, 'catalog', rendered(CATALOG_PRODUCT), required=False)
 
             content = driver.page_source
             soup = BeautifulSoup(content, 'lxml')
@@ -316,6 +312,7 @@ def get_pages():
                 print(f'Обрабатываю {page_num} страницу каталога {group}')
                 url = f'https://lemanapro.ru/catalogue/{group}/?deliveryType=Самовывоз+в+магазине_Пункты+выдачи_Доставка+курьером&page={page_num}'
                 driver.get(url=url)
+                WAITS.until(driver, 'catalog', rendered(CATALOG_PRODUCT), required=False)
 
                 content = driver.page_source
                 soup = BeautifulSoup(content, 'lxml')
@@ -351,15 +348,8 @@ def get_pages():
 
     except Exception as ex:
         print(f"Ошибка при сборе ссылок: {ex}")
-
-
-def save_broken_urls(break_line):
-    """Сохраняет сломанные ссылки в файл"""
-    if break_line:
-        file_path = os.path.join(SCRIPT_DIR, f'url_break_list_{cur_data_file}_Tiles_LemanaPRO.txt')
-        with open(file_path, 'w', encoding='utf-8') as file:
-            for url in break_line:
-                file.write(f'{url}\n')
+    finally:
+        end_driver(driver)
 
 
 def get_data():
@@ -368,11 +358,12 @@ def get_data():
     print("\n" + "="*60)
     print("ЗАГРУЗКА СУЩЕСТВУЮЩИХ ДАННЫХ")
     print("="*60)
-    data_dict = load_existing_data()
-    processed_urls = get_processed_urls(data_dict)
+    storage = open_data_storage()
+    processed_urls = get_processed_urls(storage)
 
-    break_line = []
     file_path = os.path.join(SCRIPT_DIR, f"data_{cur_data_file}_Tiles_LemanaPRO.json")
+    # Журнал неудачных загрузок (класс ошибки, число попыток, время)
+    failures = FailureLedger(file_path)
 
     try:
         # 2. Читаем список URL
@@ -386,14 +377,18 @@ def get_data():
         with open(url_file, 'r', encoding='utf-8') as file:
             all_urls = [line.strip() for line in file.readlines()]
 
-        # 3. Фильтруем - пропускаем уже обработанные
+        # 3. Фильтруем - пропускаем уже обработанные и постоянные ошибки (404)
         lines = [url for url in all_urls if url not in processed_urls]
+        permanent = [url for url in lines if failures.is_permanent(url)]
+        if permanent:
+            lines = [url for url in lines if not failures.is_permanent(url)]
 
         print(f"\n" + "="*60)
         print("СТАТИСТИКА")
         print("="*60)
         print(f"Всего URL в файле: {len(all_urls)}")
         print(f"Уже обработано: {len(processed_urls)}")
+        print(f"Постоянные ошибки (пропуск): {len(permanent)}")
         print(f"Осталось обработать: {len(lines)}")
         print("="*60 + "\n")
 
@@ -401,126 +396,15 @@ def get_data():
             print("✓ Все URL уже обработаны!")
             return
 
-        total_urls = len(lines)
-        processed_count = 0
-
-        # 4. Обрабатываем каждый URL
-        for idx, line in enumerate(lines, 1):
-            try:
-                print(f"\n[{idx}/{total_urls}] Загрузка: {line}")
-
-                driver.get(url=line)
-                WebDriverWait(driver, 15).until(
-                    EC.presence_of_element_located((By.TAG_NAME, "body"))
-                )
-                time.sleep(2)
-
-                content = driver.page_source
-                soup = BeautifulSoup(content, 'lxml')
-                cur_data = datetime.now().strftime("%d.%m.%Y")
-                cur_time = datetime.now().strftime("%H:%M")
-
-                # КЛЮЧЕВОЙ МОМЕНТ: Определяем тип товара
-                online_marker = safe_find(soup, 'span', {'data-qa': 'online-order-only-message-text'})
-                is_online_only = online_marker is not None
-
-                # Извлечение основных данных
-                name = safe_find(soup, "h1", {'data-qa': 'product-name'})
-
-                # Проверка: если название не получено, пропускаем товар
-                if not name:
-                    print(f"⚠ Пропуск: не удалось получить название товара")
-                    break_line.append(line)
-                    continue
-
-                articul = safe_find(soup, 'span', class_='t12nw7s2_pdp')
-                best_price_text = safe_find(soup, "div", {'data-qa': 'productBestPriceNameplate'})
-                new_price, discount, price_units = parse_price(soup)
-
-                # Цена за коробку
-                price_box = None
-                try:
-                    price_box_elem = soup.find('div', class_='u1bdlfxm_pdp').find('div', {'data-testid': 'price-block-unitprice'})
-                    if price_box_elem:
-                        price_box = safe_find(price_box_elem, 'span', {'data-testid': 'price-integer'})
-                except (AttributeError, Exception):
-                    pass
-
-                # Наличие товара
-                stocks = safe_find(soup, "div", class_="out-of-stock-label") or "В наличии"
-
-                # Извлечение характеристик
-                specs_dict = {}
-                specs = soup.find_all('div', {'data-qa': 'characteristics-list-item'})
-                for spec in specs:
-                    key = safe_find(spec, "div", class_='dsqv1xm_pdp')
-                    value = safe_find(spec, "div", class_='v17yx9hk_pdp')
-                    if key and value:
-                        specs_dict[key] = value
-
-                # ВЫБОР СТРАТЕГИИ: Онлайн или Магазин
-                if is_online_only:
-                    quant_stock_dict, stocks_counter, stocks_mesure = process_online_only_product(soup)
-                    product_type = "Только онлайн"
-                else:
-                    quant_stock_dict, stocks_counter, stocks_mesure = process_store_product(driver, soup)
-                    product_type = "В магазинах"
-
-                # Формируем данные
-                data = {
-                    "Полное наименование": name,
-                    "Артикул": articul,
-                    "Действующая цена": new_price,
-                    "Скидка": discount,
-                    'Цена за коробку': price_box,
-                    "Единица измерения цены": price_units,
-                    "Ссылка": line,
-                    "Дата мониторинга": cur_data,
-                    "Время мониторинга": cur_time,
-                    "Магазин": "LemanaPRO",
-                    "В наличии": stocks,
-                    'Онлайн заказ': product_type,  # ← ЗДЕСЬ ТИП ТОВАРА
-                    'Лучшая цена': best_price_text,
-                    "Единица хранения на складе": stocks_mesure,
-                    "Общий остаток": stocks_counter
-                }
-
-                data_dict.append(data | specs_dict | quant_stock_dict)
-
-                # СОХРАНЕНИЕ ПОСЛЕ КАЖДОЙ КАРТОЧКИ (защита от сбоев)
-                save_data_incrementally(data_dict, file_path)
-
-                # РЕЗЕРВНОЕ КОПИРОВАНИЕ каждые 1000 записей
-                if len(data_dict) % 1000 == 0:
-                    save_backup_copy(data_dict, file_path)
-
-                # Вывод
-                """ print(f'{"="*60}')
-                print(f'✓ Обработано: {idx}/{total_urls} | Всего в базе: {len(data_dict)}')
-                print(f'{"="*60}')
-                print(f'Название: {name}')
-                print(f'Тип: {product_type}')
-                print(f'Цена: {new_price} {price_units}')
-                print(f'Остаток: {stocks_counter} {stocks_mesure}')
-                print(f'Складов: {len(quant_stock_dict)}')
-                print(f'{"="*60}\n') """
-
-                processed_count += 1
-
-            except Exception as e:
-                break_line.append(line)
-                print(f'✗ Ошибка ({idx}/{total_urls}): {str(e)[:100]}')
-                # Даже при ошибке сохраняем то, что успели
-                save_data_incrementally(data_dict, file_path)
+        # 4. Обрабатываем URL в нескольких браузерах
+        processed_count = process_urls(lines, storage, failures, file_path)
 
         print(f'\n✓ Обработано новых: {processed_count}')
-        print(f'✗ Ошибок: {len(break_line)}')
-        print(f'✓ Всего в базе: {len(data_dict)}')
+        print(f'✗ Ошибок: {len(failures.failed_now)}')
+        print(f'✓ Всего в базе: {storage.count()}')
 
     except Exception as ex:
         print(f"✗ Критическая ошибка: {ex}")
-        # Сохраняем даже при критической ошибке
-        save_data_incrementally(data_dict, file_path)
 
     finally:
         # Финальное сохранение и статистика
@@ -529,29 +413,23 @@ def get_data():
         print("="*60)
 
         try:
+            # Формируем итоговый JSON из журнала или базы
+            storage.finalize()
             if os.path.exists(file_path):
                 print(f"✓ Файл: {file_path}")
-                print(f"✓ Записей: {len(data_dict)}")
+                print(f"✓ Записей: {storage.count()}")
                 print(f"✓ Размер: {os.path.getsize(file_path)} байт")
-            else:
-                # Последняя попытка сохранения
-                save_data_incrementally(data_dict, file_path)
-                print(f"✓ Финальное сохранение выполнено")
 
-            # Финальная резервная копия
-            if len(data_dict) > 0:
-                save_backup_copy(data_dict, file_path)
+            # Финальный снимок
+            if storage.count() > 0:
+                save_snapshot(storage)
 
         except Exception as e:
             print(f"✗ Ошибка: {e}")
 
-        # Сломанные ссылки
-        if break_line:
-            try:
-                save_broken_urls(break_line)
-                print(f"✓ Сломанных ссылок: {len(break_line)}")
-            except:
-                pass
+        # Неудачные загрузки (для повторного прохода)
+        failures.print_summary(processed_urls)
+        failures.close()
 
         print("="*60 + "\n")
 
@@ -563,193 +441,63 @@ def retry_broken_urls():
     print("="*60)
 
     # 1. Загружаем существующие данные
-    data_dict = load_existing_data()
-    processed_urls = get_processed_urls(data_dict)
+    storage = open_data_storage()
+    processed_urls = get_processed_urls(storage)
 
-    break_line = []
     file_path = os.path.join(SCRIPT_DIR, f"data_{cur_data_file}_Tiles_LemanaPRO.json")
-    broken_urls_file = os.path.join(SCRIPT_DIR, f'url_break_list_{cur_data_file}_Tiles_LemanaPRO.txt')
-
-    # 2. Проверяем наличие файла со сломанными ссылками
-    if not os.path.exists(broken_urls_file):
-        print(f"✓ Файл со сломанными ссылками не найден: {broken_urls_file}")
-        print("✓ Нет ссылок для повторной обработки")
-        return
+    failures = FailureLedger(file_path)
 
     try:
-        # 3. Читаем список сломанных URL
-        with open(broken_urls_file, 'r', encoding='utf-8') as file:
-            all_broken_urls = [line.strip() for line in file.readlines() if line.strip()]
-
-        # 4. Фильтруем - пропускаем уже обработанные (на случай если они были обработаны в основном цикле)
-        lines = [url for url in all_broken_urls if url not in processed_urls]
-
-        print(f"\nВсего сломанных URL: {len(all_broken_urls)}")
-        print(f"Уже обработано ранее: {len(all_broken_urls) - len(lines)}")
-        print(f"К повторной обработке: {len(lines)}")
+        # 2. Из журнала неудач берём только URL, у которых истекла пауза;
+        # уже обработанные и постоянные ошибки (404, исчерпан лимит попыток) пропускаем
+        print()
+        lines = failures.due_for_retry(processed_urls)
         print("="*60 + "\n")
 
         if not lines:
-            print("✓ Все сломанные URL уже обработаны!")
+            print("✓ Нет ссылок, готовых к повторной обработке")
             return
 
-        total_urls = len(lines)
-        processed_count = 0
-
-        # 5. Обрабатываем каждый сломанный URL
-        for idx, line in enumerate(lines, 1):
-            try:
-                print(f"\n[{idx}/{total_urls}] Повторная загрузка: {line}")
-
-                driver.get(url=line)
-                WebDriverWait(driver, 15).until(
-                    EC.presence_of_element_located((By.TAG_NAME, "body"))
-                )
-                time.sleep(3)  # Увеличенное ожидание для проблемных ссылок
-
-                content = driver.page_source
-                soup = BeautifulSoup(content, 'lxml')
-                cur_data = datetime.now().strftime("%d.%m.%Y")
-                cur_time = datetime.now().strftime("%H:%M")
-
-                # Определяем тип товара
-                online_marker = safe_find(soup, 'span', {'data-qa': 'online-order-only-message-text'})
-                is_online_only = online_marker is not None
-
-                # Извлечение основных данных
-                name = safe_find(soup, "h1", {'data-qa': 'product-name'})
-
-                # Проверка: если название не получено, пропускаем товар
-                if not name:
-                    print(f"⚠ Пропуск: название по-прежнему недоступно")
-                    break_line.append(line)
-                    continue
-
-                print(f"✓ Название получено: {name[:50]}...")
-
-                articul = safe_find(soup, 'span', class_='t12nw7s2_pdp')
-                best_price_text = safe_find(soup, "div", {'data-qa': 'productBestPriceNameplate'})
-                new_price, discount, price_units = parse_price(soup)
-
-                # Цена за коробку
-                price_box = None
-                try:
-                    price_box_elem = soup.find('div', class_='u1bdlfxm_pdp').find('div', {'data-testid': 'price-block-unitprice'})
-                    if price_box_elem:
-                        price_box = safe_find(price_box_elem, 'span', {'data-testid': 'price-integer'})
-                except (AttributeError, Exception):
-                    pass
-
-                # Наличие товара
-                stocks = safe_find(soup, "div", class_="out-of-stock-label") or "В наличии"
-
-                # Извлечение характеристик
-                specs_dict = {}
-                specs = soup.find_all('div', {'data-qa': 'characteristics-list-item'})
-                for spec in specs:
-                    key = safe_find(spec, "div", class_='dsqv1xm_pdp')
-                    value = safe_find(spec, "div", class_='v17yx9hk_pdp')
-                    if key and value:
-                        specs_dict[key] = value
-
-                # ВЫБОР СТРАТЕГИИ: Онлайн или Магазин
-                if is_online_only:
-                    quant_stock_dict, stocks_counter, stocks_mesure = process_online_only_product(soup)
-                    product_type = "Только онлайн"
-                else:
-                    quant_stock_dict, stocks_counter, stocks_mesure = process_store_product(driver, soup)
-                    product_type = "В магазинах"
-
-                # Формируем данные
-                data = {
-                    "Полное наименование": name,
-                    "Артикул": articul,
-                    "Действующая цена": new_price,
-                    "Скидка": discount,
-                    'Цена за коробку': price_box,
-                    "Единица измерения цены": price_units,
-                    "Ссылка": line,
-                    "Дата мониторинга": cur_data,
-                    "Время мониторинга": cur_time,
-                    "Магазин": "LemanaPRO",
-                    "В наличии": stocks,
-                    'Онлайн заказ': product_type,
-                    'Лучшая цена': best_price_text,
-                    "Единица хранения на складе": stocks_mesure,
-                    "Общий остаток": stocks_counter
-                }
-
-                data_dict.append(data | specs_dict | quant_stock_dict)
-
-                # СОХРАНЕНИЕ ПОСЛЕ КАЖДОЙ КАРТОЧКИ
-                save_data_incrementally(data_dict, file_path)
-
-                # РЕЗЕРВНОЕ КОПИРОВАНИЕ каждые 1000 записей
-                if len(data_dict) % 1000 == 0:
-                    save_backup_copy(data_dict, file_path)
-
-                processed_count += 1
-
-                print(f"✓ Успешно обработано [{idx}/{total_urls}]")
-
-            except Exception as e:
-                break_line.append(line)
-                print(f'✗ Ошибка повторной обработки ({idx}/{total_urls}): {str(e)[:100]}')
-                save_data_incrementally(data_dict, file_path)
+        # 5. Обрабатываем сломанные URL (увеличенный таймаут для проблемных ссылок)
+        processed_count = process_urls(lines, storage, failures, file_path,
+                                       timeout=WAITS.timeout('product') * 2, retry=True)
 
         print(f'\n{"="*60}')
         print(f'✓ Успешно обработано: {processed_count}')
-        print(f'✗ Всё ещё сломано: {len(break_line)}')
-        print(f'✓ Всего записей в базе: {len(data_dict)}')
+        print(f'✗ Всё ещё сломано: {len(failures.failed_now)}')
+        print(f'✓ Всего записей в базе: {storage.count()}')
         print("="*60)
 
     except Exception as ex:
         print(f"✗ Критическая ошибка: {ex}")
-        save_data_incrementally(data_dict, file_path)
 
     finally:
-        # Финальная резервная копия
+        # Формируем итоговый JSON и делаем финальный снимок
         try:
-            if len(data_dict) > 0:
-                save_backup_copy(data_dict, file_path)
+            storage.finalize()
+            if storage.count() > 0:
+                save_snapshot(storage)
         except Exception as e:
-            print(f"⚠ Ошибка финального резервного копирования: {e}")
-
-        # Обновляем список сломанных ссылок
-        if break_line:
-            save_broken_urls(break_line)
-            print(f"\n✓ Обновлён список сломанных ссылок: {len(break_line)} шт.")
-        else:
-            # Удаляем файл со сломанными ссылками, если все успешно
-            try:
-                if os.path.exists(broken_urls_file):
-                    os.remove(broken_urls_file)
-                    print(f"\n✓ Все ссылки успешно обработаны! Файл {broken_urls_file} удалён.")
-            except Exception:
-                pass
+            print(f"⚠ Ошибка финального сохранения: {e}")
+
+        # Итог по журналу неудач
+        print()
+        failures.print_summary(processed_urls)
+        failures.close()
 
         print("\n")
 
 
 def main():
-    try:
-        # 1. Сбор ссылок из каталога (раскомментируйте при необходимости)
-        # get_pages()
+    # Браузеры открываются и закрываются внутри каждого этапа
+    # 1. Сбор ссылок из каталога (раскомментируйте при необходимости)
+    # get_pages()
 
-        # 2. Основная обработка всех ссылок
-        get_data()
+    # 2. Основная обработка всех ссылок
+    get_data()
 
-        # 3. Повторная обработка сломанных ссылок
-        retry_broken_urls()
-
-    finally:
-        # Закрываем браузер ПОСЛЕ всех операций
-        print("\n" + "="*60)
-        print("ЗАКРЫТИЕ БРАУЗЕРА")
-        print("="*60)
-        end_driver()
-        print("✓ Браузер закрыт")
-        print("="*60 + "\n")
+    # 3. Повторная обработка сломанных ссылок
+    retry_broken_urls()
 
 
 if __name__ == '__main__':
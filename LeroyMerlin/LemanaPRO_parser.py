@@ -0,0 +1,410 @@
+"""
+Извлечение данных из страниц товаров LemanaPRO (без браузера)
+
+Используется основным парсером (LemanaPRO.py) и повторным разбором архива HTML:
+
+    python LeroyMerlin/LemanaPRO_parser.py [--month MM.YYYY] [--workers N]
+
+Поля извлекаются через lxml (scraper_core/extract.py); прежний разбор через
+BeautifulSoup оставлен для сравнения на страницах архива:
+
+    python LeroyMerlin/LemanaPRO_parser.py --bench [--limit N]
+"""
+import json
+import os
+import re
+import sys
+from bs4 import BeautifulSoup
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+# Общие модули (scraper_core) лежат в корне репозитория
+sys.path.insert(0, os.path.dirname(SCRIPT_DIR))
+from scraper_core.extract import find, find_all, find_text, html_tree, select, text
+
+
+def keep_only_digits_as_int(input_string):
+    digits_str = ''.join(filter(str.isdigit, input_string))
+    return int(digits_str) if digits_str else 0
+
+
+# Селекторы полей (компилируются один раз, см. scraper_core/extract.py)
+NAME = select('h1', attrs={'data-qa': 'product-name'})
+ONLINE_ONLY = select('span', attrs={'data-qa': 'online-order-only-message-text'})
+ARTICUL = select('span', cls='t12nw7s2_pdp')
+BEST_PRICE = select('div', attrs={'data-qa': 'productBestPriceNameplate'})
+DISCOUNT_BLOCK = select('div', attrs={'data-testid': 'price-block-discount'})
+DISCOUNT = select('span', attrs={'data-testid': 'marker-text'})
+BOX_PRICE_BLOCK = select('div', cls='u1bdlfxm_pdp')
+UNIT_PRICE = select('div', attrs={'data-testid': 'price-block-unitprice'})
+PRICE_INTEGER = select('span', attrs={'data-testid': 'price-integer'})
+OUT_OF_STOCK = select('div', cls='out-of-stock-label')
+SPEC_ITEM = select('div', attrs={'data-qa': 'characteristics-list-item'})
+SPEC_NAME = select('div', cls='dsqv1xm_pdp')
+SPEC_VALUE = select('div', cls='v17yx9hk_pdp')
+STORE_ROW = select('div', cls='m1e45js0_pdp')
+STORE_NAME = select('div', cls='m19407om_pdp')
+STORE_STOCK = select('span', attrs={'data-qa': 'modal-store-item-in-stock-text'})
+
+
+def parse_price(tree):
+    """Извлекает цену, скидку и единицы измерения"""
+    # Цену и единицу измерения прежний разбор не находил ни разу (варианты селекторов
+    # в parse_price_bs обёрнуты в кортежи и не вызываются), и Main_scraping_Russia.py
+    # считает цену за м² из цены за коробку. Результат оставлен прежним
+    new_price = None
+    price_units = None
+    discount = find_text(tree, DISCOUNT_BLOCK, DISCOUNT)
+    return new_price, discount, price_units
+
+
+def process_online_only_product(tree):
+    """Обработка товара 'Только онлайн-заказ' - БЕЗ клика"""
+    print("🌐 Товар только для онлайн-заказа")
+
+    stocks_counter = 0
+    stocks_mesure = None
+    quant_stock_dict = {}  # Пустой - складов нет
+
+    # Ищем "Доступно для заказа N кор./шт."
+    pattern = r'доступно\s+для\s+заказа\s+(\d+)\s*(кор\.|шт\.)'
+    match = re.search(pattern, text(tree).lower())
+    if match:
+        stocks_counter = int(match.group(1))
+        stocks_mesure = match.group(2)
+        print(f"✓ Найдено: {stocks_counter} {stocks_mesure}")
+
+    return quant_stock_dict, stocks_counter, stocks_mesure
+
+
+def parse_store_stock(tree):
+    """Остатки по складам из страницы с открытым окном складов"""
+    quant_stock_dict = {}
+    stocks_counter = 0
+    stocks_mesure = None
+
+    # Собираем остатки по складам
+    for row in find_all(tree, STORE_ROW):
+        store_name = find_text(row, STORE_NAME)
+        stock_text = find_text(row, STORE_STOCK)
+
+        if store_name and stock_text:
+            quant_stock_dict[store_name] = stock_text
+            stocks_counter += keep_only_digits_as_int(stock_text)
+
+            if stocks_mesure is None:
+                stocks_mesure = 'шт.' if 'шт.' in stock_text else 'кор.'
+
+    print(f"✓ Найдено {len(quant_stock_dict)} складов, остаток: {stocks_counter} {stocks_mesure}")
+    return quant_stock_dict, stocks_counter, stocks_mesure
+
+
+# Остатки по складам в JSON (ответ сайта за окном складов или состояние страницы, см.
+# STOCK_SOURCE в LemanaPRO.py): список складов лежит под ключом со «store»/«shop» в имени,
+# у каждого склада — название и количество. Имена ключей сверяются по порядку
+STOCK_JSON_STORE_KEYS = ('storeName', 'shopName', 'store_name', 'name', 'title')
+STOCK_JSON_QTY_KEYS = ('stock', 'quantity', 'qty', 'available', 'availableQuantity', 'amount')
+STOCK_JSON_UNIT_KEYS = ('unit', 'uom', 'measure', 'unitName')
+
+
+def _first_key(item, keys):
+    return next((item[key] for key in keys if item.get(key) not in (None, '')), None)
+
+
+def _store_rows(data):
+    """Списки складов в JSON: (ключ, список) для всех списков под ключом со «store»/«shop»"""
+    stack = [data]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, dict):
+            for key, value in node.items():
+                if isinstance(value, list) and ('store' in key.lower() or 'shop' in key.lower()):
+                    yield value
+                stack.append(value)
+        elif isinstance(node, list):
+            stack.extend(node)
+
+
+def parse_stock_json(data):
+    """Остатки по складам из JSON: (склады, остаток, единица) или None, если складов в нём нет"""
+    for rows in _store_rows(data):
+        quant_stock_dict = {}
+        stocks_counter = 0
+        stocks_mesure = None
+        for row in rows:
+            if not isinstance(row, dict):
+                break
+            store_name = _first_key(row, STOCK_JSON_STORE_KEYS)
+            quantity = _first_key(row, STOCK_JSON_QTY_KEYS)
+            if not isinstance(store_name, str) or isinstance(quantity, (dict, list, bool)) or quantity is None:
+                break
+            unit = _first_key(row, STOCK_JSON_UNIT_KEYS)
+            # Тот же вид, что в окне складов: «12 шт.»
+            stock_text = f"{quantity} {unit}" if isinstance(unit, str) else str(quantity)
+            quant_stock_dict[store_name.strip()] = stock_text
+            stocks_counter += int(quantity) if isinstance(quantity, (int, float)) else keep_only_digits_as_int(quantity)
+            if stocks_mesure is None:
+                stocks_mesure = 'шт.' if 'шт' in stock_text else 'кор.'
+        else:
+            if quant_stock_dict:
+                print(f"✓ Найдено {len(quant_stock_dict)} складов в JSON, остаток: {stocks_counter} {stocks_mesure}")
+                return quant_stock_dict, stocks_counter, stocks_mesure
+    return None
+
+
+def parse_product(tree):
+    """Основные данные со страницы товара (без остатков по складам). None — нет названия"""
+    # Извлечение основных данных
+    name = find_text(tree, NAME)
+    if not name:
+        return None
+
+    # КЛЮЧЕВОЙ МОМЕНТ: Определяем тип товара
+    online_marker = find(tree, ONLINE_ONLY)
+
+    new_price, discount, price_units = parse_price(tree)
+
+    # Извлечение характеристик
+    specs_dict = {}
+    for spec in find_all(tree, SPEC_ITEM):
+        key = find_text(spec, SPEC_NAME)
+        value = find_text(spec, SPEC_VALUE)
+        if key and value:
+            specs_dict[key] = value
+
+    return {
+        'name': name,
+        'is_online_only': online_marker is not None,
+        'articul': find_text(tree, ARTICUL),
+        'best_price_text': find_text(tree, BEST_PRICE),
+        'new_price': new_price,
+        'discount': discount,
+        'price_units': price_units,
+        # Цена за коробку
+        'price_box': find_text(tree, BOX_PRICE_BLOCK, UNIT_PRICE, PRICE_INTEGER),
+        # Наличие товара
+        'stocks': find_text(tree, OUT_OF_STOCK) or "В наличии",
+        'specs_dict': specs_dict,
+    }
+
+
+def build_card(product, url, cur_data, cur_time, quant_stock_dict, stocks_counter, stocks_mesure):
+    """Итоговая карточка товара в формате data_MM.YYYY_Tiles_LemanaPRO.json"""
+    product_type = "Только онлайн" if product['is_online_only'] else "В магазинах"
+
+    # Формируем данные
+    data = {
+        "Полное наименование": product['name'],
+        "Артикул": product['articul'],
+        "Действующая цена": product['new_price'],
+        "Скидка": product['discount'],
+        'Цена за коробку': product['price_box'],
+        "Единица измерения цены": product['price_units'],
+        "Ссылка": url,
+        "Дата мониторинга": cur_data,
+        "Время мониторинга": cur_time,
+        "Магазин": "LemanaPRO",
+        "В наличии": product['stocks'],
+        'Онлайн заказ': product_type,  # ← ЗДЕСЬ ТИП ТОВАРА
+        'Лучшая цена': product['best_price_text'],
+        "Единица хранения на складе": stocks_mesure,
+        "Общий остаток": stocks_counter
+    }
+
+    return data | product['specs_dict'] | quant_stock_dict
+
+
+def parse_card(pages, url, dataset, cur_data, cur_time):
+    """Карточка из сохранённых страниц архива (страница товара и окно складов или JSON складов)"""
+    tree = html_tree(pages['product'])
+    product = parse_product(tree)
+    if product is None:
+        return None
+
+    if product['is_online_only']:
+        stock = process_online_only_product(tree)
+    elif 'stock_json' in pages:
+        stock = parse_stock_json(json.loads(pages['stock_json'])) or ({}, 0, None)
+    elif 'stock' in pages:
+        stock = parse_store_stock(html_tree(pages['stock']))
+    else:
+        # Окно складов не открылось при загрузке — остатков нет
+        stock = ({}, 0, None)
+
+    return build_card(product, url, cur_data, cur_time, *stock)
+
+
+# Прежний разбор через BeautifulSoup — эталон для сравнения скорости и результата:
+#     python LeroyMerlin/LemanaPRO_parser.py --bench
+
+def safe_find(soup, *args, **kwargs):
+    """Безопасное извлечение данных с обработкой исключений"""
+    try:
+        element = soup.find(*args, **kwargs)
+        return element.text.strip() if element else None
+    except (AttributeError, Exception):
+        return None
+
+
+def parse_price_bs(soup):
+    """Извлекает цену, скидку и единицы измерения (BeautifulSoup)"""
+    new_price = None
+    discount = None
+    price_units = None
+
+    price_selectors = [
+        # Вариант 1: с блоком скидки
+        (
+            lambda s: s.find('div', {'data-qa': 'prices_mf-pdp'}).find('div', {'data-testid': 'price-block-price'}).find('span', {'data-testid': 'price'}),
+        ),
+        # Вариант 2: без блока скидки
+        (
+            lambda s: s.find('div', {'data-qa': 'prices_mf-pdp'}).find('span', {'data-testid': 'price'}),
+        ),
+        # Вариант 3: цена за единицу
+        (
+            lambda s: s.find('div', {'data-qa': 'prices_mf-pdp'}).find('div', {'data-testid': 'price-block-unitprice'}),
+        )
+    ]
+
+    for price_selector in price_selectors:
+        try:
+            price_element = price_selector(soup)
+            if price_element:
+                new_price = safe_find(price_element, 'span', {'data-testid': 'price-integer'})
+                price_units = safe_find(price_element, 'span', {'data-testid': 'price-unit'})
+                break
+        except (AttributeError, Exception):
+            continue
+
+    # Отдельная проверка наличия скидки
+    try:
+        discount_block = soup.find('div', {'data-testid': 'price-block-discount'})
+        if discount_block:
+            discount_span = discount_block.find('span', {'data-testid': 'marker-text'})
+            if discount_span:
+                discount = discount_span.text.strip()
+    except (AttributeError, Exception):
+        pass
+
+    return new_price, discount, price_units
+
+
+def process_online_only_product_bs(soup):
+    """Обработка товара 'Только онлайн-заказ' - БЕЗ клика (BeautifulSoup)"""
+    print("🌐 Товар только для онлайн-заказа")
+
+    stocks_counter = 0
+    stocks_mesure = None
+    quant_stock_dict = {}  # Пустой - складов нет
+
+    # Ищем "Доступно для заказа N кор./шт."
+    try:
+        page_text = soup.get_text()
+        # Ищем паттерн
+        pattern = r'доступно\s+для\s+заказа\s+(\d+)\s*(кор\.|шт\.)'
+        match = re.search(pattern, page_text.lower())
+        if match:
+            stocks_counter = int(match.group(1))
+            stocks_mesure = match.group(2)
+            print(f"✓ Найдено: {stocks_counter} {stocks_mesure}")
+    except Exception as e:
+        print(f"⚠ Не удалось извлечь онлайн-остаток: {e}")
+
+    return quant_stock_dict, stocks_counter, stocks_mesure
+
+
+def parse_store_stock_bs(soup):
+    """Остатки по складам из страницы с открытым окном складов (BeautifulSoup)"""
+    quant_stock_dict = {}
+    stocks_counter = 0
+    stocks_mesure = None
+
+    # Собираем остатки по складам
+    quant_stock = soup.find_all('div', class_='m1e45js0_pdp')
+    for spec in quant_stock:
+        store_name = safe_find(spec, "div", class_='m19407om_pdp')
+        stock_text = safe_find(spec, "span", {'data-qa': 'modal-store-item-in-stock-text'})
+
+        if store_name and stock_text:
+            quant_stock_dict[store_name] = stock_text
+            stocks_counter += keep_only_digits_as_int(stock_text)
+
+            if stocks_mesure is None:
+                stocks_mesure = 'шт.' if 'шт.' in stock_text else 'кор.'
+
+    print(f"✓ Найдено {len(quant_stock_dict)} складов, остаток: {stocks_counter} {stocks_mesure}")
+    return quant_stock_dict, stocks_counter, stocks_mesure
+
+
+def parse_product_bs(soup):
+    """Основные данные со страницы товара (BeautifulSoup)"""
+    # Извлечение основных данных
+    name = safe_find(soup, "h1", {'data-qa': 'product-name'})
+    if not name:
+        return None
+
+    # КЛЮЧЕВОЙ МОМЕНТ: Определяем тип товара
+    online_marker = safe_find(soup, 'span', {'data-qa': 'online-order-only-message-text'})
+
+    articul = safe_find(soup, 'span', class_='t12nw7s2_pdp')
+    best_price_text = safe_find(soup, "div", {'data-qa': 'productBestPriceNameplate'})
+    new_price, discount, price_units = parse_price_bs(soup)
+
+    # Цена за коробку
+    price_box = None
+    try:
+        price_box_elem = soup.find('div', class_='u1bdlfxm_pdp').find('div', {'data-testid': 'price-block-unitprice'})
+        if price_box_elem:
+            price_box = safe_find(price_box_elem, 'span', {'data-testid': 'price-integer'})
+    except (AttributeError, Exception):
+        pass
+
+    # Наличие товара
+    stocks = safe_find(soup, "div", class_="out-of-stock-label") or "В наличии"
+
+    # Извлечение характеристик
+    specs_dict = {}
+    specs = soup.find_all('div', {'data-qa': 'characteristics-list-item'})
+    for spec in specs:
+        key = safe_find(spec, "div", class_='dsqv1xm_pdp')
+        value = safe_find(spec, "div", class_='v17yx9hk_pdp')
+        if key and value:
+            specs_dict[key] = value
+
+    return {
+        'name': name,
+        'is_online_only': online_marker is not None,
+        'articul': articul,
+        'best_price_text': best_price_text,
+        'new_price': new_price,
+        'discount': discount,
+        'price_units': price_units,
+        'price_box': price_box,
+        'stocks': stocks,
+        'specs_dict': specs_dict,
+    }
+
+
+def parse_card_bs(pages, url, dataset, cur_data, cur_time):
+    soup = BeautifulSoup(pages['product'], 'lxml')
+    product = parse_product_bs(soup)
+    if product is None:
+        return None
+
+    if product['is_online_only']:
+        stock = process_online_only_product_bs(soup)
+    elif 'stock_json' in pages:
+        # Остатки из JSON разбираются без HTML — общий разбор
+        stock = parse_stock_json(json.loads(pages['stock_json'])) or ({}, 0, None)
+    elif 'stock' in pages:
+        stock = parse_store_stock_bs(BeautifulSoup(pages['stock'], 'lxml'))
+    else:
+        # Окно складов не открылось при загрузке — остатков нет
+        stock = ({}, 0, None)
+
+    return build_card(product, url, cur_data, cur_time, *stock)
+
+
+if __name__ == '__main__':
+    from scraper_core.reparse import reparse_main
+    reparse_main(parse_card, SCRIPT_DIR, reference=parse_card_bs)
@@ -0,0 +1,221 @@
+"""
+Извлечение данных из страниц товаров OBI (без браузера)
+
+Используется основным парсером (Obi_selenium.py) и повторным разбором архива HTML:
+
+    python Obi_selenium/Obi_parser.py [--month MM.YYYY] [--workers N]
+
+Поля извлекаются через lxml (scraper_core/extract.py); прежний разбор через
+BeautifulSoup оставлен для сравнения на страницах архива:
+
+    python Obi_selenium/Obi_parser.py --bench [--limit N]
+"""
+import os
+import sys
+from bs4 import BeautifulSoup
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+# Общие модули (scraper_core) лежат в корне репозитория
+sys.path.insert(0, os.path.dirname(SCRIPT_DIR))
+from scraper_core.extract import find_all, find_text, html_tree, require, select, text
+
+
+def keep_only_digits_as_int(input_string):
+    digits_str = ''.join(filter(str.isdigit, input_string))
+    return int(digits_str) if digits_str else 0
+
+
+# Селекторы полей карточки (компилируются один раз, см. scraper_core/extract.py)
+NAME = select('h2', cls='_3LdDm')
+PRICE_UNITS = select('span', cls='_3SDdj')
+PRICE = select('span', cls='_3IeOW')
+SALE_BLOCK = select('div', cls='i7rKk')
+SALE = select('div', cls='JpZgV')
+STOCK = select('span', cls='_2KVcZ AX0Hx')
+ON_SALE = select('ul', cls='_1IX-e _1oifM')
+SPECS = select('div', cls='_275gt')
+SPEC_NAMES = select('dt')
+SPEC_VALUES = select('dd')
+STORE_ROW = select('div', cls='_2cZg4')
+STORE_NAME = select('span', cls='_1u7d6')
+
+
+def squash(value):
+    """Текст без переносов и повторяющихся пробелов"""
+    return " ".join(value.split())
+
+
+def parse_name(tree):
+    name = find_text(tree, NAME)
+    return "None" if name is None else name
+
+
+def parse_product(tree, url, cur_data, cur_time, city):
+    """Карточка товара со страницы (дерево lxml). Исключение — страница не распознана"""
+    name = parse_name(tree)
+
+    price_units = find_text(tree, PRICE_UNITS)
+    if price_units is None:
+        price_units = 'Error'
+
+    new_price = find_text(tree, PRICE)
+    if new_price is None:
+        new_price = 'Error'
+
+    sale = find_text(tree, SALE_BLOCK, SALE)
+
+    stocs = find_text(tree, STOCK)
+    stocs = "Error" if stocs is None else squash(stocs)
+
+    on_sale = find_text(tree, ON_SALE)
+
+    # Характеристики: названия (dt) и значения (dd) внутри одного блока
+    specs = require(tree, SPECS)
+    left_spec = [squash(text(spec)) for spec in find_all(specs, SPEC_NAMES)]
+    right_spec = [squash(text(spec)) for spec in find_all(specs, SPEC_VALUES)]
+    specs_dict = {left_spec[i]: right_spec[i] for i in range(len(left_spec))}
+
+    # собираем склады
+    quant_stock_dict = {}
+    stocs_counter = 0
+    for row in find_all(tree, STORE_ROW):
+        store = find_text(row, STORE_NAME)
+        stock = find_text(row, STOCK)
+        if store is None or stock is None:
+            # Строка склада не распознана — список складов не сохраняем,
+            # остаток по уже прочитанным строкам остаётся
+            quant_stock_dict = {}
+            break
+        quant_stock_dict[store] = stock
+        stocs_counter += keep_only_digits_as_int(stock)
+
+    data = {
+        "Полное наименование": name,
+        "Действующая цена": new_price,
+        "Размер скидки": sale,
+        "Единица измерения цены": price_units,
+        "В наличии": stocs,
+        "Ссылка": url,
+        "Дата мониторинга": cur_data,
+        "Время мониторинга": cur_time,
+        "Магазин": "OBI",
+        "Город": city,
+        'Распродажа': on_sale,
+        "Общий остаток": stocs_counter
+    }
+
+    return data | specs_dict | quant_stock_dict
+
+
+def city_from_dataset(dataset):
+    """Город из имени файла данных: data_MM.YYYY_{group}_{city}_obi.json -> city"""
+    return os.path.splitext(dataset)[0].rsplit('_', 2)[-2]
+
+
+def parse_card(pages, url, dataset, cur_data, cur_time):
+    """Карточка из сохранённой страницы архива"""
+    return parse_product(html_tree(pages['product']), url, cur_data, cur_time, city_from_dataset(dataset))
+
+
+# Прежний разбор через BeautifulSoup — эталон для сравнения скорости и результата:
+#     python Obi_selenium/Obi_parser.py --bench
+
+def parse_name_bs(soup):
+    try:
+        return soup.find("h2", class_='_3LdDm').text.strip()
+    except:
+        return "None"
+
+
+def parse_product_bs(soup, url, cur_data, cur_time, city):
+    """Карточка товара со страницы (BeautifulSoup)"""
+    name = parse_name_bs(soup)
+
+    try:
+        price_units = soup.find("span", class_='_3SDdj').text.strip()
+    except:
+        price_units = 'Error'
+
+    try:
+        new_price = soup.find("span", class_='_3IeOW').text.strip()
+    except:
+        new_price = 'Error'
+
+    try:
+        sale = soup.find('div', class_='i7rKk').find('div', class_='JpZgV').text.strip()
+    except:
+        sale = None
+
+    try:
+        stocs = " ".join(soup.find("span", class_="_2KVcZ AX0Hx").text.strip().split())
+    except:
+        stocs = "Error"
+
+    try:
+        on_sale = soup.find('ul', class_='_1IX-e _1oifM').text.strip()
+    except:
+        on_sale = None
+
+    left_spec = []
+    right_spec = []
+
+    specs = soup.find('div', class_='_275gt').find_all('dt')
+    for spec in specs:
+        spec = " ".join(spec.text.strip().split())
+        left_spec.append(spec)
+
+    rspecs = soup.find('div', class_='_275gt').find_all('dd')
+    for rspec in rspecs:
+        rspec = " ".join(rspec.text.strip().split())
+        right_spec.append(rspec)
+    specs_dict = {left_spec[i].strip(): right_spec[i].strip() for i in range(len(left_spec))}
+
+    left_stocks = []
+    right_stocks = []
+    stocs_counter = 0
+
+    # собираем склады
+    try:
+        quant_stock = soup.find_all('div', class_='_2cZg4')
+        for spec in quant_stock:
+            lspec = spec.find("span", class_='_1u7d6').text.strip()
+            left_stocks.append(lspec)
+            rspec = spec.find("span", class_='_2KVcZ AX0Hx').text.strip()
+            right_stocks.append(rspec)
+
+            try:
+                stocs_counter += keep_only_digits_as_int(rspec)
+            except:
+                pass
+
+        quant_stock_dict = {left_stocks[i].strip(): right_stocks[i].strip() for i in
+                            range(len(right_stocks))}
+    except:
+        quant_stock_dict = {}
+
+    data = {
+        "Полное наименование": name,
+        "Действующая цена": new_price,
+        "Размер скидки": sale,
+        "Единица измерения цены": price_units,
+        "В наличии": stocs,
+        "Ссылка": url,
+        "Дата мониторинга": cur_data,
+        "Время мониторинга": cur_time,
+        "Магазин": "OBI",
+        "Город": city,
+        'Распродажа': on_sale,
+        "Общий остаток": stocs_counter
+    }
+
+    return data | specs_dict | quant_stock_dict
+
+
+def parse_card_bs(pages, url, dataset, cur_data, cur_time):
+    soup = BeautifulSoup(pages['product'], 'lxml')
+    return parse_product_bs(soup, url, cur_data, cur_time, city_from_dataset(dataset))
+
+
+if __name__ == '__main__':
+    from scraper_core.reparse import reparse_main
+    reparse_main(parse_card, SCRIPT_DIR, reference=parse_card_bs)
@@ -1,163 +1,130 @@
 import requests
 from bs4 import BeautifulSoup
-import json
 from datetime import datetime
 import time
 from selenium.webdriver.common.by import By
 import pickle
-import undetected_chromedriver as uc
 import os
+import sys
 
 # from selenium.webdriver.support.ui import WebDriverWait
 # from selenium.webdriver.support import expected_conditions as EC
 
 # Определяем директорию скрипта
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+# Общие модули (scraper_core) лежат в корне репозитория
+sys.path.insert(0, os.path.dirname(SCRIPT_DIR))
+from scraper_core.chrome_driver import DriverSettings, close_driver, new_driver
+from scraper_core.durability import DurabilityPolicy
+from scraper_core.extract import html_tree, select
+from scraper_core.failures import PARSE_ERROR, FailureLedger
+from scraper_core.html_archive import open_archive
+from scraper_core.resource_blocking import DEFAULT_BLOCKLIST, ResourceBlocker
+from scraper_core.storage import open_storage
+from scraper_core.waits import Waits, network_idle, present, rendered
+from Obi_parser import NAME, PRICE, parse_name, parse_product
 cur_data_file = datetime.now().strftime("%m.%Y")
-start_time = time.time()
-
 
-def keep_only_digits_as_int(input_string):
-    digits_str = ''.join(filter(str.isdigit, input_string))
-    return int(digits_str) if digits_str else 0  # Если цифр нет, вернёт 0
+# Политика сохранения карточек: запись каждые N карточек и/или каждые T секунд.
+# Запись идёт в фоновом потоке, загрузка страниц диска не ждёт.
+# Например, DurabilityPolicy(every_records=50, every_seconds=10) — реже fsync, быстрее на HDD
+DURABILITY = DurabilityPolicy(every_records=1, fsync=True)
+
+# Хранилище карточек: 'journal' (JSON + журнал .jsonl) или 'sqlite' (база магазина в режиме WAL).
+# В обоих случаях в конце прохода формируется data_MM.YYYY_*.json для Main_scraping_Russia.py
+STORAGE_BACKEND = 'journal'
+STORAGE_DB = os.path.join(SCRIPT_DIR, 'OBI.sqlite3')
+# Снимки данных каждые 1000 карточек и в конце прохода; хранятся последние N.
+# Восстановление: python -m scraper_core restore <data_MM.YYYY_*.json> [имя снимка]
+SNAPSHOTS_KEEP = 5
+# Архив исходного HTML карточек (сжатый, с дедупликацией) для повторного разбора
+# без загрузки сайта. None — выключен, например: os.path.join(SCRIPT_DIR, 'html_archive')
+HTML_ARCHIVE_DIR = None
+html_archive = open_archive(HTML_ARCHIVE_DIR)
+# Вместо фиксированных пауз браузер ждёт нужных узлов страницы (scraper_core/waits.py).
+# Таймауты в секундах по видам ожидания; фактическое время ожиданий печатается в конце прохода
+WAITS = Waits({
+    'city': 10,      # кнопки выбора города на главной странице
+    'product': 10,   # название и цена карточки
+    'expand': 3,     # после клика «все характеристики» / «наличие» сеть затихла
+    'catalog': 10,   # пагинация и товары на странице каталога
+})
+
+PAGINATION_LINK = select('a', cls='ozZNP')
+CATALOG_ITEM = select('div', cls='FuS7R')
+
+# Ресурсы, которые браузер не загружает (шаблоны адресов по группам, CDP Network.setBlockedURLs;
+# scraper_core/resource_blocking.py): шрифты, картинки, видео, аналитика, виджеты.
+# measure=True — ничего не блокировать, а в конце прохода напечатать, сколько запросов и КБ
+# на страницу пришлось бы на каждую группу (сравните время загрузки с обычным проходом)
+RESOURCES = ResourceBlocker(DEFAULT_BLOCKLIST, measure=False)
+# Браузер (scraper_core/chrome_driver.py): 'eager' — driver.get возвращается, как только готов DOM,
+# дальше парсер ждёт нужных узлов (WAITS); 'normal' — после загрузки всех ресурсов, как раньше.
+# headless=True — без окна, если сайт его пропускает; меньше окно — меньше отрисовки
+DRIVER = DriverSettings(page_load_strategy='eager', headless=False, window_size=(1280, 800))
+
+# Кнопки карточки, раскрывающие характеристики и наличие в магазинах
+EXPAND_BUTTONS = ("//button[@class='_1np8r']", "//button[@class='Rl-jS']")
+start_time = time.time()
 
 
 def end_driver(driver):
     """Безопасное закрытие драйвера браузера"""
-    try:
-        if driver:
-            driver.quit()
-            time.sleep(0.5)
-    except Exception:
-        # Игнорируем ошибки закрытия, например "Неверный дескриптор"
-        pass
+    close_driver(driver, RESOURCES)
 
 
-def load_existing_data(group, city):
-    """Загружает существующие данные из JSON файла текущего месяца"""
+def open_data_storage(group, city):
+    """Открывает хранилище карточек текущего месяца (журнал или SQLite, см. STORAGE_BACKEND)"""
     file_name = f"data_{cur_data_file}_{group}_{city}_obi.json"
-    file_path = os.path.join(SCRIPT_DIR, file_name)
-
-    if os.path.exists(file_path):
-        try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-            print(f"✓ Загружен существующий файл: {file_name}")
-            print(f"✓ Найдено записей: {len(data)}")
-            return data
-        except Exception as e:
-            print(f"⚠ Ошибка при чтении файла: {e}")
-            return []
+    storage = open_storage(os.path.join(SCRIPT_DIR, file_name), STORAGE_BACKEND,
+                           db_path=STORAGE_DB, policy=DURABILITY)
+
+    if storage.exists():
+        print(f"✓ Загружен существующий файл: {file_name}")
+        print(f"✓ Найдено записей: {storage.count()}")
     else:
         print(f"Файл {file_name} не найден, начинаем с нуля")
-        return []
+    return storage
 
 
-def get_processed_urls(existing_data):
-    """Извлекает список уже обработанных URL из существующих данных"""
-    processed = set()
-    for item in existing_data:
-        if 'Ссылка' in item and item['Ссылка']:
-            processed.add(item['Ссылка'])
+def get_processed_urls(storage):
+    """Извлекает список уже обработанных URL из хранилища"""
+    processed = storage.processed_urls()
     print(f"✓ Уже обработано URL: {len(processed)}")
     return processed
 
 
-def save_data_incrementally(data_dict, file_path):
-    """Сохраняет данные после каждой обработанной карточки с принудительной записью на диск"""
-    try:
-        # Сначала записываем во временный файл
-        temp_file = file_path + '.tmp'
-        with open(temp_file, 'w', encoding="utf-8") as json_file:
-            json.dump(data_dict, json_file, indent=4, ensure_ascii=False)
-            json_file.flush()  # Принудительно сбрасываем буфер Python
-            os.fsync(json_file.fileno())  # Принудительно записываем на диск (OS level)
-
-        # Атомарная замена: если запись успешна, заменяем основной файл
-        if os.path.exists(file_path):
-            os.replace(temp_file, file_path)
-        else:
-            os.rename(temp_file, file_path)
-
-    except Exception as e:
-        print(f"✗ Ошибка при сохранении: {e}")
-        # Удаляем временный файл в случае ошибки
-        if os.path.exists(temp_file):
-            try:
-                os.remove(temp_file)
-            except:
-                pass
+def archive_page(url, content, file_path, kind='product'):
+    """Сохраняет исходный HTML карточки в архив (если задан HTML_ARCHIVE_DIR)"""
+    if html_archive is not None:
+        html_archive.put(url, content, dataset=os.path.basename(file_path), kind=kind)
 
 
-def save_backup_copy(data_dict, file_path):
-    """Создает резервную копию, которая перезаписывается при каждом вызове"""
+def save_snapshot(storage):
+    """Снимок данных (жёсткие ссылки, хранятся SNAPSHOTS_KEEP последних поколений)"""
     try:
-        backup_path = file_path.replace('.json', '_BACKUP.json')
-        temp_backup = backup_path + '.tmp'
-
-        with open(temp_backup, 'w', encoding="utf-8") as json_file:
-            json.dump(data_dict, json_file, indent=4, ensure_ascii=False)
-            json_file.flush()
-            os.fsync(json_file.fileno())
-
-        # Заменяем старую резервную копию новой
-        if os.path.exists(backup_path):
-            os.replace(temp_backup, backup_path)
-        else:
-            os.rename(temp_backup, backup_path)
-
-        print(f"💾 Резервная копия обновлена: {len(data_dict)} записей")
-
+        path = storage.snapshot(keep=SNAPSHOTS_KEEP)
+        print(f"💾 Снимок данных: {storage.count()} записей ({os.path.basename(path)})")
     except Exception as e:
-        print(f"⚠ Ошибка создания резервной копии: {e}")
-        if os.path.exists(temp_backup):
-            try:
-                os.remove(temp_backup)
-            except:
-                pass
-
-
-def save_broken_urls(break_line, group, city):
-    """Сохраняет сломанные ссылки в файл"""
-    if break_line:
-        file_path = os.path.join(SCRIPT_DIR, f'url_break_list_{cur_data_file}_{group}_{city}_obi.txt')
-        with open(file_path, 'w', encoding='utf-8') as file:
-            for url in break_line:
-                file.write(f'{url}\n')
+        print(f"⚠ Ошибка создания снимка: {e}")
 
 
 def save_cookies(city_list):
-    options = uc.ChromeOptions()
-    prefs = {
-        "profile.managed_default_content_settings.images": 2,
-        "profile.default_content_setting_values.images": 2,
-        "profile.managed_default_content_settings.media": 2
-    }
-    options.add_experimental_option("prefs", prefs)
-
-    # Инициализация undetected_chromedriver с автоопределением
-    driver = uc.Chrome(
-        options=options,
-        use_subprocess=True,
-        version_main=144  # Указываем версию Chrome явно
-    )
-    time.sleep(5)
+    driver = new_driver(DRIVER, resources=RESOURCES)
     url = 'https://obi.ru/'
-    time.sleep(2)
 
     try:
         for city in city_list:
             xpath_expression = f"//button[@block='StoreItems'][@elem='Item'][text()='{city}']"
 
             driver.get(url=url)
-            time.sleep(2)
-            show_password = driver.find_element(By.XPATH, "//button[@class='nbbcX']").click()
-            time.sleep(1)
-            email_input = driver.find_element(By.XPATH, "//button[@class='_2eEQG _2xhLm _1k0NU _3aV4_']").click()
-            time.sleep(1)
+            # Каждая кнопка появляется после клика по предыдущей
+            WAITS.until(driver, 'city', present("//button[@class='nbbcX']")).click()
+            WAITS.until(driver, 'city', present("//button[@class='_2eEQG _2xhLm _1k0NU _3aV4_']")).click()
             # Выбираем город из списка и клацаем
-            element = driver.find_element(By.XPATH, xpath_expression).click()
-            time.sleep(1)
+            WAITS.until(driver, 'city', present(xpath_expression)).click()
+            # Город сохраняется в cookies ответом сайта — ждём, пока запросы закончатся
+            WAITS.until(driver, 'city', network_idle(), required=False)
             # записываем печеньки
             cookie_path = os.path.join(SCRIPT_DIR, f'cookies_{city}')
             pickle.dump(driver.get_cookies(), open(cookie_path, 'wb'))
@@ -168,21 +135,25 @@ def save_cookies(city_list):
         end_driver(driver)
 
 
+def load_product(driver, url, timeout=None):
+    """Открывает карточку и раскрывает характеристики и наличие (ожидания вместо пауз)"""
+    with RESOURCES.page(driver):
+        driver.get(url=url)
+        # Не дождались (капча, 404) — разбираем то, что есть
+        WAITS.until(driver, 'product', present(NAME, PRICE), timeout=timeout, required=False)
+        for xpath in EXPAND_BUTTONS:
+            try:
+                buttons = driver.find_elements(By.XPATH, xpath)
+                if buttons:
+                    driver.execute_script("arguments[0].click();", buttons[0])
+                    WAITS.until(driver, 'expand', network_idle(quiet=0.3), required=False)
+            except Exception:
+                # Кнопки нет или она пропала при перерисовке — карточка разбирается без неё
+                pass
+
+
 def get_url_tile(city_list):
-    options = uc.ChromeOptions()
-    prefs = {
-        "profile.managed_default_content_settings.images": 2,
-        "profile.default_content_setting_values.images": 2,
-        "profile.managed_default_content_settings.media": 2
-    }
-    options.add_experimental_option("prefs", prefs)
-
-    # Инициализация undetected_chromedriver с автоопределением
-    driver = uc.Chrome(
-        options=options,
-        use_subprocess=True,
-        version_main=144  # Указываем версию Chrome явно
-    )
+    driver = new_driver(DRIVER, resources=RESOURCES)
     try:
         for city in city_list:
             url = 'https://obi.ru/'
@@ -200,6 +171,7 @@ def get_url_tile(city_list):
             for url in url_group_list:
                 # заходим на страницу группы и собираем количество страниц
                 driver.get(url=url)
+                WAITS.until(driver, 'catalog', present(PAGINATION_LINK), required=False)
                 content = driver.page_source
                 soup = BeautifulSoup(content, 'lxml')
 
@@ -211,6 +183,7 @@ def get_url_tile(city_list):
                     line = f'{url}?page={i}'
 
                     driver.get(url=line)
+                    WAITS.until(driver, 'catalog', rendered(CATALOG_ITEM), required=False)
                     content = driver.page_source
                     soup = BeautifulSoup(content, 'lxml')
                     pages = soup.find('div', class_='_2PE29 bm0E6 _1KBT4').find_all('div', class_='FuS7R')
@@ -236,20 +209,7 @@ def get_url_tile(city_list):
 
 
 def get_data(city_list):
-    options = uc.ChromeOptions()
-    prefs = {
-        "profile.managed_default_content_settings.images": 2,
-        "profile.default_content_setting_values.images": 2,
-        "profile.managed_default_content_settings.media": 2
-    }
-    options.add_experimental_option("prefs", prefs)
-
-    # Инициализация undetected_chromedriver с автоопределением
-    driver = uc.Chrome(
-        options=options,
-        use_subprocess=True,
-        version_main=144  # Указываем версию Chrome явно
-    )
+    driver = new_driver(DRIVER, resources=RESOURCES)
 
     try:
         for city in city_list:
@@ -272,8 +232,11 @@ def get_data(city_list):
                 print("="*60)
 
                 # 1. Загружаем существующие данные
-                data_dict = load_existing_data(group, city)
-                processed_urls = get_processed_urls(data_dict)
+                storage = open_data_storage(group, city)
+                processed_urls = get_processed_urls(storage)
+                file_path = os.path.join(SCRIPT_DIR, f"data_{cur_data_file}_{group}_{city}_obi.json")
+                # Журнал неудачных загрузок (класс ошибки, число попыток, время)
+                failures = FailureLedger(file_path)
 
                 # 2. Читаем список URL
                 url_file_path = os.path.join(SCRIPT_DIR, f'url_list_{cur_data_file}_{group}_{city}_obi.txt')
@@ -286,158 +249,69 @@ def get_data(city_list):
                     all_lines = [line.strip() for line in file.readlines()]
                     all_lines = list(set(all_lines))  # Удаляем дубликаты
 
-                # 3. Фильтруем - пропускаем уже обработанные
+                # 3. Фильтруем - пропускаем уже обработанные и постоянные ошибки (404)
                 lines = [line for line in all_lines if line not in processed_urls]
+                permanent = [line for line in lines if failures.is_permanent(line)]
+                if permanent:
+                    lines = [line for line in lines if not failures.is_permanent(line)]
 
                 print(f"Всего URL в файле: {len(all_lines)}")
                 print(f"Уже обработано: {len(processed_urls)}")
+                print(f"Постоянные ошибки (пропуск): {len(permanent)}")
                 print(f"Осталось обработать: {len(lines)}")
                 print("="*60 + "\n")
 
                 if not lines:
                     print("✓ Все URL уже обработаны!")
+                    storage.finalize()
                     continue
 
-                break_line = []
-                file_path = os.path.join(SCRIPT_DIR, f"data_{cur_data_file}_{group}_{city}_obi.json")
                 total_urls = len(lines)
                 processed_count = 0
 
                 for idx, line in enumerate(lines, 1):
+                    content = None
                     try:
                         print(f"\n[{idx}/{total_urls}] Загрузка: {line}")
-                        driver.get(url=line)
-
-                        try:
-                            element = driver.find_element(By.XPATH, "//button[@class='_1np8r']")
-                            driver.execute_script("arguments[0].click();", element)
-                            time.sleep(1)
-                        except:
-                            pass
-
-                        try:
-                            element = driver.find_element(By.XPATH, "//button[@class='Rl-jS']")
-                            driver.execute_script("arguments[0].click();", element)
-                            time.sleep(1)
-                        except:
-                            pass
+                        load_product(driver, line)
 
                         content = driver.page_source
-                        soup = BeautifulSoup(content, 'lxml')
+                        tree = html_tree(content)
+                        archive_page(line, content, file_path)
                         cur_data = datetime.now().strftime("%d.%m.%Y")
                         cur_time = datetime.now().strftime("%H:%M")
 
-                        try:
-                            name = soup.find("h2", class_='_3LdDm').text.strip()
-                        except:
-                            name = "None"
-
-                        try:
-                            price_units = soup.find("span", class_='_3SDdj').text.strip()
-                        except:
-                            price_units = 'Error'
-
-                        try:
-                            new_price = soup.find("span", class_='_3IeOW').text.strip()
-                        except:
-                            new_price = 'Error'
-
-                        try:
-                            sale = soup.find('div', class_='i7rKk').find('div', class_='JpZgV').text.strip()
-                        except:
-                            sale = None
-
-                        try:
-                            stocs = " ".join(soup.find("span", class_="_2KVcZ AX0Hx").text.strip().split())
-                        except:
-                            stocs = "Error"
-
-                        try:
-                            on_sale = soup.find('ul', class_='_1IX-e _1oifM').text.strip()
-                        except:
-                            on_sale = None
-
-                        left_spec = []
-                        right_spec = []
-
-                        specs = soup.find('div', class_='_275gt').find_all('dt')
-                        for spec in specs:
-                            spec = " ".join(spec.text.strip().split())
-                            left_spec.append(spec)
-
-                        rspecs = soup.find('div', class_='_275gt').find_all('dd')
-                        for rspec in rspecs:
-                            rspec = " ".join(rspec.text.strip().split())
-                            right_spec.append(rspec)
-                        specs_dict = {left_spec[i].strip(): right_spec[i].strip() for i in range(len(left_spec))}
-
-                        left_stocks = []
-                        right_stocks = []
-                        stocs_counter = 0
-
-                        # собираем склады
-                        try:
-                            quant_stock = soup.find_all('div', class_='_2cZg4')
-                            for spec in quant_stock:
-                                lspec = spec.find("span", class_='_1u7d6').text.strip()
-                                left_stocks.append(lspec)
-                                rspec = spec.find("span", class_='_2KVcZ AX0Hx').text.strip()
-                                right_stocks.append(rspec)
-
-                                try:
-                                    stocs_counter += keep_only_digits_as_int(rspec)
-                                except:
-                                    pass
-
-                            quant_stock_dict = {left_stocks[i].strip(): right_stocks[i].strip() for i in
-                                                range(len(right_stocks))}
-                        except:
-                            quant_stock_dict = {}
-
-                        data = {
-                            "Полное наименование": name,
-                            "Действующая цена": new_price,
-                            "Размер скидки": sale,
-                            "Единица измерения цены": price_units,
-                            "В наличии": stocs,
-                            "Ссылка": line,
-                            "Дата мониторинга": cur_data,
-                            "Время мониторинга": cur_time,
-                            "Магазин": "OBI",
-                            "Город": city,
-                            'Распродажа': on_sale,
-                            "Общий остаток": stocs_counter
-                        }
-
-                        data_dict.append(data | specs_dict | quant_stock_dict)
+                        card = parse_product(tree, line, cur_data, cur_time, city)
 
                         # СОХРАНЕНИЕ ПОСЛЕ КАЖДОЙ КАРТОЧКИ (защита от сбоев)
-                        save_data_incrementally(data_dict, file_path)
+                        storage.append(card)
+                        failures.resolve(line)
 
-                        # РЕЗЕРВНОЕ КОПИРОВАНИЕ каждые 1000 записей
-                        if len(data_dict) % 1000 == 0:
-                            save_backup_copy(data_dict, file_path)
+                        # СНИМОК ДАННЫХ каждые 1000 записей
+                        if storage.count() % 1000 == 0:
+                            save_snapshot(storage)
 
-                        print(f'✓ Обработано: {idx}/{total_urls} | Всего в базе: {len(data_dict)}')
+                        print(f'✓ Обработано: {idx}/{total_urls} | Всего в базе: {storage.count()}')
                         processed_count += 1
 
                     except Exception as e:
-                        break_line.append(line)
-                        print(f'✗ Ошибка ({idx}/{total_urls}): {str(e)[:100]}')
-                        # Даже при ошибке сохраняем то, что успели
-                        save_data_incrementally(data_dict, file_path)
+                        failure = failures.record(line, e, content)
+                        print(f'✗ Ошибка {failure["kind"]} ({idx}/{total_urls}): {str(e)[:100]}')
 
                 print(f'\n✓ Обработано новых: {processed_count}')
-                print(f'✗ Ошибок: {len(break_line)}')
-                print(f'✓ Всего в базе: {len(data_dict)}')
+                print(f'✗ Ошибок: {len(failures.failed_now)}')
+                print(f'✓ Всего в базе: {storage.count()}')
 
-                # Финальная резервная копия
-                if len(data_dict) > 0:
-                    save_backup_copy(data_dict, file_path)
+                # Формируем итоговый JSON, финальный снимок
+                storage.finalize()
+                if storage.count() > 0:
+                    save_snapshot(storage)
 
-                # Сохраняем сломанные ссылки
-                if break_line:
-                    save_broken_urls(break_line, group, city)
+                # Неудачные загрузки (для повторного прохода)
+                failures.print_summary(processed_urls)
+                WAITS.print_summary()
+                RESOURCES.print_summary()
+                failures.close()
 
     except Exception as ex:
         print(f"✗ Критическая ошибка: {ex}")
@@ -447,20 +321,7 @@ def get_data(city_list):
 
 def retry_broken_urls(city_list):
     """Повторная попытка обработки сломанных ссылок"""
-    options = uc.ChromeOptions()
-    prefs = {
-        "profile.managed_default_content_settings.images": 2,
-        "profile.default_content_setting_values.images": 2,
-        "profile.managed_default_content_settings.media": 2
-    }
-    options.add_experimental_option("prefs", prefs)
-
-    # Инициализация undetected_chromedriver с автоопределением
-    driver = uc.Chrome(
-        options=options,
-        use_subprocess=True,
-        version_main=144  # Указываем версию Chrome явно
-    )
+    driver = new_driver(DRIVER, resources=RESOURCES)
 
     try:
         for city in city_list:
@@ -483,188 +344,77 @@ def retry_broken_urls(city_list):
                 print("="*60)
 
                 # 1. Загружаем существующие данные
-                data_dict = load_existing_data(group, city)
-                processed_urls = get_processed_urls(data_dict)
-
-                # 2. Проверяем наличие файла со сломанными ссылками
-                broken_urls_file = os.path.join(SCRIPT_DIR, f'url_break_list_{cur_data_file}_{group}_{city}_obi.txt')
-
-                if not os.path.exists(broken_urls_file):
-                    print(f"✓ Файл со сломанными ссылками не найден")
-                    continue
-
-                # 3. Читаем список сломанных URL
-                with open(broken_urls_file, 'r', encoding='utf-8') as file:
-                    all_broken_urls = [line.strip() for line in file.readlines() if line.strip()]
-
-                # 4. Фильтруем - пропускаем уже обработанные
-                lines = [line for line in all_broken_urls if line not in processed_urls]
+                storage = open_data_storage(group, city)
+                processed_urls = get_processed_urls(storage)
+                file_path = os.path.join(SCRIPT_DIR, f"data_{cur_data_file}_{group}_{city}_obi.json")
+                failures = FailureLedger(file_path)
 
-                print(f"Всего сломанных URL: {len(all_broken_urls)}")
-                print(f"Уже обработано ранее: {len(all_broken_urls) - len(lines)}")
-                print(f"К повторной обработке: {len(lines)}")
+                # 2. Из журнала неудач берём только URL, у которых истекла пауза;
+                # уже обработанные и постоянные ошибки (404, исчерпан лимит попыток) пропускаем
+                lines = failures.due_for_retry(processed_urls)
                 print("="*60 + "\n")
 
                 if not lines:
-                    print("✓ Все сломанные URL уже обработаны!")
+                    print("✓ Нет ссылок, готовых к повторной обработке")
+                    storage.finalize()
                     continue
 
-                break_line = []
-                file_path = os.path.join(SCRIPT_DIR, f"data_{cur_data_file}_{group}_{city}_obi.json")
                 total_urls = len(lines)
                 processed_count = 0
 
-                # 5. Обрабатываем каждый сломанный URL
+                # 3. Обрабатываем каждый сломанный URL
                 for idx, line in enumerate(lines, 1):
+                    content = None
                     try:
                         print(f"\n[{idx}/{total_urls}] Повторная загрузка: {line}")
-                        driver.get(url=line)
-                        time.sleep(3)  # Увеличенное ожидание для проблемных ссылок
-
-                        try:
-                            element = driver.find_element(By.XPATH, "//button[@class='_1np8r']")
-                            driver.execute_script("arguments[0].click();", element)
-                            time.sleep(1)
-                        except:
-                            pass
-
-                        try:
-                            element = driver.find_element(By.XPATH, "//button[@class='Rl-jS']")
-                            driver.execute_script("arguments[0].click();", element)
-                            time.sleep(1)
-                        except:
-                            pass
+                        # Увеличенный таймаут для проблемных ссылок
+                        load_product(driver, line, timeout=WAITS.timeout('product') * 2)
 
                         content = driver.page_source
-                        soup = BeautifulSoup(content, 'lxml')
+                        tree = html_tree(content)
+                        archive_page(line, content, file_path)
                         cur_data = datetime.now().strftime("%d.%m.%Y")
                         cur_time = datetime.now().strftime("%H:%M")
 
-                        try:
-                            name = soup.find("h2", class_='_3LdDm').text.strip()
-                        except:
-                            name = "None"
-
-                        if name == "None":
-                            print(f"⚠ Пропуск: название по-прежнему недоступно")
-                            break_line.append(line)
+                        if parse_name(tree) == "None":
+                            failure = failures.record(line, PARSE_ERROR, content)
+                            print(f"⚠ Пропуск: название по-прежнему недоступно ({failure['kind']})")
                             continue
 
-                        try:
-                            price_units = soup.find("span", class_='_3SDdj').text.strip()
-                        except:
-                            price_units = 'Error'
-
-                        try:
-                            new_price = soup.find("span", class_='_3IeOW').text.strip()
-                        except:
-                            new_price = 'Error'
-
-                        try:
-                            sale = soup.find('div', class_='i7rKk').find('div', class_='JpZgV').text.strip()
-                        except:
-                            sale = None
-
-                        try:
-                            stocs = " ".join(soup.find("span", class_="_2KVcZ AX0Hx").text.strip().split())
-                        except:
-                            stocs = "Error"
+                        card = parse_product(tree, line, cur_data, cur_time, city)
 
-                        try:
-                            on_sale = soup.find('ul', class_='_1IX-e _1oifM').text.strip()
-                        except:
-                            on_sale = None
-
-                        left_spec = []
-                        right_spec = []
-
-                        specs = soup.find('div', class_='_275gt').find_all('dt')
-                        for spec in specs:
-                            spec = " ".join(spec.text.strip().split())
-                            left_spec.append(spec)
-
-                        rspecs = soup.find('div', class_='_275gt').find_all('dd')
-                        for rspec in rspecs:
-                            rspec = " ".join(rspec.text.strip().split())
-                            right_spec.append(rspec)
-                        specs_dict = {left_spec[i].strip(): right_spec[i].strip() for i in range(len(left_spec))}
+                        # СОХРАНЕНИЕ ПОСЛЕ КАЖДОЙ КАРТОЧКИ (защита от сбоев)
+                        storage.append(card)
+                        failures.resolve(line)
 
-                        left_stocks = []
-                        right_stocks = []
-                        stocs_counter = 0
-
-                        try:
-                            quant_stock = soup.find_all('div', class_='_2cZg4')
-                            for spec in quant_stock:
-                                lspec = spec.find("span", class_='_1u7d6').text.strip()
-                                left_stocks.append(lspec)
-                                rspec = spec.find("span", class_='_2KVcZ AX0Hx').text.strip()
-                                right_stocks.append(rspec)
-
-                                try:
-                                    stocs_counter += keep_only_digits_as_int(rspec)
-                                except:
-                                    pass
-
-                            quant_stock_dict = {left_stocks[i].strip(): right_stocks[i].strip() for i in
-                                                range(len(right_stocks))}
-                        except:
-                            quant_stock_dict = {}
-
-                        data = {
-                            "Полное наименование": name,
-                            "Действующая цена": new_price,
-                            "Размер скидки": sale,
-                            "Единица измерения цены": price_units,
-                            "В наличии": stocs,
-                            "Ссылка": line,
-                            "Дата мониторинга": cur_data,
-                            "Время мониторинга": cur_time,
-                            "Магазин": "OBI",
-                            "Город": city,
-                            'Распродажа': on_sale,
-                            "Общий остаток": stocs_counter
-                        }
-
-                        data_dict.append(data | specs_dict | quant_stock_dict)
-
-                        # СОХРАНЕНИЕ ПОСЛЕ КАЖДОЙ КАРТОЧКИ
-                        save_data_incrementally(data_dict, file_path)
-
-                        # РЕЗЕРВНОЕ КОПИРОВАНИЕ каждые 1000 записей
-                        if len(data_dict) % 1000 == 0:
-                            save_backup_copy(data_dict, file_path)
+                        # СНИМОК ДАННЫХ каждые 1000 записей
+                        if storage.count() % 1000 == 0:
+                            save_snapshot(storage)
 
                         print(f"✓ Успешно обработано [{idx}/{total_urls}]")
                         processed_count += 1
 
                     except Exception as e:
-                        break_line.append(line)
-                        print(f'✗ Ошибка повторной обработки ({idx}/{total_urls}): {str(e)[:100]}')
-                        save_data_incrementally(data_dict, file_path)
+                        failure = failures.record(line, e, content)
+                        print(f'✗ Ошибка повторной обработки {failure["kind"]} ({idx}/{total_urls}): {str(e)[:100]}')
 
                 print(f'\n{"="*60}')
                 print(f'✓ Успешно обработано: {processed_count}')
-                print(f'✗ Всё ещё сломано: {len(break_line)}')
-                print(f'✓ Всего записей в базе: {len(data_dict)}')
+                print(f'✗ Всё ещё сломано: {len(failures.failed_now)}')
+                print(f'✓ Всего записей в базе: {storage.count()}')
                 print("="*60)
 
-                # Финальная резервная копия
-                if len(data_dict) > 0:
-                    save_backup_copy(data_dict, file_path)
-
-                # Обновляем список сломанных ссылок
-                if break_line:
-                    save_broken_urls(break_line, group, city)
-                    print(f"\n✓ Обновлён список сломанных ссылок: {len(break_line)} шт.")
-                else:
-                    # Удаляем файл со сломанными ссылками, если все успешно
-                    try:
-                        if os.path.exists(broken_urls_file):
-                            os.remove(broken_urls_file)
-                            print(f"\n✓ Все ссылки успешно обработаны! Файл {broken_urls_file} удалён.")
-                    except:
-                        pass
+                # Формируем итоговый JSON, финальный снимок
+                storage.finalize()
+                if storage.count() > 0:
+                    save_snapshot(storage)
+
+                # Итог по журналу неудач
+                print()
+                failures.print_summary(processed_urls)
+                WAITS.print_summary()
+                RESOURCES.print_summary()
+                failures.close()
 
     except Exception as ex:
         print(f"✗ Критическая ошибка: {ex}")
@@ -1,37 +1,92 @@
-import json
+import asyncio
 import time
 import os
+import sys
 import pickle
-import undetected_chromedriver as uc
 from bs4 import BeautifulSoup
 from datetime import datetime
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.webdriver.common.by import By
+from functools import partial
 from selenium.common.exceptions import NoSuchElementException, ElementNotInteractableException
 
 start_time = time.time()
 
 # Определяем директорию скрипта
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+# Общие модули (scraper_core) лежат в корне репозитория
+sys.path.insert(0, os.path.dirname(SCRIPT_DIR))
+from scraper_core.async_writer import AsyncWriter
+from scraper_core.chrome_driver import DriverSettings, close_driver, new_driver
+from scraper_core.concurrency import AimdLimiter
+from scraper_core.durability import DurabilityPolicy
+from scraper_core.extract import find, html_tree, select
+from scraper_core.failures import PARSE_ERROR, FailureLedger
+from scraper_core.fetch_engine import HostBudget
+from scraper_core.html_archive import open_archive
+from scraper_core.http_session import HttpSettings
+from scraper_core.hybrid_fetch import HybridFetcher
+from scraper_core.resource_blocking import DEFAULT_BLOCKLIST, ResourceBlocker
+from scraper_core.retry import RetryPolicy
+from scraper_core.storage import open_storage
+from scraper_core.waits import Waits, all_of, network_idle, present, rendered
+from scraper_core.work_queue import WorkQueue
+from Petrovich_parser import keep_only_digits_as_int, parse_name, parse_product
+from Petrovich_parser import GOLD_PRICE, NAME, PRICE_BLOCK, PROPERTIES, SALE_BLOCK
 COOKIES_FILE = os.path.join(SCRIPT_DIR, 'petrovich_cookies.pkl')
 cur_data_file = datetime.now().strftime("%m.%Y")
 
-
-def keep_only_digits_as_int(input_string):
-    digits_str = ''.join(filter(str.isdigit, input_string))
-    return int(digits_str) if digits_str else 0  # Если цифр нет, вернёт 0
+# Политика сохранения карточек: запись каждые N карточек и/или каждые T секунд.
+# Запись идёт в фоновом потоке, загрузка страниц диска не ждёт.
+# Например, DurabilityPolicy(every_records=50, every_seconds=10) — реже fsync, быстрее на HDD
+DURABILITY = DurabilityPolicy(every_records=1, fsync=True)
+
+# Хранилище карточек: 'journal' (JSON + журнал .jsonl) или 'sqlite' (база магазина в режиме WAL).
+# В обоих случаях в конце прохода формируется data_MM.YYYY_*.json для Main_scraping_Russia.py
+STORAGE_BACKEND = 'journal'
+STORAGE_DB = os.path.join(SCRIPT_DIR, 'Petrovich.sqlite3')
+# Снимки данных каждые 1000 карточек и в конце прохода; хранятся последние N.
+# Восстановление: python -m scraper_core restore <data_MM.YYYY_*.json> [имя снимка]
+SNAPSHOTS_KEEP = 5
+# Архив исходного HTML карточек (сжатый, с дедупликацией) для повторного разбора
+# без загрузки сайта. None — выключен, например: os.path.join(SCRIPT_DIR, 'html_archive')
+HTML_ARCHIVE_DIR = None
+html_archive = open_archive(HTML_ARCHIVE_DIR)
+# Вместо фиксированных пауз браузер ждёт нужных узлов страницы (scraper_core/waits.py).
+# Таймауты в секундах по видам ожидания; фактическое время ожиданий печатается в конце прохода
+WAITS = Waits({
+    'home': 10,      # главная страница загрузилась и сеть затихла (cookies, проверка капчи)
+    'catalog': 10,   # счётчик и ссылки на товары на странице каталога
+    'product': 10,   # название и блок цены карточки
+})
+
+# Загрузка карточек: 'browser' — каждая страница в Chrome, как раньше; 'hybrid' — браузер только
+# для cookies (капча), страницы загружаются по HTTP параллельно с его сессией
+# (scraper_core/hybrid_fetch.py). Капча, 403/429 и страницы без цены загружаются в браузере;
+# после HYBRID_BLOCK_LIMIT таких страниц подряд проход продолжается только через браузер
+FETCH_MODE = 'browser'
+HYBRID_BLOCK_LIMIT = 5
+# Окно одновременных HTTP-запросов (AIMD) и не больше HTTP_RATE_LIMIT запросов в секунду
+HTTP_CONCURRENCY = AimdLimiter(initial=4, min_limit=1, max_limit=8)
+HTTP_RATE_LIMIT = 5
+HTTP_SETTINGS = HttpSettings(limit_per_host=HTTP_CONCURRENCY.max_limit, total_timeout=30)
+HTTP_RETRY = RetryPolicy(max_attempts=3, base_delay=1.0, max_delay=20.0, run_budget=500)
+
+# Ресурсы, которые браузер не загружает (шаблоны адресов по группам, CDP Network.setBlockedURLs;
+# scraper_core/resource_blocking.py): шрифты, картинки, видео, аналитика, виджеты.
+# measure=True — ничего не блокировать, а в конце прохода напечатать, сколько запросов и КБ
+# на страницу пришлось бы на каждую группу (сравните время загрузки с обычным проходом)
+RESOURCES = ResourceBlocker(DEFAULT_BLOCKLIST, measure=False)
+# Браузер (scraper_core/chrome_driver.py): 'eager' — driver.get возвращается, как только готов DOM,
+# дальше парсер ждёт нужных узлов (WAITS); 'normal' — после загрузки всех ресурсов, как раньше.
+# headless=True — без окна, если сайт его пропускает (браузер для ручной капчи всегда с окном)
+DRIVER = DriverSettings(page_load_strategy='eager', headless=False, window_size=(1280, 800))
+
+PRODUCTS_COUNTER = select('p', attrs={'data-test': 'products-counter'})
+PRODUCT_LINK = select('a', attrs={'data-test': 'product-link'})
 
 
 def end_driver(driver):
     """Безопасное закрытие драйвера браузера"""
-    try:
-        if driver:
-            driver.quit()
-            time.sleep(0.5)
-    except Exception:
-        # Игнорируем ошибки закрытия, например "Неверный дескриптор"
-        pass
+    close_driver(driver, RESOURCES)
 
 
 def save_cookies(driver):
@@ -65,21 +120,10 @@ def load_cookies(driver):
 
 def _create_driver(block_images=True):
     """Создает драйвер с опциональной блокировкой изображений"""
-    options = uc.ChromeOptions()
     if block_images:
-        prefs = {
-            "profile.managed_default_content_settings.images": 2,
-            "profile.default_content_setting_values.images": 2,
-            "profile.managed_default_content_settings.media": 2
-        }
-        options.add_experimental_option("prefs", prefs)
-
-    driver = uc.Chrome(
-        options=options,
-        use_subprocess=True,
-        version_main=144
-    )
-    return driver
+        return new_driver(DRIVER, resources=RESOURCES)
+    # Браузер для капчи загружает страницу целиком (картинки и виджеты капчи нужны) и с окном
+    return new_driver(DRIVER.replace(block_images=False, headless=False))
 
 
 def init_driver_with_cookies():
@@ -89,10 +133,10 @@ def init_driver_with_cookies():
     if os.path.exists(COOKIES_FILE):
         driver = _create_driver(block_images=True)
         driver.get("https://petrovich.ru")
-        time.sleep(2)
+        WAITS.until(driver, 'home', network_idle(), required=False)
         load_cookies(driver)
         driver.get("https://petrovich.ru")
-        time.sleep(2)
+        WAITS.until(driver, 'home', network_idle(), required=False)
 
         if not _is_captcha_present(driver):
             print("[OK] Cookies работают, капчи нет")
@@ -106,7 +150,7 @@ def init_driver_with_cookies():
     print("[...] Открываю браузер с картинками для решения капчи...")
     driver = _create_driver(block_images=False)
     driver.get("https://petrovich.ru")
-    time.sleep(2)
+    WAITS.until(driver, 'home', network_idle(), required=False)
 
     if _is_captcha_present(driver):
         _wait_for_manual_captcha(driver)
@@ -116,10 +160,10 @@ def init_driver_with_cookies():
     # 3. Создаем рабочий драйвер БЕЗ картинок + свежие cookies
     driver = _create_driver(block_images=True)
     driver.get("https://petrovich.ru")
-    time.sleep(2)
+    WAITS.until(driver, 'home', network_idle(), required=False)
     load_cookies(driver)
     driver.get("https://petrovich.ru")
-    time.sleep(2)
+    WAITS.until(driver, 'home', network_idle(), required=False)
     print("[OK] Рабочий драйвер готов")
 
     return driver
@@ -140,101 +184,122 @@ def _wait_for_manual_captcha(driver):
     print("После решения нажмите Enter здесь...")
     print("=" * 60)
     input("> ")
-    time.sleep(2)
+    WAITS.until(driver, 'home', network_idle(), required=False)
     print("[OK] Капча решена, продолжаем работу")
 
 
-def load_existing_data(group):
-    """Загружает существующие данные из JSON файла текущего месяца"""
-    file_name = f"data_{cur_data_file}_{group}_Petrovich.json"
-    file_path = os.path.join(SCRIPT_DIR, file_name)
+def wait_product(driver, timeout=None):
+    """Ждёт название и цену карточки; не дождались (капча, 404) — разбираем то, что есть"""
+    WAITS.until(driver, 'product', all_of(present(NAME), present(GOLD_PRICE, SALE_BLOCK, PRICE_BLOCK)),
+                timeout=timeout, required=False)
+
+
+def page_complete(html):
+    """Страница пришла целиком: название, блок цены (как в wait_product) и характеристики"""
+    tree = html_tree(html)
+    return (parse_name(tree) is not None and find(tree, PROPERTIES) is not None
+            and any(find(tree, block) is not None for block in (GOLD_PRICE, SALE_BLOCK, PRICE_BLOCK)))
+
+
+def load_in_browser(driver, url, timeout=None):
+    """Загрузка карточки в браузере (гибридный режим: капча или неполная страница по HTTP)"""
+    with RESOURCES.page(driver):
+        driver.get(url=url)
+        wait_product(driver, timeout)
+    return driver.page_source
 
-    if os.path.exists(file_path):
+
+async def process_urls_hybrid(driver, lines, storage, failures, file_path, timeout=None, retry=False):
+    """Карточки по HTTP с cookies браузера (FETCH_MODE = 'hybrid'); разбор и запись — в потоке записи"""
+    total_urls = len(lines)
+    counts = {'processed': 0}
+    hybrid = HybridFetcher(driver, partial(load_in_browser, timeout=timeout), page_complete, HYBRID_BLOCK_LIMIT)
+    label = 'повторной обработки ' if retry else ''
+
+    def save(idx, line, html, source, error):
+        if error is not None:
+            failure = failures.record(line, error)
+            print(f'✗ Ошибка {label}{failure["kind"]} ({idx}/{total_urls}): {str(error)[:100]}')
+            return
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-            print(f"✓ Загружен существующий файл: {file_name}")
-            print(f"✓ Найдено записей: {len(data)}")
-            return data
-        except Exception as e:
-            print(f"⚠ Ошибка при чтении файла: {e}")
-            return []
-    else:
-        print(f"Файл {file_name} не найден, начинаем с нуля")
-        return []
+            tree = html_tree(html)
+            archive_page(line, html, file_path)
+            cur_data = datetime.now().strftime("%d.%m.%Y")
+            cur_time = datetime.now().strftime("%H:%M")
 
+            if retry and not parse_name(tree):
+                failure = failures.record(line, PARSE_ERROR, html)
+                print(f"⚠ Пропуск: название по-прежнему недоступно ({failure['kind']})")
+                return
 
-def get_processed_urls(existing_data):
-    """Извлекает список уже обработанных URL из существующих данных"""
-    processed = set()
-    for item in existing_data:
-        if 'Ссылка' in item and item['Ссылка']:
-            processed.add(item['Ссылка'])
-    print(f"✓ Уже обработано URL: {len(processed)}")
-    return processed
+            card = parse_product(tree, line, cur_data, cur_time)
 
+            # СОХРАНЕНИЕ ПОСЛЕ КАЖДОЙ КАРТОЧКИ (защита от сбоев)
+            storage.append(card)
+            failures.resolve(line)
 
-def save_data_incrementally(data_dict, file_path):
-    """Сохраняет данные после каждой обработанной карточки с принудительной записью на диск"""
-    try:
-        # Сначала записываем во временный файл
-        temp_file = file_path + '.tmp'
-        with open(temp_file, 'w', encoding="utf-8") as json_file:
-            json.dump(data_dict, json_file, indent=4, ensure_ascii=False)
-            json_file.flush()  # Принудительно сбрасываем буфер Python
-            os.fsync(json_file.fileno())  # Принудительно записываем на диск (OS level)
-
-        # Атомарная замена: если запись успешна, заменяем основной файл
-        if os.path.exists(file_path):
-            os.replace(temp_file, file_path)
-        else:
-            os.rename(temp_file, file_path)
+            # СНИМОК ДАННЫХ каждые 1000 записей
+            if storage.count() % 1000 == 0:
+                save_snapshot(storage)
 
-    except Exception as e:
-        print(f"✗ Ошибка при сохранении: {e}")
-        # Удаляем временный файл в случае ошибки
-        if os.path.exists(temp_file):
-            try:
-                os.remove(temp_file)
-            except:
-                pass
+            print(f'✓ Обработано ({source}): {idx}/{total_urls} | Всего в базе: {storage.count()}')
+            counts['processed'] += 1
 
+        except Exception as e:
+            failure = failures.record(line, e, html)
+            print(f'✗ Ошибка {label}{failure["kind"]} ({idx}/{total_urls}): {str(e)[:100]}')
 
-def save_backup_copy(data_dict, file_path):
-    """Создает резервную копию, которая перезаписывается при каждом вызове"""
-    try:
-        backup_path = file_path.replace('.json', '_BACKUP.json')
-        temp_backup = backup_path + '.tmp'
+    async def process_item(item):
+        idx, line = item
+        try:
+            html, source = await hybrid.fetch(line)
+        except Exception as e:
+            await writer.submit(save, idx, line, None, None, e)
+            return
+        await writer.submit(save, idx, line, html, source, None)
 
-        with open(temp_backup, 'w', encoding="utf-8") as json_file:
-            json.dump(data_dict, json_file, indent=4, ensure_ascii=False)
-            json_file.flush()
-            os.fsync(json_file.fileno())
+    budget = HostBudget(rate=HTTP_RATE_LIMIT, limiter=HTTP_CONCURRENCY)
+    async with AsyncWriter() as writer, \
+            hybrid.open_engine(HTTP_SETTINGS, hosts={'petrovich.ru': budget}, retry=HTTP_RETRY):
+        await WorkQueue(process_item, workers=HTTP_CONCURRENCY.max_limit).run(enumerate(lines, 1))
+    hybrid.print_summary()
+    return counts['processed']
 
-        # Заменяем старую резервную копию новой
-        if os.path.exists(backup_path):
-            os.replace(temp_backup, backup_path)
-        else:
-            os.rename(temp_backup, backup_path)
 
-        print(f"💾 Резервная копия обновлена: {len(data_dict)} записей")
+def open_data_storage(group):
+    """Открывает хранилище карточек текущего месяца (журнал или SQLite, см. STORAGE_BACKEND)"""
+    file_name = f"data_{cur_data_file}_{group}_Petrovich.json"
+    storage = open_storage(os.path.join(SCRIPT_DIR, file_name), STORAGE_BACKEND,
+                           db_path=STORAGE_DB, policy=DURABILITY)
+
+    if storage.exists():
+        print(f"✓ Загружен существующий файл: {file_name}")
+        print(f"✓ Найдено записей: {storage.count()}")
+    else:
+        print(f"Файл {file_name} не найден, начинаем с нуля")
+    return storage
+
+
+def get_processed_urls(storage):
+    """Извлекает список уже обработанных URL из хранилища"""
+    processed = storage.processed_urls()
+    print(f"✓ Уже обработано URL: {len(processed)}")
+    return processed
 
-    except Exception as e:
-        print(f"⚠ Ошибка создания резервной копии: {e}")
-        if os.path.exists(temp_backup):
-            try:
-                os.remove(temp_backup)
-            except:
-                pass
 
+def archive_page(url, content, file_path, kind='product'):
+    """Сохраняет исходный HTML карточки в архив (если задан HTML_ARCHIVE_DIR)"""
+    if html_archive is not None:
+        html_archive.put(url, content, dataset=os.path.basename(file_path), kind=kind)
 
-def save_broken_urls(break_line, group):
-    """Сохраняет сломанные ссылки в файл"""
-    if break_line:
-        file_path = os.path.join(SCRIPT_DIR, f'url_break_list_{cur_data_file}_{group}_Petrovich.txt')
-        with open(file_path, 'w', encoding='utf-8') as file:
-            for url in break_line:
-                file.write(f'{url}\n')
+
+def save_snapshot(storage):
+    """Снимок данных (жёсткие ссылки, хранятся SNAPSHOTS_KEEP последних поколений)"""
+    try:
+        path = storage.snapshot(keep=SNAPSHOTS_KEEP)
+        print(f"💾 Снимок данных: {storage.count()} записей ({os.path.basename(path)})")
+    except Exception as e:
+        print(f"⚠ Ошибка создания снимка: {e}")
 
 
 def choice_group():
@@ -295,10 +360,7 @@ def get_pages(group):
 
         url = f'https://petrovich.ru/catalog/{group}/'
         driver.get(url=url)
-        WebDriverWait(driver, 5).until(
-            EC.presence_of_element_located((By.TAG_NAME, "body"))
-        )
-        time.sleep(1)
+        WAITS.until(driver, 'catalog', present(PRODUCTS_COUNTER), required=False)
         content = driver.page_source
         soup = BeautifulSoup(content, 'lxml')
 
@@ -314,6 +376,7 @@ def get_pages(group):
             print(f'Обрабатываю {i} страницу каталога {group}')
             url = f'https://petrovich.ru/catalog/{group}/?sort=popularity_desc&p={i}'
             driver.get(url=url)
+            WAITS.until(driver, 'catalog', rendered(PRODUCT_LINK), required=False)
             content = driver.page_source
             soup = BeautifulSoup(content, 'lxml')
             pages = soup.find_all('a', {'data-test': "product-link"})
@@ -367,8 +430,11 @@ def get_data(group):
         print("="*60)
 
         # 1. Загружаем существующие данные
-        data_dict = load_existing_data(group)
-        processed_urls = get_processed_urls(data_dict)
+        storage = open_data_storage(group)
+        processed_urls = get_processed_urls(storage)
+        file_path = os.path.join(SCRIPT_DIR, f"data_{cur_data_file}_{group}_Petrovich.json")
+        # Журнал неудачных загрузок (класс ошибки, число попыток, время)
+        failures = FailureLedger(file_path)
 
         # 2. Читаем список URL
         url_file_path = os.path.join(SCRIPT_DIR, f'url_list_{cur_data_file}_{group}_Petrovich.txt')
@@ -380,136 +446,82 @@ def get_data(group):
         with open(url_file_path, 'r', encoding='utf-8') as file:
             all_lines = [line.strip() for line in file.readlines()]
 
-        # 3. Фильтруем - пропускаем уже обработанные
+        # 3. Фильтруем - пропускаем уже обработанные и постоянные ошибки (404)
         lines = [line for line in all_lines if line not in processed_urls]
+        permanent = [line for line in lines if failures.is_permanent(line)]
+        if permanent:
+            lines = [line for line in lines if not failures.is_permanent(line)]
 
         print(f"Всего URL в файле: {len(all_lines)}")
         print(f"Уже обработано: {len(processed_urls)}")
+        print(f"Постоянные ошибки (пропуск): {len(permanent)}")
         print(f"Осталось обработать: {len(lines)}")
         print("="*60 + "\n")
 
         if not lines:
             print("✓ Все URL уже обработаны!")
+            storage.finalize()
             return
 
-        break_line = []
-        file_path = os.path.join(SCRIPT_DIR, f"data_{cur_data_file}_{group}_Petrovich.json")
-        total_urls = len(lines)
-        processed_count = 0
-
-        for idx, line in enumerate(lines, 1):
-            try:
-                print(f"\n[{idx}/{total_urls}] Загрузка: {line}")
-                driver.get(url=line)
-                time.sleep(0.5)
-
-                content = driver.page_source
-                soup = BeautifulSoup(content, 'lxml')
-                cur_data = datetime.now().strftime("%d.%m.%Y")
-                cur_time = datetime.now().strftime("%H:%M")
+        if FETCH_MODE == 'hybrid':
+            processed_count = asyncio.run(process_urls_hybrid(driver, lines, storage, failures, file_path))
+        else:
+            total_urls = len(lines)
+            processed_count = 0
 
+            for idx, line in enumerate(lines, 1):
+                content = None
                 try:
-                    name = soup.find("h1").text.strip()
-                except:
-                    name = None
+                    print(f"\n[{idx}/{total_urls}] Загрузка: {line}")
+                    with RESOURCES.page(driver):
+                        driver.get(url=line)
+                        wait_product(driver)
 
-                try:
-                    price_units = soup.find('span',{'data-test':'alt-unit-tab'}).text.strip()
-                except:
-                    try:
-                        price_units = soup.find('p',{'data-test':'default-unit-tab'}).text.strip()
-                    except:
-                        price_units = None
+                    content = driver.page_source
+                    tree = html_tree(content)
+                    archive_page(line, content, file_path)
+                    cur_data = datetime.now().strftime("%d.%m.%Y")
+                    cur_time = datetime.now().strftime("%H:%M")
 
-                try:
-                    new_price = soup.find('div', class_='sale-block').find('p').text.strip()
-                    old_price = soup.find('div', class_='sale-block').find('div',
-                                                                           class_='sale-block-previous').text.strip()
-                except:
-                    new_price = soup.find('div', {'data-test': 'price-block'}).find('p', {
-                        'data-test': 'product-gold-price'}).text.strip()
-                    old_price = None
+                    card = parse_product(tree, line, cur_data, cur_time)
 
-                try:
-                    price_box = soup.find('div', class_='units-hint').find('span',
-                                                                           class_='pt-nowrap tooltip').text.strip()
-                except:
-                    price_box = None
-
-                left_spec = []
-                right_spec = []
+                    # СОХРАНЕНИЕ ПОСЛЕ КАЖДОЙ КАРТОЧКИ (защита от сбоев)
+                    storage.append(card)
+                    failures.resolve(line)
 
-                specs = soup.find('ul', class_='product-properties-list listing-data').find_all('li', class_ = 'data-item')
-                for spec in specs:
-                    lspec = spec.find("div", class_='title').text.strip()
-                    left_spec.append(lspec)
-                    rspec = spec.find("div", class_='value').text.strip()
-                    right_spec.append(rspec)
+                    # СНИМОК ДАННЫХ каждые 1000 записей
+                    if storage.count() % 1000 == 0:
+                        save_snapshot(storage)
 
-                specs_dict = {left_spec[i].strip(): right_spec[i].strip() for i in range(len(left_spec))}
+                    print(f'✓ Обработано: {idx}/{total_urls} | Всего в базе: {storage.count()}')
+                    processed_count += 1
 
-                # собираем склады
-                stocks_counter = 0
-                try:
-                    quant_stock = soup.find('div', class_='product-sidebar-content m-desktop').find('span', class_='pt-split-sm-xs-s pt-y-center').find('p', {'data-test':'typography'}).text.strip()
-
-                    try:
-                        stocks_counter += keep_only_digits_as_int(quant_stock)
-                    except:
-                        pass
-
-                except:
-                    pass
-
-                data = {
-                    "Полное наименование": name,
-                    "Действующая цена": new_price,
-                    "Цена без скидки": old_price,
-                    'Продается коробками по': price_box,
-                    "Единица измерения цены": price_units,
-                    "Ссылка": line,
-                    "Дата мониторинга": cur_data,
-                    "Время мониторинга": cur_time,
-                    "Магазин": "Petrovich",
-                    "Общий остаток": stocks_counter
-                }
-
-                data_dict.append(data | specs_dict)
-
-                # СОХРАНЕНИЕ ПОСЛЕ КАЖДОЙ КАРТОЧКИ (защита от сбоев)
-                save_data_incrementally(data_dict, file_path)
-
-                # РЕЗЕРВНОЕ КОПИРОВАНИЕ каждые 1000 записей
-                if len(data_dict) % 1000 == 0:
-                    save_backup_copy(data_dict, file_path)
-
-                print(f'✓ Обработано: {idx}/{total_urls} | Всего в базе: {len(data_dict)}')
-                processed_count += 1
-
-            except Exception as e:
-                break_line.append(line)
-                print(f'✗ Ошибка ({idx}/{total_urls}): {str(e)[:100]}')
-                # Даже при ошибке сохраняем то, что успели
-                save_data_incrementally(data_dict, file_path)
+                except Exception as e:
+                    failure = failures.record(line, e, content)
+                    print(f'✗ Ошибка {failure["kind"]} ({idx}/{total_urls}): {str(e)[:100]}')
 
         print(f'\n✓ Обработано новых: {processed_count}')
-        print(f'✗ Ошибок: {len(break_line)}')
-        print(f'✓ Всего в базе: {len(data_dict)}')
+        print(f'✗ Ошибок: {len(failures.failed_now)}')
+        print(f'✓ Всего в базе: {storage.count()}')
 
-        # Финальная резервная копия
-        if len(data_dict) > 0:
-            save_backup_copy(data_dict, file_path)
+        # Формируем итоговый JSON, финальный снимок
+        storage.finalize()
+        if storage.count() > 0:
+            save_snapshot(storage)
 
-        # Сохраняем сломанные ссылки
-        if break_line:
-            save_broken_urls(break_line, group)
+        # Неудачные загрузки (для повторного прохода)
+        failures.print_summary(processed_urls)
+        WAITS.print_summary()
+        RESOURCES.print_summary()
 
     except Exception as ex:
         print(f"✗ Критическая ошибка: {ex}")
-        # Сохраняем даже при критической ошибке
-        if 'file_path' in locals() and 'data_dict' in locals():
-            save_data_incrementally(data_dict, file_path)
+        # Карточки уже в хранилище — формируем из них итоговый JSON
+        if 'storage' in locals():
+            storage.finalize()
     finally:
+        if 'failures' in locals():
+            failures.close()
         end_driver(driver)
 
 
@@ -535,166 +547,91 @@ def retry_broken_urls(group):
         print("="*60)
 
         # 1. Загружаем существующие данные
-        data_dict = load_existing_data(group)
-        processed_urls = get_processed_urls(data_dict)
-
-        # 2. Проверяем наличие файла со сломанными ссылками
-        broken_urls_file = os.path.join(SCRIPT_DIR, f'url_break_list_{cur_data_file}_{group}_Petrovich.txt')
-
-        if not os.path.exists(broken_urls_file):
-            print(f"✓ Файл со сломанными ссылками не найден")
-            return
-
-        # 3. Читаем список сломанных URL
-        with open(broken_urls_file, 'r', encoding='utf-8') as file:
-            all_broken_urls = [line.strip() for line in file.readlines() if line.strip()]
-
-        # 4. Фильтруем - пропускаем уже обработанные
-        lines = [line for line in all_broken_urls if line not in processed_urls]
+        storage = open_data_storage(group)
+        processed_urls = get_processed_urls(storage)
+        file_path = os.path.join(SCRIPT_DIR, f"data_{cur_data_file}_{group}_Petrovich.json")
+        failures = FailureLedger(file_path)
 
-        print(f"Всего сломанных URL: {len(all_broken_urls)}")
-        print(f"Уже обработано ранее: {len(all_broken_urls) - len(lines)}")
-        print(f"К повторной обработке: {len(lines)}")
+        # 2. Из журнала неудач берём только URL, у которых истекла пауза;
+        # уже обработанные и постоянные ошибки (404, исчерпан лимит попыток) пропускаем
+        lines = failures.due_for_retry(processed_urls)
         print("="*60 + "\n")
 
         if not lines:
-            print("✓ Все сломанные URL уже обработаны!")
+            print("✓ Нет ссылок, готовых к повторной обработке")
+            storage.finalize()
             return
 
-        break_line = []
-        file_path = os.path.join(SCRIPT_DIR, f"data_{cur_data_file}_{group}_Petrovich.json")
-        total_urls = len(lines)
-        processed_count = 0
-
-        # 5. Обрабатываем каждый сломанный URL
-        for idx, line in enumerate(lines, 1):
-            try:
-                print(f"\n[{idx}/{total_urls}] Повторная загрузка: {line}")
-                driver.get(url=line)
-                time.sleep(3)  # Увеличенное ожидание для проблемных ссылок
-
-                content = driver.page_source
-                soup = BeautifulSoup(content, 'lxml')
-                cur_data = datetime.now().strftime("%d.%m.%Y")
-                cur_time = datetime.now().strftime("%H:%M")
+        # 3. Обрабатываем каждый сломанный URL
+        if FETCH_MODE == 'hybrid':
+            # Увеличенный таймаут для проблемных ссылок (страницы, загружаемые в браузере)
+            processed_count = asyncio.run(process_urls_hybrid(driver, lines, storage, failures, file_path,
+                                                              timeout=WAITS.timeout('product') * 2, retry=True))
+        else:
+            total_urls = len(lines)
+            processed_count = 0
 
+            for idx, line in enumerate(lines, 1):
+                content = None
                 try:
-                    name = soup.find("h1").text.strip()
-                except:
-                    name = None
+                    print(f"\n[{idx}/{total_urls}] Повторная загрузка: {line}")
+                    with RESOURCES.page(driver):
+                        driver.get(url=line)
+                        wait_product(driver, timeout=WAITS.timeout('product') * 2)  # Увеличенный таймаут для проблемных ссылок
 
-                if not name:
-                    print(f"⚠ Пропуск: название по-прежнему недоступно")
-                    break_line.append(line)
-                    continue
+                    content = driver.page_source
+                    tree = html_tree(content)
+                    archive_page(line, content, file_path)
+                    cur_data = datetime.now().strftime("%d.%m.%Y")
+                    cur_time = datetime.now().strftime("%H:%M")
 
-                try:
-                    price_units = soup.find('span',{'data-test':'alt-unit-tab'}).text.strip()
-                except:
-                    try:
-                        price_units = soup.find('p',{'data-test':'default-unit-tab'}).text.strip()
-                    except:
-                        price_units = None
+                    if not parse_name(tree):
+                        failure = failures.record(line, PARSE_ERROR, content)
+                        print(f"⚠ Пропуск: название по-прежнему недоступно ({failure['kind']})")
+                        continue
 
-                try:
-                    new_price = soup.find('div', class_='sale-block').find('p').text.strip()
-                    old_price = soup.find('div', class_='sale-block').find('div',
-                                                                           class_='sale-block-previous').text.strip()
-                except:
-                    new_price = soup.find('div', {'data-test': 'price-block'}).find('p', {
-                        'data-test': 'product-gold-price'}).text.strip()
-                    old_price = None
+                    card = parse_product(tree, line, cur_data, cur_time)
 
-                try:
-                    price_box = soup.find('div', class_='units-hint').find('span',
-                                                                           class_='pt-nowrap tooltip').text.strip()
-                except:
-                    price_box = None
+                    # СОХРАНЕНИЕ ПОСЛЕ КАЖДОЙ КАРТОЧКИ (защита от сбоев)
+                    storage.append(card)
+                    failures.resolve(line)
 
-                left_spec = []
-                right_spec = []
+                    # СНИМОК ДАННЫХ каждые 1000 записей
+                    if storage.count() % 1000 == 0:
+                        save_snapshot(storage)
 
-                specs = soup.find('ul', class_='product-properties-list listing-data').find_all('li', class_ = 'data-item')
-                for spec in specs:
-                    lspec = spec.find("div", class_='title').text.strip()
-                    left_spec.append(lspec)
-                    rspec = spec.find("div", class_='value').text.strip()
-                    right_spec.append(rspec)
+                    print(f"✓ Успешно обработано [{idx}/{total_urls}]")
+                    processed_count += 1
 
-                specs_dict = {left_spec[i].strip(): right_spec[i].strip() for i in range(len(left_spec))}
-
-                # собираем склады
-                stocks_counter = 0
-                try:
-                    quant_stock = soup.find('div', class_='product-sidebar-content m-desktop').find('span', class_='pt-split-sm-xs-s pt-y-center').find('p', {'data-test':'typography'}).text.strip()
-
-                    try:
-                        stocks_counter += keep_only_digits_as_int(quant_stock)
-                    except:
-                        pass
-
-                except:
-                    pass
-
-                data = {
-                    "Полное наименование": name,
-                    "Действующая цена": new_price,
-                    "Цена без скидки": old_price,
-                    'Продается коробками по': price_box,
-                    "Единица измерения цены": price_units,
-                    "Ссылка": line,
-                    "Дата мониторинга": cur_data,
-                    "Время мониторинга": cur_time,
-                    "Магазин": "Petrovich",
-                    "Общий остаток": stocks_counter
-                }
-
-                data_dict.append(data | specs_dict)
-
-                # СОХРАНЕНИЕ ПОСЛЕ КАЖДОЙ КАРТОЧКИ
-                save_data_incrementally(data_dict, file_path)
-
-                # РЕЗЕРВНОЕ КОПИРОВАНИЕ каждые 1000 записей
-                if len(data_dict) % 1000 == 0:
-                    save_backup_copy(data_dict, file_path)
-
-                print(f"✓ Успешно обработано [{idx}/{total_urls}]")
-                processed_count += 1
-
-            except Exception as e:
-                break_line.append(line)
-                print(f'✗ Ошибка повторной обработки ({idx}/{total_urls}): {str(e)[:100]}')
-                save_data_incrementally(data_dict, file_path)
+                except Exception as e:
+                    failure = failures.record(line, e, content)
+                    print(f'✗ Ошибка повторной обработки {failure["kind"]} ({idx}/{total_urls}): {str(e)[:100]}')
 
         print(f'\n{"="*60}')
         print(f'✓ Успешно обработано: {processed_count}')
-        print(f'✗ Всё ещё сломано: {len(break_line)}')
-        print(f'✓ Всего записей в базе: {len(data_dict)}')
+        print(f'✗ Всё ещё сломано: {len(failures.failed_now)}')
+        print(f'✓ Всего записей в базе: {storage.count()}')
         print("="*60)
 
-        # Финальная резервная копия
-        if len(data_dict) > 0:
-            save_backup_copy(data_dict, file_path)
+        # Формируем итоговый JSON, финальный снимок
+        storage.finalize()
+        if storage.count() > 0:
+            save_snapshot(storage)
 
-        # Обновляем список сломанных ссылок
-        if break_line:
-            save_broken_urls(break_line, group)
-            print(f"\n✓ Обновлён список сломанных ссылок: {len(break_line)} шт.")
-        else:
-            # Удаляем файл со сломанными ссылками, если все успешно
-            try:
-                if os.path.exists(broken_urls_file):
-                    os.remove(broken_urls_file)
-                    print(f"\n✓ Все ссылки успешно обработаны! Файл удалён.")
-            except:
-                pass
+        # Итог по журналу неудач
+        print()
+        failures.print_summary(processed_urls)
+        WAITS.print_summary()
+        RESOURCES.print_summary()
 
     except Exception as ex:
         print(f"✗ Критическая ошибка: {ex}")
-        # Сохраняем даже при критической ошибке
-        if 'file_path' in locals() and 'data_dict' in locals():
-            save_data_incrementally(data_dict, file_path)
+        # Карточки уже в хранилище — формируем из них итоговый JSON
+        if 'storage' in locals():
+            storage.finalize()
     finally:
+        if 'failures' in locals():
+            failures.close()
         end_driver(driver)
 
 
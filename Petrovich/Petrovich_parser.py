@@ -0,0 +1,185 @@
+"""
+Извлечение данных из страниц товаров Petrovich (без браузера)
+
+Используется основным парсером (Petrovich.py) и повторным разбором архива HTML:
+
+    python Petrovich/Petrovich_parser.py [--month MM.YYYY] [--workers N]
+
+Поля извлекаются через lxml (scraper_core/extract.py); прежний разбор через
+BeautifulSoup оставлен для сравнения на страницах архива:
+
+    python Petrovich/Petrovich_parser.py --bench [--limit N]
+"""
+import os
+import sys
+from bs4 import BeautifulSoup
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+# Общие модули (scraper_core) лежат в корне репозитория
+sys.path.insert(0, os.path.dirname(SCRIPT_DIR))
+from scraper_core.extract import find_all, find_text, html_tree, require, select, text
+
+
+def keep_only_digits_as_int(input_string):
+    digits_str = ''.join(filter(str.isdigit, input_string))
+    return int(digits_str) if digits_str else 0
+
+
+# Селекторы полей карточки (компилируются один раз, см. scraper_core/extract.py)
+NAME = select('h1')
+ALT_UNIT = select('span', attrs={'data-test': 'alt-unit-tab'})
+DEFAULT_UNIT = select('p', attrs={'data-test': 'default-unit-tab'})
+SALE_BLOCK = select('div', cls='sale-block')
+SALE_PRICE = select('p')
+SALE_PREVIOUS = select('div', cls='sale-block-previous')
+PRICE_BLOCK = select('div', attrs={'data-test': 'price-block'})
+GOLD_PRICE = select('p', attrs={'data-test': 'product-gold-price'})
+UNITS_HINT = select('div', cls='units-hint')
+BOX_TOOLTIP = select('span', cls='pt-nowrap tooltip')
+PROPERTIES = select('ul', cls='product-properties-list listing-data')
+PROPERTY = select('li', cls='data-item')
+PROPERTY_TITLE = select('div', cls='title')
+PROPERTY_VALUE = select('div', cls='value')
+SIDEBAR = select('div', cls='product-sidebar-content m-desktop')
+STOCK_SPLIT = select('span', cls='pt-split-sm-xs-s pt-y-center')
+STOCK_TEXT = select('p', attrs={'data-test': 'typography'})
+
+
+def parse_name(tree):
+    return find_text(tree, NAME)
+
+
+def parse_product(tree, url, cur_data, cur_time):
+    """Карточка товара со страницы (дерево lxml). Исключение — страница не распознана"""
+    name = parse_name(tree)
+
+    price_units = find_text(tree, ALT_UNIT)
+    if price_units is None:
+        price_units = find_text(tree, DEFAULT_UNIT)
+
+    # Цена со скидкой и прежняя цена, без скидки — «золотая» цена из блока цены
+    new_price = find_text(tree, SALE_BLOCK, SALE_PRICE)
+    old_price = find_text(tree, SALE_BLOCK, SALE_PREVIOUS)
+    if new_price is None or old_price is None:
+        new_price = text(require(tree, PRICE_BLOCK, GOLD_PRICE)).strip()
+        old_price = None
+
+    price_box = find_text(tree, UNITS_HINT, BOX_TOOLTIP)
+
+    specs_dict = {}
+    for spec in find_all(require(tree, PROPERTIES), PROPERTY):
+        lspec = text(require(spec, PROPERTY_TITLE)).strip()
+        specs_dict[lspec] = text(require(spec, PROPERTY_VALUE)).strip()
+
+    # собираем склады
+    stocks_counter = 0
+    quant_stock = find_text(tree, SIDEBAR, STOCK_SPLIT, STOCK_TEXT)
+    if quant_stock is not None:
+        stocks_counter += keep_only_digits_as_int(quant_stock)
+
+    data = {
+        "Полное наименование": name,
+        "Действующая цена": new_price,
+        "Цена без скидки": old_price,
+        'Продается коробками по': price_box,
+        "Единица измерения цены": price_units,
+        "Ссылка": url,
+        "Дата мониторинга": cur_data,
+        "Время мониторинга": cur_time,
+        "Магазин": "Petrovich",
+        "Общий остаток": stocks_counter
+    }
+
+    return data | specs_dict
+
+
+def parse_card(pages, url, dataset, cur_data, cur_time):
+    """Карточка из сохранённой страницы архива"""
+    return parse_product(html_tree(pages['product']), url, cur_data, cur_time)
+
+
+# Прежний разбор через BeautifulSoup — эталон для сравнения скорости и результата:
+#     python Petrovich/Petrovich_parser.py --bench
+
+def parse_name_bs(soup):
+    try:
+        return soup.find("h1").text.strip()
+    except:
+        return None
+
+
+def parse_product_bs(soup, url, cur_data, cur_time):
+    """Карточка товара со страницы (BeautifulSoup)"""
+    name = parse_name_bs(soup)
+
+    try:
+        price_units = soup.find('span',{'data-test':'alt-unit-tab'}).text.strip()
+    except:
+        try:
+            price_units = soup.find('p',{'data-test':'default-unit-tab'}).text.strip()
+        except:
+            price_units = None
+
+    try:
+        new_price = soup.find('div', class_='sale-block').find('p').text.strip()
+        old_price = soup.find('div', class_='sale-block').find('div',
+                                                               class_='sale-block-previous').text.strip()
+    except:
+        new_price = soup.find('div', {'data-test': 'price-block'}).find('p', {
+            'data-test': 'product-gold-price'}).text.strip()
+        old_price = None
+
+    try:
+        price_box = soup.find('div', class_='units-hint').find('span',
+                                                               class_='pt-nowrap tooltip').text.strip()
+    except:
+        price_box = None
+
+    left_spec = []
+    right_spec = []
+
+    specs = soup.find('ul', class_='product-properties-list listing-data').find_all('li', class_ = 'data-item')
+    for spec in specs:
+        lspec = spec.find("div", class_='title').text.strip()
+        left_spec.append(lspec)
+        rspec = spec.find("div", class_='value').text.strip()
+        right_spec.append(rspec)
+
+    specs_dict = {left_spec[i].strip(): right_spec[i].strip() for i in range(len(left_spec))}
+
+    # собираем склады
+    stocks_counter = 0
+    try:
+        quant_stock = soup.find('div', class_='product-sidebar-content m-desktop').find('span', class_='pt-split-sm-xs-s pt-y-center').find('p', {'data-test':'typography'}).text.strip()
+
+        try:
+            stocks_counter += keep_only_digits_as_int(quant_stock)
+        except:
+            pass
+
+    except:
+        pass
+
+    data = {
+        "Полное наименование": name,
+        "Действующая цена": new_price,
+        "Цена без скидки": old_price,
+        'Продается коробками по': price_box,
+        "Единица измерения цены": price_units,
+        "Ссылка": url,
+        "Дата мониторинга": cur_data,
+        "Время мониторинга": cur_time,
+        "Магазин": "Petrovich",
+        "Общий остаток": stocks_counter
+    }
+
+    return data | specs_dict
+
+
+def parse_card_bs(pages, url, dataset, cur_data, cur_time):
+    return parse_product_bs(BeautifulSoup(pages['product'], 'lxml'), url, cur_data, cur_time)
+
+
+if __name__ == '__main__':
+    from scraper_core.reparse import reparse_main
+    reparse_main(parse_card, SCRIPT_DIR, reference=parse_card_bs)
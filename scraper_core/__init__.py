@@ -0,0 +1,6 @@
+"""
+Общие модули для скриптов парсинга (LemanaPRO, OBI, Petrovich, Keramogranit.ru)
+
+Скрипты магазинов запускаются напрямую (python LeroyMerlin/LemanaPRO.py),
+поэтому перед импортом они добавляют корень репозитория в sys.path.
+"""
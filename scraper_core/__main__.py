@@ -0,0 +1,183 @@
+"""
+Служебные команды для файлов данных парсеров
+
+Использование:
+    python -m scraper_core compact <data_MM.YYYY_*.json> [...]
+    python -m scraper_core export <база.sqlite3> <data_MM.YYYY_*.json> [...]
+    python -m scraper_core reindex <data_MM.YYYY_*.json> [...]
+    python -m scraper_core snapshots <data_MM.YYYY_*.json | база.sqlite3>
+    python -m scraper_core restore <data_MM.YYYY_*.json | база.sqlite3> [имя снимка]
+    python -m scraper_core failures <data_MM.YYYY_*.json> [...]
+    python -m scraper_core serve <html_archive> [...] [--latency 0.05] [--error-rate 0.02]
+    python -m scraper_core bench [магазин ...] [--concurrency 16] [--latency 0.05]
+"""
+import argparse
+import asyncio
+import os
+
+from scraper_core.benchmark import STORES, bench_store
+from scraper_core.failures import FailureLedger, next_retry_at
+from scraper_core.fixture_server import serve
+from scraper_core.journal import CardJournal
+from scraper_core.snapshots import list_snapshots, snapshot_root_for
+from scraper_core.storage import SqliteStorage, restore_sqlite
+
+
+def cmd_compact(args):
+    for file_path in args.files:
+        count = CardJournal(file_path).compact()
+        if count is None:
+            print(f"Журнал для {file_path} не найден или не сжат")
+        else:
+            print(f"✓ {file_path}: {count} записей")
+
+
+def cmd_export(args):
+    for file_path in args.files:
+        storage = SqliteStorage(args.db, file_path)
+        count = storage.finalize()
+        storage.close()
+        print(f"✓ {file_path}: {count} записей")
+
+
+def cmd_reindex(args):
+    for file_path in args.files:
+        count = CardJournal(file_path).reindex()
+        print(f"✓ {file_path}: {count} записей в индексе")
+
+
+def cmd_snapshots(args):
+    snapshots = list_snapshots(snapshot_root_for(args.path))
+    if not snapshots:
+        print(f"Снимков для {args.path} нет")
+    for snapshot in snapshots:
+        print(f"{snapshot['name']}  {snapshot['created']}  {snapshot.get('cards')} записей")
+
+
+def cmd_restore(args):
+    # Восстанавливать нужно при остановленном парсере
+    if args.path.endswith('.sqlite3'):
+        snapshot = restore_sqlite(args.path, args.name)
+    else:
+        snapshot = CardJournal(args.path).restore(args.name)
+    print(f"✓ Восстановлено из снимка {snapshot['name']}: {snapshot.get('cards')} записей")
+
+
+def cmd_failures(args):
+    for file_path in args.files:
+        failures = FailureLedger(file_path)
+        print(f"{file_path}:")
+        failures.print_summary()
+        if args.verbose:
+            for url, record in failures.records.items():
+                print(f"  {record['kind']:<12} попыток: {record['attempts']}  "
+                      f"повтор после {next_retry_at(record).isoformat(timespec='seconds')}  {url}")
+
+
+def server_options(args) -> dict:
+    return {'port': args.port, 'latency': args.latency, 'jitter': args.jitter,
+            'error_rate': args.error_rate, 'error_status': args.error_status,
+            'stall_rate': args.stall_rate, 'stall': args.stall, 'seed': args.seed,
+            'validators': not args.no_validators}
+
+
+def cmd_serve(args):
+    try:
+        asyncio.run(serve(args.archives, **server_options(args)))
+    except KeyboardInterrupt:
+        print("\n⚠ Стенд остановлен")
+
+
+def cmd_bench(args):
+    if args.archive and len(args.stores) != 1:
+        print("✗ --archive задаётся для одного магазина")
+        return
+    results = []
+    for store in args.stores or list(STORES):
+        archive_root = args.archive or os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                                    STORES[store][0], 'html_archive')
+        if not os.path.isdir(archive_root):
+            print(f"⚠ {store}: архив не найден ({archive_root}), включите HTML_ARCHIVE_DIR и запустите парсер")
+            continue
+        results.append(bench_store(store, archive_root, server_options(args), concurrency=args.concurrency,
+                                   rate=args.rate, timeout=args.timeout, workers=args.workers,
+                                   limit=args.limit, verbose=args.verbose, cache=args.cache))
+    if len(results) > 1:
+        print("\n" + "=" * 60)
+        for result in results:
+            print(f"{result['store']:<14} {result['pages_per_sec']:>8.1f} стр/с  "
+                  f"{result['cpu_ms_per_page']:>7.2f} мс CPU/стр")
+
+
+def add_server_arguments(parser):
+    parser.add_argument('--port', type=int, default=8765, help='Порт стенда (по умолчанию 8765)')
+    parser.add_argument('--latency', type=float, default=0.0, help='Задержка ответа, с')
+    parser.add_argument('--jitter', type=float, default=0.0, help='Случайная добавка к задержке, до N с')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Доля ответов с ошибкой (0-1)')
+    parser.add_argument('--error-status', type=int, default=503, help='Статус ответа с ошибкой (по умолчанию 503)')
+    parser.add_argument('--stall-rate', type=float, default=0.0, help='Доля зависших ответов (0-1)')
+    parser.add_argument('--stall', type=float, default=60.0, help='На сколько секунд зависает ответ')
+    parser.add_argument('--seed', type=int, default=None, help='Зерно генератора ошибок (повторяемый прогон)')
+    parser.add_argument('--no-validators', action='store_true',
+                        help='Не отдавать ETag/Last-Modified и не отвечать 304')
+
+
+def main():
+    parser = argparse.ArgumentParser(prog='python -m scraper_core')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    compact = subparsers.add_parser('compact', help='Собрать журнал .jsonl в итоговый .json')
+    compact.add_argument('files', nargs='+', help='Пути к data_MM.YYYY_*.json')
+    compact.set_defaults(func=cmd_compact)
+
+    export = subparsers.add_parser('export', help='Выгрузить карточки из SQLite в итоговый .json')
+    export.add_argument('db', help='База магазина (*.sqlite3)')
+    export.add_argument('files', nargs='+', help='Пути к data_MM.YYYY_*.json')
+    export.set_defaults(func=cmd_export)
+
+    reindex = subparsers.add_parser('reindex', help='Пересобрать индекс обработанных URL (.urls.idx)')
+    reindex.add_argument('files', nargs='+', help='Пути к data_MM.YYYY_*.json')
+    reindex.set_defaults(func=cmd_reindex)
+
+    snapshots = subparsers.add_parser('snapshots', help='Список снимков данных')
+    snapshots.add_argument('path', help='data_MM.YYYY_*.json или база магазина (*.sqlite3)')
+    snapshots.set_defaults(func=cmd_snapshots)
+
+    restore = subparsers.add_parser('restore', help='Восстановить данные из снимка')
+    restore.add_argument('path', help='data_MM.YYYY_*.json или база магазина (*.sqlite3)')
+    restore.add_argument('name', nargs='?', default=None, help='Имя снимка (по умолчанию — последний)')
+    restore.set_defaults(func=cmd_restore)
+
+    failures = subparsers.add_parser('failures', help='Журнал неудачных загрузок и план повторов')
+    failures.add_argument('files', nargs='+', help='Пути к data_MM.YYYY_*.json')
+    failures.add_argument('-v', '--verbose', action='store_true', help='Показать каждый URL')
+    failures.set_defaults(func=cmd_failures)
+
+    serve_parser = subparsers.add_parser('serve', help='Локальный стенд с записанными страницами')
+    serve_parser.add_argument('archives', nargs='+', help='Каталоги архива HTML (html_archive)')
+    add_server_arguments(serve_parser)
+    serve_parser.set_defaults(func=cmd_serve)
+
+    bench = subparsers.add_parser('bench', help='Замер скорости парсеров на локальном стенде')
+    bench.add_argument('stores', nargs='*', choices=list(STORES), metavar='магазин',
+                       help=f"Магазины ({', '.join(STORES)}; по умолчанию все с архивом)")
+    bench.add_argument('--archive', default=None,
+                       help='Каталог архива (по умолчанию html_archive магазина)')
+    bench.add_argument('--concurrency', type=int, default=None,
+                       help='Одновременных запросов (по умолчанию — как в парсере, для остальных 8)')
+    bench.add_argument('--rate', type=float, default=None, help='Запросов в секунду к сайту (token bucket)')
+    bench.add_argument('--timeout', type=float, default=None, help='Таймаут запроса, с')
+    bench.add_argument('--workers', type=int, default=None, help='Процессов разбора (по умолчанию — число ядер)')
+    bench.add_argument('--limit', type=int, default=None, help='Не больше N страниц товаров')
+    bench.add_argument('--cache', action='store_true',
+                       help='Замерить повторный проход с кешем условных запросов (304)')
+    bench.add_argument('-v', '--verbose', action='store_true', help='Показывать вывод парсера')
+    add_server_arguments(bench)
+    bench.set_defaults(func=cmd_bench)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,76 @@
+"""
+Отдельная задача записи результатов для асинхронных парсеров
+
+Воркеры загрузки не трогают диск и не берут общую блокировку: результат
+(сохранить карточку, отметить неудачу, положить страницу в архив) ставится в
+очередь, а единственная задача записи выполняет операции по порядку в
+отдельном потоке (один и тот же поток на всё время работы), забирая из
+очереди всё накопившееся одной пачкой. Порядок операций сохраняется, поэтому
+во время обхода хранилище и журнал неудач используются только из этого
+потока и блокировки им не нужны. Очередь ограничена: если
+диск не успевает, воркеры ждут в submit, а не копят страницы в памяти.
+
+    async with AsyncWriter() as writer:
+        ...
+        await writer.submit(save_card, storage, card)   # save_card выполнится в потоке записи
+    # при выходе из блока все поставленные операции выполнены
+"""
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable
+
+
+class AsyncWriter:
+    """Очередь операций записи и задача, выполняющая их в потоке"""
+
+    def __init__(self, maxsize: int = 100):
+        self._queue = asyncio.Queue(maxsize)
+        self._task = None
+        self._executor = None
+        self.operations = 0
+        self.batches = 0
+        self.peak = 0
+
+    async def __aenter__(self):
+        # Свой поток, а не asyncio.to_thread: пачки из пула по умолчанию попадали бы в разные потоки
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='async-writer')
+        self._task = asyncio.create_task(self._run())
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        try:
+            # Уже полученные результаты дописываем и при ошибке обхода
+            await self._queue.join()
+        finally:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._executor.shutdown(wait=True)
+
+    async def submit(self, func: Callable, *args):
+        """Ставит операцию func(*args) в очередь записи (ждёт, только если очередь заполнена)"""
+        await self._queue.put((func, args))
+        self.peak = max(self.peak, self._queue.qsize())
+
+    async def _run(self):
+        while True:
+            batch = [await self._queue.get()]
+            while not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+            try:
+                await asyncio.get_running_loop().run_in_executor(self._executor, self._apply, batch)
+            finally:
+                self.operations += len(batch)
+                self.batches += 1
+                for _ in batch:
+                    self._queue.task_done()
+
+    @staticmethod
+    def _apply(batch):
+        for func, args in batch:
+            try:
+                func(*args)
+            except Exception as e:
+                print(f"✗ Ошибка при сохранении: {e}")
+
+    def summary(self) -> str:
+        return f"операций: {self.operations}, пачек: {self.batches}, макс. очередь: {self.peak}"
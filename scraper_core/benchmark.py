@@ -0,0 +1,240 @@
+"""
+Сквозной замер скорости парсеров на локальном стенде (fixture_server.py)
+
+Стенд с записанными страницами магазина (архив HTML) запускается в отдельном
+процессе, а парсер загружает и разбирает страницы с него так же, как с сайта.
+Замеряются страницы в секунду, процессорное время на страницу (парсер вместе
+с процессами разбора, без стенда) и пик памяти (RSS):
+
+    python -m scraper_core bench keramogranit --latency 0.05 --concurrency 16
+    python -m scraper_core bench petrovich obi --error-rate 0.05 --stall-rate 0.01 --timeout 5
+
+Keramogranit.ru проходит целиком (crawl: каталог, товары, запись карточек во
+временный каталог). У остальных магазинов страницы загружает браузер, поэтому
+для них замеряется загрузка записанных страниц товаров движком fetch_engine.py
+и их разбор parse_card в пуле процессов.
+
+С --cache замеряется повторный проход с кешем условных запросов
+(http_cache.py): первый проход заполняет временный кеш, второй — замеряемый —
+загружает страницы с If-None-Match, и стенд отвечает 304. В отчёте — доля
+страниц, взятых из кеша:
+
+    python -m scraper_core bench keramogranit --cache --latency 0.05
+"""
+import asyncio
+import contextlib
+import importlib
+import json
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+import urllib.request
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from functools import partial
+from operator import itemgetter
+from typing import List, Optional
+
+from scraper_core.concurrency import AimdLimiter
+from scraper_core.fetch_engine import FetchEngine, HostBudget
+from scraper_core.fixture_server import STATS_PATH, FixtureServer, fixture_url, load_pages
+from scraper_core.html_archive import HtmlArchive
+from scraper_core.http_cache import HttpCache
+from scraper_core.http_session import HttpSettings
+from scraper_core.reparse import _quiet_worker, collect_fetches
+from scraper_core.retry import RetryPolicy
+
+try:
+    import resource
+except ImportError:
+    # Windows: процессорное время только процесса парсера, без пика памяти
+    resource = None
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Магазин: (каталог, модуль разбора, модуль парсера для полного прогона или None)
+STORES = {
+    'keramogranit': ('KeramogranitRU', 'KeramogranitRu_parser', 'KeramogranitRu'),
+    'lemanapro': ('LeroyMerlin', 'LemanaPRO_parser', None),
+    'petrovich': ('Petrovich', 'Petrovich_parser', None),
+    'obi': ('Obi_selenium', 'Obi_parser', None),
+}
+
+
+def store_module(store: str, module: str):
+    """Импортирует модуль магазина (модули магазинов импортируют друг друга без пакета)"""
+    store_dir = os.path.join(REPO_DIR, STORES[store][0])
+    if store_dir not in sys.path:
+        sys.path.insert(0, store_dir)
+    return importlib.import_module(module)
+
+
+def _serve_process(archive_root: str, options: dict, ready):
+    async def run():
+        async with FixtureServer(load_pages(archive_root), **options):
+            ready.set()
+            await asyncio.Event().wait()
+
+    asyncio.run(run())
+
+
+def _server_stats(base_url: str) -> dict:
+    with urllib.request.urlopen(base_url + STATS_PATH, timeout=10) as response:
+        return json.load(response)
+
+
+def _usage() -> dict:
+    """Процессорное время и пик памяти парсера и завершённых дочерних процессов (пула разбора)"""
+    if resource is None:
+        return {'cpu': time.process_time(), 'children_cpu': 0.0, 'rss': None, 'children_rss': None}
+    own = resource.getrusage(resource.RUSAGE_SELF)
+    children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    # ru_maxrss в Linux — КБ, в macOS — байты
+    scale = 1 if sys.platform == 'darwin' else 1024
+    return {'cpu': own.ru_utime + own.ru_stime, 'children_cpu': children.ru_utime + children.ru_stime,
+            'rss': own.ru_maxrss * scale, 'children_rss': children.ru_maxrss * scale}
+
+
+def _parse_page(parse_card, html: str, url: str, dataset: str) -> Optional[dict]:
+    now = datetime.now()
+    try:
+        return parse_card({'product': html}, url, dataset, now.strftime("%d.%m.%Y"), now.strftime("%H:%M"))
+    except Exception:
+        return None
+
+
+def run_crawl(scraper, resolve, concurrency: Optional[int] = None, timeout: Optional[float] = None,
+              cache: Optional[HttpCache] = None):
+    """Полный проход парсера (crawl_async) с записью во временный каталог"""
+    with tempfile.TemporaryDirectory() as out_dir:
+        # Данные, журнал неудач и снимки — во временном каталоге; архив выключен, кеш парсера
+        # заменён временным (или выключен), чтобы страницы действительно загружались со стенда
+        scraper.SCRIPT_DIR = out_dir
+        scraper.STORAGE_DB = os.path.join(out_dir, os.path.basename(scraper.STORAGE_DB))
+        scraper.html_archive = None
+        scraper.http_cache = cache
+        if concurrency:
+            scraper.CONCURRENCY = AimdLimiter(initial=concurrency, min_limit=1, max_limit=concurrency)
+            scraper.HTTP_SETTINGS.limit_per_host = concurrency
+        if timeout:
+            scraper.HTTP_SETTINGS.total_timeout = timeout
+        asyncio.run(scraper.with_http(scraper.crawl_async, resolve=resolve))
+
+
+async def replay_async(parse_card, fetches: List[dict], resolve, concurrency: int = 8,
+                       rate: Optional[float] = None, timeout: float = 30,
+                       workers: Optional[int] = None, cache: Optional[HttpCache] = None) -> dict:
+    """Загрузка страниц товаров движком и разбор parse_card в пуле процессов"""
+    counts = {'parsed': 0, 'failed': 0}
+    engine = FetchEngine(HttpSettings(limit_per_host=concurrency, total_timeout=timeout),
+                         retry=RetryPolicy(), resolve=resolve, cache=cache,
+                         default_budget=lambda: HostBudget(rate=rate, limiter=AimdLimiter(
+                             initial=concurrency, min_limit=1, max_limit=concurrency)))
+    loop = asyncio.get_running_loop()
+    with ProcessPoolExecutor(max_workers=workers, initializer=_quiet_worker) as parse_pool:
+        async with engine:
+            async def handle(fetch):
+                try:
+                    html = await engine.fetch(fetch['url'])
+                except Exception:
+                    counts['failed'] += 1
+                    return
+                card = await loop.run_in_executor(parse_pool, partial(_parse_page, parse_card),
+                                                  html, fetch['url'], fetch['dataset'])
+                counts['parsed' if card else 'failed'] += 1
+
+            await engine.crawl(fetches, handle, url_of=itemgetter('url'))
+        engine.print_summary()
+    return counts
+
+
+def recorded_products(archive_root: str, limit: Optional[int] = None) -> List[dict]:
+    """Страницы товаров архива, по одной на URL (стенд отдаёт последнюю загрузку)"""
+    archive = HtmlArchive(archive_root)
+    fetches = {fetch['url']: fetch for fetch in collect_fetches(archive)}
+    archive.close()
+    return list(fetches.values())[:limit]
+
+
+def bench_store(store: str, archive_root: str, server_options: dict, concurrency: Optional[int] = None,
+                rate: Optional[float] = None, timeout: Optional[float] = None,
+                workers: Optional[int] = None, limit: Optional[int] = None, verbose: bool = False,
+                cache: bool = False) -> dict:
+    """Замер одного магазина на стенде. Возвращает страницы, время, CPU и пик памяти"""
+    _, parser_name, scraper_name = STORES[store]
+    print("\n" + "=" * 60)
+    print(f"{store}: {'полный проход ' + scraper_name if scraper_name else 'загрузка и разбор страниц товаров'}"
+          + (", повторный проход с кешем" if cache else ''))
+    print("=" * 60)
+
+    # spawn: стенд не наследует импортированные модули и открытые файлы парсера
+    context = multiprocessing.get_context('spawn')
+    ready = context.Event()
+    server = context.Process(target=_serve_process, args=(archive_root, server_options, ready), daemon=True)
+    server.start()
+    try:
+        if not ready.wait(120):
+            raise RuntimeError("Стенд не запустился")
+        probe = FixtureServer({}, **server_options)
+        resolve = partial(fixture_url, probe.base_url)
+        print(f"⚙ Стенд: {probe.describe()}")
+
+        def run_pass(page_cache):
+            if scraper_name:
+                run_crawl(store_module(store, scraper_name), resolve, concurrency, timeout, page_cache)
+                return None
+            parse_card = store_module(store, parser_name).parse_card
+            fetches = recorded_products(archive_root, limit)
+            return asyncio.run(replay_async(parse_card, fetches, resolve, concurrency or 8, rate,
+                                            timeout or 30, workers, page_cache))
+
+        with contextlib.ExitStack() as stack:
+            if not verbose:
+                # Ход работы парсера печатается на каждую страницу — в отчёте это только шум
+                devnull = stack.enter_context(open(os.devnull, 'w', encoding='utf-8'))
+                stack.enter_context(contextlib.redirect_stdout(devnull))
+            page_cache = None
+            if cache:
+                # Первый проход заполняет кеш и не замеряется; счётчики кеша — только второго
+                cache_dir = stack.enter_context(tempfile.TemporaryDirectory())
+                run_pass(HttpCache(cache_dir))
+                page_cache = HttpCache(cache_dir)
+            warm = _server_stats(probe.base_url)
+            before = _usage()
+            started = time.perf_counter()
+            counts = run_pass(page_cache)
+            elapsed = time.perf_counter() - started
+            # Пул разбора уже завершён, его время попало в RUSAGE_CHILDREN; стенд ещё работает и не учитывается
+            after = _usage()
+        total = _server_stats(probe.base_url)
+        stats = {key: value - warm[key] if key != 'pages' else value for key, value in total.items()}
+    finally:
+        server.terminate()
+        server.join()
+
+    # Ответ 304 — тоже загруженная страница (из кеша)
+    pages = stats['served'] + stats['not_modified']
+    cpu = after['cpu'] - before['cpu']
+    children_cpu = after['children_cpu'] - before['children_cpu']
+    result = {'store': store, 'pages': pages, 'elapsed': elapsed,
+              'pages_per_sec': pages / max(elapsed, 1e-9),
+              'cpu_ms_per_page': (cpu + children_cpu) * 1000 / max(pages, 1),
+              'rss': after['rss'], 'children_rss': after['children_rss'], 'server': stats}
+
+    print(f"⚙ Стенд: записанных страниц {stats['pages']}, запросов {stats['requests']}, отдано страниц {stats['served']}, "
+          f"304 {stats['not_modified']}, нет в записи {stats['missing']}, ошибок {stats['errors']}, "
+          f"зависаний {stats['stalls']}")
+    if page_cache is not None:
+        result['cache_hit_rate'] = page_cache.hits / max(pages, 1)
+        print(f"🗄 Кеш страниц: из кеша {page_cache.hits} из {pages} страниц ({result['cache_hit_rate']:.0%}); "
+              f"{page_cache.summary()}")
+    if counts is not None:
+        print(f"✓ Разобрано карточек: {counts['parsed']}, не удалось: {counts['failed']}")
+    print(f"✓ {pages} страниц за {elapsed:.2f} с — {result['pages_per_sec']:.1f} стр/с")
+    print(f"✓ CPU: {result['cpu_ms_per_page']:.2f} мс/стр (парсер {cpu:.2f} с, процессы разбора {children_cpu:.2f} с)")
+    if result['rss'] is not None:
+        print(f"✓ Пик RSS: {result['rss'] / 1024 / 1024:.0f} МБ "
+              f"(процессы разбора: {result['children_rss'] / 1024 / 1024:.0f} МБ)")
+    return result
@@ -0,0 +1,109 @@
+"""
+Запуск Chrome (undetected_chromedriver) для парсеров на Selenium
+
+Раньше каждый парсер собирал ChromeOptions и uc.Chrome(...) сам, в OBI —
+четыре одинаковые копии. Здесь настройки браузера магазина задаются одним
+объектом DriverSettings:
+
+    DRIVER = DriverSettings(page_load_strategy='eager', headless=False, window_size=(1280, 800))
+    driver = new_driver(DRIVER, resources=RESOURCES)    # resource_blocking.py, по желанию
+    ...
+    close_driver(driver, RESOURCES)
+
+Стратегия загрузки (page_load_strategy) определяет, когда возвращается
+driver.get: 'normal' — после загрузки всех ресурсов страницы (картинок,
+скриптов счётчиков, iframe), 'eager' — как только готов DOM, 'none' — сразу
+после начала перехода. Парсеры всё равно ждут нужных узлов (waits.py),
+поэтому 'eager' и 'none' не ждут хвоста подгрузок, от которых данные не
+зависят. headless — без окна (не каждый сайт это пропускает: антибот может
+ответить капчей), window_size — размер окна: меньше окно — меньше отрисовки.
+"""
+import copy
+import time
+from typing import Optional, Tuple
+
+import undetected_chromedriver as uc
+
+from scraper_core.network_capture import enable_performance_log
+
+PAGE_LOAD_STRATEGIES = ('normal', 'eager', 'none')
+# Картинки и видео не загружаются (см. также resource_blocking.py)
+NO_IMAGES_PREFS = {
+    "profile.managed_default_content_settings.images": 2,
+    "profile.default_content_setting_values.images": 2,
+    "profile.managed_default_content_settings.media": 2
+}
+
+
+class DriverSettings:
+    """Настройки браузера магазина"""
+
+    def __init__(self, page_load_strategy: str = 'eager', headless: bool = False,
+                 window_size: Optional[Tuple[int, int]] = (1280, 800), block_images: bool = True,
+                 page_load_timeout: float = 60, version_main: Optional[int] = 144):
+        # page_load_strategy — 'normal', 'eager' или 'none'; window_size — None для размера по умолчанию;
+        # page_load_timeout — секунд на driver.get; version_main — версия Chrome (None — определить самому)
+        if page_load_strategy not in PAGE_LOAD_STRATEGIES:
+            raise ValueError(f"page_load_strategy: одно из {', '.join(PAGE_LOAD_STRATEGIES)}")
+        self.page_load_strategy = page_load_strategy
+        self.headless = headless
+        self.window_size = window_size
+        self.block_images = block_images
+        self.page_load_timeout = page_load_timeout
+        self.version_main = version_main
+
+    def replace(self, **changes) -> 'DriverSettings':
+        """Копия с изменёнными настройками (например, браузер с картинками для капчи)"""
+        settings = copy.copy(self)
+        for name, value in changes.items():
+            if not hasattr(settings, name):
+                raise AttributeError(f"Нет настройки браузера: {name}")
+            setattr(settings, name, value)
+        return settings
+
+    def __repr__(self):
+        return (f"DriverSettings(page_load_strategy={self.page_load_strategy!r}, headless={self.headless}, "
+                f"window_size={self.window_size}, block_images={self.block_images}, "
+                f"page_load_timeout={self.page_load_timeout}, version_main={self.version_main})")
+
+
+def chrome_options(settings: DriverSettings, performance_log: bool = False) -> uc.ChromeOptions:
+    """ChromeOptions по настройкам (объект нельзя использовать для второго браузера)"""
+    options = uc.ChromeOptions()
+    if settings.block_images:
+        options.add_experimental_option("prefs", NO_IMAGES_PREFS)
+    options.page_load_strategy = settings.page_load_strategy
+    if settings.window_size:
+        options.add_argument(f"--window-size={settings.window_size[0]},{settings.window_size[1]}")
+    if performance_log:
+        # События Network.* (network_capture.py, замер ресурсов)
+        enable_performance_log(options)
+    return options
+
+
+def new_driver(settings: DriverSettings, resources=None, performance_log: bool = False):
+    """Новый браузер; resources — ResourceBlocker (блокировка или замер ресурсов страниц)"""
+    if resources is not None:
+        performance_log = performance_log or resources.measure
+    driver = uc.Chrome(
+        options=chrome_options(settings, performance_log),
+        use_subprocess=True,
+        headless=settings.headless,
+        version_main=settings.version_main,
+    )
+    driver.set_page_load_timeout(settings.page_load_timeout)
+    if resources is not None:
+        resources.apply(driver)
+    return driver
+
+
+def close_driver(driver, resources=None):
+    """Безопасное закрытие браузера (ошибки закрытия, например «Неверный дескриптор», игнорируются)"""
+    try:
+        if driver:
+            if resources is not None:
+                resources.release(driver)
+            driver.quit()
+            time.sleep(0.5)
+    except Exception:
+        pass
@@ -0,0 +1,151 @@
+"""
+Адаптивное ограничение числа одновременных запросов (AIMD)
+
+Окно (сколько запросов к сайту идёт одновременно) подбирается по ответам:
+каждый успешный ответ увеличивает окно на 1/окно, то есть примерно на 1 за
+окно ответов (additive increase), а таймаут, 429/5xx или рост задержки
+больше чем в latency_factor раз относительно лучшей наблюдаемой уменьшают
+окно в decrease_factor раз (multiplicative decrease). Уменьшение делается
+не чаще раза на «поколение» запросов: ответы на запросы, начатые до
+прошлого уменьшения, окно повторно не режут.
+
+    limiter = AimdLimiter(initial=6, max_limit=32)
+    started = await limiter.acquire()
+    ...                                  # запрос
+    limiter.release(started, status=response.status)   # или error=исключение
+
+Окно сохраняется между циклами asyncio (этапами парсера), каждое изменение
+окна печатается.
+"""
+import asyncio
+import time
+from collections import deque
+from typing import Optional
+
+from scraper_core.failures import CAPTCHA, NETWORK, TIMEOUT, classify_error
+
+# Ошибки, которые означают перегрузку сайта (или защиту от частых запросов)
+OVERLOAD_KINDS = {TIMEOUT, NETWORK, CAPTCHA}
+
+
+class AimdLimiter:
+    """Окно одновременных запросов с аддитивным ростом и мультипликативным уменьшением"""
+
+    def __init__(self, initial: int = 6, min_limit: int = 1, max_limit: int = 32,
+                 decrease_factor: float = 0.5, latency_factor: float = 2.0, latency_slack: float = 0.25,
+                 name: str = 'запросов'):
+        # latency_slack — рост задержки меньше стольких секунд перегрузкой не считается
+        # (иначе при задержке в миллисекунды окно резал бы любой случайный всплеск)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.decrease_factor = decrease_factor
+        self.latency_factor = latency_factor
+        self.latency_slack = latency_slack
+        self.name = name
+        self._limit = float(initial)
+        self.in_flight = 0
+        # Сглаженная и лучшая (базовая) задержка ответа, секунды
+        self.latency = None
+        self._baseline = None
+        self._last_decrease = 0.0
+        self._loop = None
+        self._waiters = deque()
+        self.increases = 0
+        self.decreases = 0
+        self.peak = initial
+
+    @property
+    def limit(self) -> int:
+        return max(self.min_limit, int(self._limit))
+
+    async def acquire(self) -> float:
+        """Ждёт места в окне. Возвращает время начала запроса для release()"""
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            # Этапы парсера могут идти в разных asyncio.run — ожидающие прошлого цикла не нужны
+            self._loop = loop
+            self._waiters.clear()
+        while self.in_flight >= self.limit:
+            waiter = loop.create_future()
+            self._waiters.append(waiter)
+            try:
+                await waiter
+            except asyncio.CancelledError:
+                if waiter in self._waiters:
+                    self._waiters.remove(waiter)
+                else:
+                    # Нас разбудили, но задача отменена — место достаётся следующему
+                    self._wake()
+                raise
+        self.in_flight += 1
+        return time.monotonic()
+
+    def release(self, started: float, status: Optional[int] = None,
+                error: Optional[BaseException] = None):
+        """Освобождает место в окне и корректирует окно по результату запроса"""
+        self.in_flight -= 1
+        now = time.monotonic()
+        reason = self._overload_reason(status, error)
+        if reason is not None:
+            self._decrease(started, now, reason)
+        elif status is not None:
+            self._observe_latency(now - started)
+            if self.latency > max(self._baseline * self.latency_factor, self._baseline + self.latency_slack):
+                self._decrease(started, now, f"задержка {self.latency:.2f} с")
+            else:
+                self._increase()
+        self._wake()
+
+    def _overload_reason(self, status: Optional[int], error: Optional[BaseException]) -> Optional[str]:
+        if status is not None and (status == 429 or status >= 500):
+            return f"HTTP {status}"
+        if error is not None and status is None and classify_error(error) in OVERLOAD_KINDS:
+            return classify_error(error)
+        return None
+
+    def _observe_latency(self, latency: float):
+        self.latency = latency if self.latency is None else 0.8 * self.latency + 0.2 * latency
+        if self._baseline is None or self.latency < self._baseline:
+            self._baseline = self.latency
+        else:
+            # Базовая задержка медленно догоняет текущую: если сайт стал медленнее
+            # насовсем, окно не должно вечно оставаться минимальным
+            self._baseline += (self.latency - self._baseline) * 0.01
+
+    def _increase(self):
+        if self._limit >= self.max_limit:
+            return
+        before = self.limit
+        self._limit = min(self.max_limit, self._limit + 1 / self._limit)
+        if self.limit != before:
+            self.increases += 1
+            self.peak = max(self.peak, self.limit)
+            self._log(before, 'рост')
+
+    def _decrease(self, started: float, now: float, reason: str):
+        if started < self._last_decrease:
+            # Запрос начат до прошлого уменьшения — эта перегрузка уже учтена
+            return
+        before = self.limit
+        self._limit = max(self.min_limit, self._limit * self.decrease_factor)
+        self._last_decrease = now
+        if self.limit != before:
+            self.decreases += 1
+            self._log(before, reason)
+
+    def _wake(self):
+        # Будим ожидающих по числу свободных мест; проснувшиеся сами перепроверяют окно
+        free = self.limit - self.in_flight
+        while self._waiters and free > 0:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                free -= 1
+
+    def _log(self, before: int, reason: str):
+        latency = f", задержка {self.latency:.2f} с" if self.latency is not None else ''
+        print(f"⚙ Окно одновременных {self.name}: {before} → {self.limit} ({reason}{latency})")
+
+    def summary(self) -> str:
+        return (f"окно {self.limit} (макс. {self.peak}), увеличений: {self.increases}, "
+                f"уменьшений: {self.decreases}")
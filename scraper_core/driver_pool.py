@@ -0,0 +1,146 @@
+"""
+Пул браузеров для парсеров на Selenium
+
+Selenium блокирующий, поэтому каждый браузер работает в своём потоке: N
+воркеров берут URL из общей очереди, загружают страницу в своём браузере и
+возвращают результат. Запись (хранилище, журнал неудач, архив HTML) делает
+только вызывающий поток — он получает результаты по мере готовности, поэтому
+хранилищу и журналу неудач блокировки не нужны:
+
+    pool = DriverPool(create_driver, workers=3, close_driver=end_driver)
+    for url, result, error in pool.run(urls, load_product):     # load_product(driver, url)
+        ...                                                      # error — исключение задачи или None
+
+Если после ошибки браузер не отвечает (вкладка упала, сессия потеряна), воркер
+закрывает его и открывает новый; задача при этом не повторяется — она уходит
+в журнал неудач, как и при одном браузере. Браузеры запускаются по одному:
+одновременный запуск нескольких undetected-chromedriver ломает подготовку
+chromedriver. Страницы каждый воркер загружает последовательно, поэтому
+нагрузка на сайт растёт примерно в workers раз.
+"""
+import queue
+import threading
+import time
+from typing import Callable, Iterable, Iterator, Optional, Tuple
+
+_DONE = object()
+
+
+def driver_alive(driver) -> bool:
+    """Браузер отвечает на команды (сессия жива)"""
+    try:
+        driver.execute_script('return 1')
+        return True
+    except Exception:
+        return False
+
+
+def quit_driver(driver):
+    try:
+        driver.quit()
+    except Exception:
+        pass
+
+
+class DriverPool:
+    """workers браузеров в потоках: задачи из общей очереди, результаты — вызывающему потоку"""
+
+    def __init__(self, create_driver: Callable, workers: int = 2, close_driver: Callable = quit_driver,
+                 start_attempts: int = 3, start_delay: float = 10.0):
+        # create_driver() — новый браузер; close_driver(driver) — закрыть его;
+        # start_attempts — попыток запуска браузера подряд, после чего воркер выбывает
+        if workers < 1:
+            raise ValueError("workers должен быть не меньше 1")
+        self.create_driver = create_driver
+        self.workers = workers
+        self.close_driver = close_driver
+        self.start_attempts = start_attempts
+        self.start_delay = start_delay
+        self._start_lock = threading.Lock()
+        self._stop = threading.Event()
+        self.started = 0
+        self.restarts = 0
+        self.done = 0
+        self.errors = 0
+
+    def _start_driver(self, name: str):
+        for attempt in range(1, self.start_attempts + 1):
+            if self._stop.is_set():
+                return None
+            try:
+                with self._start_lock:
+                    driver = self.create_driver()
+                    self.started += 1
+                return driver
+            except Exception as e:
+                print(f"⚠ {name}: не удалось запустить браузер ({attempt}/{self.start_attempts}): {str(e)[:100]}")
+                time.sleep(self.start_delay * attempt)
+        print(f"✗ {name}: браузер не запускается, воркер остановлен")
+        return None
+
+    def _worker(self, name: str, task: Callable, tasks: queue.Queue, results: queue.Queue):
+        driver = None
+        try:
+            while not self._stop.is_set():
+                try:
+                    item = tasks.get_nowait()
+                except queue.Empty:
+                    return
+                if driver is None:
+                    driver = self._start_driver(name)
+                    if driver is None:
+                        # Задача остаётся другим воркерам (или вернётся ошибкой, если браузеров нет)
+                        tasks.put(item)
+                        return
+                try:
+                    results.put((item, task(driver, item), None))
+                except Exception as e:
+                    results.put((item, None, e))
+                    if not driver_alive(driver):
+                        print(f"↻ {name}: браузер не отвечает, перезапуск")
+                        self.close_driver(driver)
+                        driver = None
+                        with self._start_lock:
+                            self.restarts += 1
+        finally:
+            if driver is not None:
+                self.close_driver(driver)
+            results.put((_DONE, None, None))
+
+    def run(self, items: Iterable, task: Callable) -> Iterator[Tuple[object, object, Optional[Exception]]]:
+        """Выполняет task(driver, item) для всех задач; (задача, результат, ошибка) по мере готовности"""
+        tasks = queue.Queue()
+        for item in items:
+            tasks.put(item)
+        results = queue.Queue()
+        self._stop.clear()
+        threads = [threading.Thread(target=self._worker, args=(f"Браузер {n}", task, tasks, results),
+                                    name=f"driver-{n}", daemon=True)
+                   for n in range(1, min(self.workers, tasks.qsize()) + 1)]
+        for thread in threads:
+            thread.start()
+        try:
+            running = len(threads)
+            while running:
+                item, result, error = results.get()
+                if item is _DONE:
+                    running -= 1
+                    continue
+                self.done += 1
+                if error is not None:
+                    self.errors += 1
+                yield item, result, error
+            # Все воркеры выбыли, не запустив браузер: оставшиеся задачи — ошибки
+            while not tasks.empty():
+                self.errors += 1
+                yield tasks.get_nowait(), None, RuntimeError("Нет работающих браузеров")
+        finally:
+            # Прерывание (Ctrl+C, исключение у вызывающего): воркеры доделывают текущую
+            # страницу, закрывают браузеры и выходят
+            self._stop.set()
+            for thread in threads:
+                thread.join()
+
+    def summary(self) -> str:
+        return (f"браузеров: {self.workers}, запущено: {self.started}, перезапусков: {self.restarts}, "
+                f"страниц: {self.done}, ошибок: {self.errors}")
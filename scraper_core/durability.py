@@ -0,0 +1,118 @@
+"""
+Групповая фиксация (group commit) записей журнала в фоновом потоке
+
+Парсер только кладёт карточку в очередь и сразу продолжает загрузку страниц.
+Фоновый поток копит карточки и записывает их пачкой, когда срабатывает
+политика: набралось N карточек и/или прошло T секунд с прошлой записи.
+Пока идёт fsync, новые карточки накапливаются в очереди и уходят следующей
+пачкой, поэтому при быстром потоке данных fsync делается реже одного на карточку.
+"""
+import atexit
+import queue
+import threading
+import time
+from typing import Callable, List, Optional
+
+
+class DurabilityPolicy:
+    """Частота сброса журнала на диск: по числу карточек, по времени или по обоим условиям"""
+
+    def __init__(self, every_records: Optional[int] = 1, every_seconds: Optional[float] = None,
+                 fsync: bool = True):
+        if not every_records and not every_seconds:
+            raise ValueError("Нужно задать every_records и/или every_seconds")
+        self.every_records = every_records
+        self.every_seconds = every_seconds
+        self.fsync = fsync
+
+    def is_due(self, pending: int, elapsed: float) -> bool:
+        """Пора ли записывать накопленные карточки"""
+        if pending == 0:
+            return False
+        if self.every_records and pending >= self.every_records:
+            return True
+        if self.every_seconds and elapsed >= self.every_seconds:
+            return True
+        return False
+
+    def __repr__(self):
+        return (f"DurabilityPolicy(every_records={self.every_records}, "
+                f"every_seconds={self.every_seconds}, fsync={self.fsync})")
+
+
+# Безопасное значение по умолчанию: каждая карточка сразу записывается и fsync'ается
+SAFE_POLICY = DurabilityPolicy(every_records=1, fsync=True)
+
+_STOP = object()
+
+
+class GroupCommitWriter:
+    """Фоновый поток, записывающий карточки пачками по политике DurabilityPolicy"""
+
+    def __init__(self, commit: Callable[[List[dict], bool], None], policy: DurabilityPolicy = SAFE_POLICY,
+                 name: str = 'journal-writer', on_stop: Optional[Callable[[], None]] = None):
+        # commit(cards, fsync) — записывает пачку карточек (вызывается только из фонового потока),
+        # on_stop() — освобождает ресурсы потока (например, соединение SQLite) после последней записи
+        self._commit = commit
+        self._on_stop = on_stop
+        self.policy = policy
+        self._queue = queue.Queue()
+        self._pending: List[dict] = []
+        self._last_commit = time.monotonic()
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+        # При аварийном выходе (Ctrl+C) дописываем то, что осталось в очереди
+        atexit.register(self.close)
+
+    def submit(self, card: dict):
+        """Ставит карточку в очередь на запись (не блокирует вызывающий код)"""
+        self._queue.put(card)
+
+    def close(self):
+        """Дописывает всё накопленное с fsync и останавливает поток"""
+        if self._thread.is_alive():
+            self._queue.put(_STOP)
+            self._thread.join()
+        atexit.unregister(self.close)
+
+    def _timeout(self) -> Optional[float]:
+        if not self._pending or not self.policy.every_seconds:
+            return None
+        return max(0.0, self.policy.every_seconds - (time.monotonic() - self._last_commit))
+
+    def _run(self):
+        stop = False
+        while not stop:
+            try:
+                item = self._queue.get(timeout=self._timeout())
+            except queue.Empty:
+                item = None
+
+            # Забираем всё, что уже лежит в очереди, чтобы записать одной пачкой
+            while item is not None:
+                if item is _STOP:
+                    stop = True
+                    break
+                self._pending.append(item)
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    item = None
+
+            if stop:
+                self._flush(fsync=True)
+                if self._on_stop is not None:
+                    self._on_stop()
+            elif self.policy.is_due(len(self._pending), time.monotonic() - self._last_commit):
+                self._flush(fsync=self.policy.fsync)
+
+    def _flush(self, fsync: bool):
+        if not self._pending:
+            return
+        try:
+            self._commit(self._pending, fsync)
+            self._pending = []
+        except Exception as e:
+            # Карточки остаются в буфере и уйдут со следующей пачкой
+            print(f"✗ Ошибка при сохранении: {e}")
+        self._last_commit = time.monotonic()
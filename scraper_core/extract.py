@@ -0,0 +1,100 @@
+"""
+Быстрое извлечение полей со страниц товаров: lxml и заранее скомпилированные XPath
+
+BeautifulSoup строит из каждой страницы дерево Python-объектов (по объекту на
+каждый тег и строку), а потом обходит его цепочками find. Здесь страница
+разбирается libxml2 в C, селекторы полей магазина компилируются один раз при
+импорте модуля разбора, а в Python поднимаются только найденные узлы —
+название, цена, строки характеристик и складов:
+
+    NAME = select('div', cls='page-title')
+    PARAMS = select('div', cls='cat-article-params')
+    DT = select('dt')
+
+    tree = html_tree(html)
+    name = find_text(tree, NAME)                   # soup.find('div', class_='page-title').text.strip()
+    params = require(tree, PARAMS)                 # ExtractError, если блока нет
+    keys = [text(dt).strip() for dt in find_all(params, DT)]
+
+Правила совпадают с BeautifulSoup: cls='a' — один из классов элемента,
+cls='a b' — атрибут class целиком; find(node, A, B) — первый B внутри первого A;
+text() не включает содержимое <script>, <style> и <template>.
+"""
+from typing import Dict, List, Optional
+
+from lxml import etree
+
+_TEXT = etree.XPath('descendant-or-self::text()[not(ancestor::script or ancestor::style or ancestor::template)]',
+                    smart_strings=False)
+
+
+class ExtractError(ValueError):
+    """На странице нет обязательного блока (журнал неудач относит её к parse_error)"""
+
+
+def _literal(value: str) -> str:
+    # Строка для XPath: кавычки внутри значения не ломают выражение
+    if "'" not in value:
+        return f"'{value}'"
+    if '"' not in value:
+        return f'"{value}"'
+    parts = value.split("'")
+    return "concat(" + ", \"'\", ".join(f"'{part}'" for part in parts) + ")"
+
+
+def class_test(cls: str) -> str:
+    """Условие XPath для class_ BeautifulSoup"""
+    if ' ' in cls.strip():
+        return f"normalize-space(@class)={_literal(' '.join(cls.split()))}"
+    return f"contains(concat(' ', normalize-space(@class), ' '), {_literal(' ' + cls + ' ')})"
+
+
+def select(tag: str = '*', cls: Optional[str] = None, attrs: Optional[Dict[str, str]] = None) -> etree.XPath:
+    """Скомпилированный аналог find_all(tag, attrs, class_=cls): потомки узла в порядке документа"""
+    tests = [class_test(cls)] if cls else []
+    tests += [f"@{name}={_literal(value)}" for name, value in (attrs or {}).items()]
+    predicate = f"[{' and '.join(tests)}]" if tests else ''
+    return etree.XPath(f'.//{tag}{predicate}')
+
+
+def html_tree(html: str):
+    """Дерево страницы (lxml). ExtractError — страница пустая"""
+    # lxml не принимает str с <?xml ... encoding=...?> (ValueError), а строка уже декодирована —
+    # передаём её в UTF-8 и не даём объявлению кодировки в странице это переопределить
+    tree = etree.fromstring(html.encode('utf-8'), etree.HTMLParser(encoding='utf-8')) if html else None
+    if tree is None:
+        raise ExtractError("Пустая страница")
+    return tree
+
+
+def find(node, *selectors: etree.XPath):
+    """Первый элемент по цепочке селекторов (как soup.find(...).find(...)), None — не найден"""
+    for selector in selectors:
+        if node is None:
+            return None
+        found = selector(node)
+        node = found[0] if found else None
+    return node
+
+
+def find_all(node, selector: etree.XPath) -> List:
+    return selector(node)
+
+
+def require(node, *selectors: etree.XPath):
+    """Как find, но без обязательного блока страница считается нераспознанной"""
+    element = find(node, *selectors)
+    if element is None:
+        raise ExtractError(f"Не найден элемент: {selectors[-1].path}")
+    return element
+
+
+def text(node) -> str:
+    """Текст элемента со всеми вложенными (аналог .text BeautifulSoup)"""
+    return ''.join(_TEXT(node))
+
+
+def find_text(node, *selectors: etree.XPath) -> Optional[str]:
+    """Текст найденного элемента без пробелов по краям, None — элемента нет"""
+    element = find(node, *selectors)
+    return text(element).strip() if element is not None else None
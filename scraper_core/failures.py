@@ -0,0 +1,273 @@
+"""
+Журнал неудачных загрузок (ledger) и планировщик повторов
+
+Вместо перезаписываемого url_break_list_*.txt каждая неудача дописывается
+в data_MM.YYYY_*.failures.jsonl рядом с файлом данных — одной строкой с
+текущим состоянием записи URL (последняя строка для URL главнее):
+
+    {"url": ..., "kind": "timeout", "attempts": 2, "first_failed": ...,
+     "last_failed": ..., "message": ...}
+    {"url": ..., "resolved": true, "at": ...}     — URL обработан успешно
+
+Класс ошибки (kind): timeout, captcha, not_found (404/410), parse_error,
+network, http_error, other. Повторный проход берёт только URL, у которых
+истекла пауза (экспоненциальная, своя база для каждого класса), и
+пропускает постоянные ошибки: not_found и URL, исчерпавшие MAX_ATTEMPTS.
+Основной проход тоже не тратит время на постоянные ошибки.
+
+    python -m scraper_core failures LeroyMerlin/data_02.2026_Tiles_LemanaPRO.json
+"""
+import json
+import os
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import Container, Dict, Optional, Union
+
+TIMEOUT = 'timeout'
+CAPTCHA = 'captcha'
+NOT_FOUND = 'not_found'
+PARSE_ERROR = 'parse_error'
+NETWORK = 'network'
+HTTP_ERROR = 'http_error'
+OTHER = 'other'
+
+# Повторять бессмысленно
+PERMANENT_KINDS = {NOT_FOUND}
+# Пауза перед n-й повторной попыткой: база * 2**(n-1), не больше BACKOFF_MAX (секунды)
+BACKOFF_BASE = {
+    TIMEOUT: 60,
+    NETWORK: 60,
+    HTTP_ERROR: 120,
+    PARSE_ERROR: 300,
+    CAPTCHA: 900,
+    OTHER: 120,
+}
+BACKOFF_MAX = 6 * 3600
+# После стольких неудач подряд URL считается постоянной ошибкой
+MAX_ATTEMPTS = 6
+
+# Признаки страницы-заглушки вместо карточки товара (проверяются, только если карточка не разобрана)
+CAPTCHA_MARKERS = ('captcha', 'капча', 'вы не робот', 'are you a robot', 'qrator', 'servicepipe',
+                   'доступ ограничен', 'access denied')
+NOT_FOUND_MARKERS = ('страница не найдена', '404 not found', 'ошибка 404', 'товар не найден')
+
+
+class FetchError(Exception):
+    """Страница не загружена или не распознана, класс ошибки известен"""
+
+    def __init__(self, kind: str, message: str = ''):
+        super().__init__(message or kind)
+        self.kind = kind
+
+
+def ledger_path_for(file_path: str) -> str:
+    """Путь к журналу неудач для файла данных: data_X.json -> data_X.failures.jsonl"""
+    root, _ = os.path.splitext(file_path)
+    return root + '.failures.jsonl'
+
+
+def classify_status(status: int) -> str:
+    if status in (404, 410):
+        return NOT_FOUND
+    if status in (403, 429):
+        # Антибот-защита отвечает 403/429 вместо страницы с капчей
+        return CAPTCHA
+    return HTTP_ERROR
+
+
+def classify_page(html: Optional[str]) -> str:
+    """Класс ошибки для загруженной, но не разобранной страницы"""
+    text = (html or '').lower()
+    if any(marker in text for marker in CAPTCHA_MARKERS):
+        return CAPTCHA
+    if any(marker in text for marker in NOT_FOUND_MARKERS):
+        return NOT_FOUND
+    return PARSE_ERROR
+
+
+def classify_error(exc: BaseException) -> str:
+    """Класс ошибки по исключению (aiohttp, selenium, разбор BeautifulSoup)"""
+    if isinstance(exc, FetchError):
+        return exc.kind
+    status = getattr(exc, 'status', None)
+    if isinstance(status, int):
+        # aiohttp.ClientResponseError
+        return classify_status(status)
+    names = {cls.__name__ for cls in type(exc).__mro__}
+    if names & {'TimeoutError', 'TimeoutException', 'ServerTimeoutError', 'timeout'}:
+        return TIMEOUT
+    if names & {'NoSuchElementException', 'StaleElementReferenceException'} or \
+            isinstance(exc, (AttributeError, IndexError, KeyError, ValueError, TypeError)):
+        # soup.find(...) вернул None, нет нужного блока на странице
+        return PARSE_ERROR
+    if isinstance(exc, OSError) or names & {'ClientError', 'WebDriverException'}:
+        return NETWORK
+    return OTHER
+
+
+def is_permanent(record: dict) -> bool:
+    return record['kind'] in PERMANENT_KINDS or record['attempts'] >= MAX_ATTEMPTS
+
+
+def next_retry_at(record: dict) -> datetime:
+    """Время, раньше которого повторять URL бессмысленно"""
+    base = BACKOFF_BASE.get(record['kind'], BACKOFF_BASE[OTHER])
+    delay = min(BACKOFF_MAX, base * 2 ** (record['attempts'] - 1))
+    return datetime.fromisoformat(record['last_failed']) + timedelta(seconds=delay)
+
+
+class FailureLedger:
+    """Неудачные загрузки одного файла данных (data_MM.YYYY_*.json)"""
+
+    def __init__(self, file_path: str):
+        self.path = ledger_path_for(file_path)
+        self.records: Dict[str, dict] = {}
+        # URL, не обработанные в этом запуске (для итоговой статистики прохода)
+        self.failed_now = set()
+        self._lines = 0
+        self._file = None
+        self._load()
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    # Недописанная строка после сбоя
+                    continue
+                self._lines += 1
+                if entry.get('resolved'):
+                    self.records.pop(entry['url'], None)
+                else:
+                    self.records[entry['url']] = entry
+
+    def _write(self, entry: dict):
+        if self._file is None:
+            self._file = open(self.path, 'a', encoding='utf-8')
+        self._file.write(json.dumps(entry, ensure_ascii=False) + '\n')
+        self._file.flush()
+        self._lines += 1
+
+    def __contains__(self, url: str) -> bool:
+        return url in self.records
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def record(self, url: str, error: Union[BaseException, str], page: Optional[str] = None) -> dict:
+        """Записывает неудачу: error — исключение или класс ошибки, page — загруженный HTML"""
+        if isinstance(error, BaseException):
+            kind, message = classify_error(error), str(error)
+        else:
+            kind, message = error, ''
+        if kind == PARSE_ERROR and page is not None:
+            kind = classify_page(page)
+
+        now = datetime.now().isoformat(timespec='seconds')
+        previous = self.records.get(url)
+        entry = {
+            'url': url,
+            'kind': kind,
+            'attempts': previous['attempts'] + 1 if previous else 1,
+            'first_failed': previous['first_failed'] if previous else now,
+            'last_failed': now,
+            'message': message[:200],
+        }
+        self.records[url] = entry
+        self.failed_now.add(url)
+        self._write(entry)
+        return entry
+
+    def resolve(self, url: str):
+        """URL обработан успешно — убирает его из журнала неудач"""
+        self.failed_now.discard(url)
+        if self.records.pop(url, None) is not None:
+            self._write({'url': url, 'resolved': True, 'at': datetime.now().isoformat(timespec='seconds')})
+
+    def is_permanent(self, url: str) -> bool:
+        record = self.records.get(url)
+        return record is not None and is_permanent(record)
+
+    def schedule(self, exclude: Container[str] = (), now: Optional[datetime] = None) -> dict:
+        """
+        Разбивает неудачные URL на готовые к повтору (due, сначала самые старые),
+        ожидающие паузы (waiting) и постоянные ошибки (permanent).
+        exclude — уже обработанные URL (например, storage.processed_urls())
+        """
+        now = now or datetime.now()
+        due, waiting, permanent = [], [], []
+        for url, record in self.records.items():
+            if url in exclude:
+                continue
+            if is_permanent(record):
+                permanent.append(url)
+            elif next_retry_at(record) <= now:
+                due.append(url)
+            else:
+                waiting.append(url)
+        due.sort(key=lambda url: self.records[url]['last_failed'])
+        return {'due': due, 'waiting': waiting, 'permanent': permanent}
+
+    def due_for_retry(self, processed_urls: Container[str] = ()) -> list:
+        """URL для повторного прохода (с выводом плана повторов)"""
+        plan = self.schedule(exclude=processed_urls)
+        print(f"Всего неудачных URL: {len(self.records)}")
+        print(f"К повторной обработке: {len(plan['due'])}")
+        print(f"Ждут паузы перед повтором: {len(plan['waiting'])}")
+        print(f"Постоянные ошибки (пропуск): {len(plan['permanent'])}")
+        if not plan['due'] and plan['waiting']:
+            print(f"Ближайший повтор через {round(self.next_retry_in() / 60, 1)} мин")
+        return plan['due']
+
+    def next_retry_in(self, now: Optional[datetime] = None) -> Optional[float]:
+        """Секунд до ближайшего повтора (None — повторять нечего)"""
+        now = now or datetime.now()
+        times = [next_retry_at(record) for record in self.records.values() if not is_permanent(record)]
+        if not times:
+            return None
+        return max(0.0, (min(times) - now).total_seconds())
+
+    def summary(self) -> Counter:
+        """Число неудачных URL по классам ошибок"""
+        return Counter(record['kind'] for record in self.records.values())
+
+    def print_summary(self, processed_urls: Container[str] = ()):
+        """Итог для вывода в конце прохода"""
+        if not self.records:
+            print("✓ Журнал неудач пуст")
+            return
+        plan = self.schedule(exclude=processed_urls)
+        kinds = ', '.join(f"{kind}: {count}" for kind, count in self.summary().most_common())
+        print(f"✗ Неудачных URL: {len(self.records)} ({kinds})")
+        print(f"  К повтору сейчас: {len(plan['due'])}, ждут паузы: {len(plan['waiting'])}, "
+              f"постоянные ошибки: {len(plan['permanent'])}")
+
+    def compact(self):
+        """Переписывает журнал: по одной строке на неудачный URL (удаляет файл, если их нет)"""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        if not self.records:
+            if os.path.exists(self.path):
+                os.remove(self.path)
+            self._lines = 0
+            return
+        temp_file = self.path + '.tmp'
+        with open(temp_file, 'w', encoding='utf-8') as f:
+            for entry in self.records.values():
+                f.write(json.dumps(entry, ensure_ascii=False) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_file, self.path)
+        self._lines = len(self.records)
+
+    def close(self):
+        """Закрывает файл; журнал сжимается, если в нём в основном устаревшие строки"""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        if self._lines > 2 * len(self.records) + 100:
+            self.compact()
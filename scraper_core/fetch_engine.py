@@ -0,0 +1,157 @@
+"""
+Общий асинхронный движок загрузки страниц для нескольких сайтов
+
+Одна HTTP-сессия (http_session.py) на все сайты, а у каждого сайта (хоста)
+свой бюджет HostBudget: частота запросов (token bucket, rate_limit.py) и
+адаптивное окно одновременных запросов (AIMD, concurrency.py). Поверх —
+повтор временных ошибок (retry.py) и условные запросы по кешу (http_cache.py):
+
+    engine = FetchEngine(HTTP_SETTINGS, headers, retry=RETRY, cache=http_cache,
+                         hosts={'www.keramogranit.ru': HostBudget(rate=10, limiter=CONCURRENCY)})
+    async with engine:
+        html = await engine.fetch(url)
+        await engine.crawl(urls, handle_url)    # handle_url(url) сам вызывает engine.fetch
+
+crawl раскладывает задачи по хостам и обходит хосты одновременно, у каждого
+своя очередь и свои воркеры: медленный или исчерпавший бюджет сайт не
+задерживает остальные, и общая скорость — сумма бюджетов сайтов, а не их
+очерёдность. Хосты без явного бюджета получают HostBudget() по умолчанию.
+"""
+import asyncio
+from typing import Awaitable, Callable, Dict, Iterable, Optional
+from urllib.parse import urlsplit
+
+from scraper_core.concurrency import AimdLimiter
+from scraper_core.http_cache import HttpCache
+from scraper_core.http_session import HttpSettings, create_session
+from scraper_core.rate_limit import TokenBucket
+from scraper_core.retry import RetryPolicy
+from scraper_core.work_queue import WorkQueue
+
+
+def host_of(url: str) -> str:
+    return urlsplit(url).netloc
+
+
+class HostBudget:
+    """Бюджет одного сайта: частота запросов и окно одновременных запросов"""
+
+    def __init__(self, rate: Optional[float] = None, burst: Optional[int] = None,
+                 limiter: Optional[AimdLimiter] = None):
+        # rate — запросов в секунду (None — без ограничения), burst — сколько можно подряд после паузы,
+        # limiter — окно одновременных запросов (по умолчанию AimdLimiter())
+        self.bucket = TokenBucket(rate, burst)
+        self.limiter = limiter or AimdLimiter()
+        self.requests = 0
+        self.errors = 0
+
+    def summary(self) -> str:
+        return (f"запросов: {self.requests}, ошибок: {self.errors}; {self.bucket.summary()}; "
+                f"{self.limiter.summary()}")
+
+
+class FetchEngine:
+    """Загрузка страниц с бюджетом на каждый сайт, повтором ошибок и кешем"""
+
+    def __init__(self, settings: Optional[HttpSettings] = None, headers: Optional[dict] = None,
+                 hosts: Optional[Dict[str, HostBudget]] = None, retry: Optional[RetryPolicy] = None,
+                 cache: Optional[HttpCache] = None,
+                 default_budget: Callable[[], HostBudget] = HostBudget,
+                 resolve: Optional[Callable[[str], str]] = None, cookies: Optional[dict] = None):
+        # resolve — адрес, по которому на самом деле идёт запрос (например, локальный стенд
+        # fixture_server.py); бюджет, кеш и журналы по-прежнему ведутся по исходному URL.
+        # cookies — {имя: значение} для всех запросов (например, сессия браузера, hybrid_fetch.py)
+        self.settings = settings or HttpSettings()
+        self.headers = headers
+        self.cookies = dict(cookies or {})
+        self.hosts = dict(hosts or {})
+        self.retry = retry or RetryPolicy()
+        self.cache = cache
+        self.default_budget = default_budget
+        self.resolve = resolve
+        self.session = None
+
+    async def __aenter__(self):
+        # Сессию создаём внутри цикла asyncio; бюджеты и окна сохраняются между этапами
+        self.session = create_session(self.settings, self.headers, self.cookies)
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.session.close()
+        self.session = None
+
+    def update_cookies(self, cookies: dict):
+        """Обновляет cookies (в том числе открытой сессии), например после прохода капчи в браузере"""
+        self.cookies.update(cookies)
+        if self.session is not None:
+            self.session.cookie_jar.update_cookies(cookies)
+
+    def budget(self, url: str) -> HostBudget:
+        host = host_of(url)
+        if host not in self.hosts:
+            self.hosts[host] = self.default_budget()
+            # В журнале изменений окна видно, к какому сайту оно относится
+            self.hosts[host].limiter.name = f"запросов к {host}"
+        return self.hosts[host]
+
+    async def fetch_once(self, url: str) -> str:
+        """Одна попытка загрузки страницы (ошибки пробрасываются)"""
+        budget = self.budget(url)
+        await budget.bucket.acquire()
+        # Место в адаптивном окне одновременных запросов сайта
+        started = await budget.limiter.acquire()
+        budget.requests += 1
+        status = None
+        error = None
+        try:
+            # Страница уже в кеше — условный запрос, на 304 сайт не присылает тело
+            conditional = self.cache.validators(url) if self.cache is not None else {}
+            target = self.resolve(url) if self.resolve is not None else url
+            while True:
+                async with self.session.get(target, headers=conditional) as response:
+                    status = response.status
+                    if status == 304 and conditional:
+                        html = await asyncio.to_thread(self.cache.not_modified, url)
+                        if html is not None:
+                            return html
+                        # Запись кеша пропала между запросами — загружаем страницу целиком
+                        conditional = {}
+                        continue
+                    # 404, 403/429 (антибот) и т.п. — ошибка со статусом, а не страница-заглушка
+                    response.raise_for_status()
+                    html = await response.text()
+                    if self.cache is not None:
+                        await asyncio.to_thread(self.cache.store, url, html, response.headers.get('ETag'),
+                                                response.headers.get('Last-Modified'), bool(conditional))
+                    return html
+        except Exception as e:
+            error = e
+            budget.errors += 1
+            raise
+        finally:
+            # Окно растёт или уменьшается по задержке и результату запроса;
+            # пауза перед повтором идёт уже вне окна
+            budget.limiter.release(started, status=status, error=error)
+
+    async def fetch(self, url: str) -> str:
+        """Загрузка страницы с повтором временных ошибок (последняя ошибка пробрасывается)"""
+        return await self.retry.run(self.fetch_once, url, label=url)
+
+    async def crawl(self, items: Iterable, handler: Callable[[object], Awaitable],
+                    url_of: Callable[[object], str] = lambda item: item):
+        """Обрабатывает задачи всех хостов одновременно: у каждого хоста своя очередь и воркеры"""
+        by_host: Dict[str, list] = {}
+        for item in items:
+            by_host.setdefault(host_of(url_of(item)), []).append(item)
+        # Воркеров у хоста столько, сколько может быть его окно: ждут они в бюджете своего сайта
+        queues = [WorkQueue(handler, workers=self.budget(url_of(host_items[0])).limiter.max_limit)
+                  for host_items in by_host.values()]
+        await asyncio.gather(*(queue.run(host_items) for queue, host_items in zip(queues, by_host.values())))
+
+    def print_summary(self):
+        for host, budget in self.hosts.items():
+            if budget.requests:
+                print(f"⚙ {host}: {budget.summary()}")
+        print(f"↻ Повторы при загрузке: {self.retry.summary()}")
+        if self.cache is not None:
+            print(f"🗄 Кеш страниц: {self.cache.summary()}")
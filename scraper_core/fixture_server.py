@@ -0,0 +1,204 @@
+"""
+Локальный стенд: записанные страницы магазинов по HTTP без обращения к сайтам
+
+Страницы берутся из архива HTML (html_archive.py, режим HTML_ARCHIVE_DIR):
+страницы товаров и каталога, для каждого URL — последняя загрузка. Стенд
+отдаёт их по адресу http://127.0.0.1:8765/<хост>/<путь>?<запрос>, а движок
+загрузки (fetch_engine.py) перенаправляет туда запросы через resolve:
+
+    async with FixtureServer(load_pages(archive_root), latency=0.05, error_rate=0.02) as server:
+        engine = FetchEngine(..., resolve=server.local_url)
+
+Чтобы проверить повторы, окно AIMD и таймауты, стенд умеет имитировать сайт:
+задержка ответа (latency + случайно до jitter секунд), доля ответов с ошибкой
+(error_rate, статус error_status) и доля «зависших» ответов (stall_rate —
+ответ придёт только через stall секунд). Счётчики — GET /_stats (JSON).
+
+Как сайт с валидаторами (validators=True, по умолчанию) стенд отдаёт ETag
+(хеш страницы в архиве) и Last-Modified (время записи) и отвечает 304 без
+тела на If-None-Match / If-Modified-Since — на нём проверяется кеш
+условных запросов (http_cache.py, bench --cache).
+
+Из командной строки:
+
+    python -m scraper_core serve KeramogranitRU/html_archive --latency 0.05 --error-rate 0.02
+"""
+import asyncio
+import os
+import random
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Dict, Iterable, Optional, Tuple
+from urllib.parse import unquote, urlsplit
+
+from aiohttp import web
+
+from scraper_core.html_archive import HtmlArchive, read_page
+
+# Виды страниц архива, которые открываются по своему URL (страница склада LemanaPRO — нет)
+SERVED_KINDS = ('product', 'catalog')
+STATS_PATH = '/_stats'
+
+
+def page_key(url: str) -> str:
+    """Путь страницы на стенде: хост, путь и запрос исходного URL (без #фрагмента)"""
+    parts = urlsplit(url)
+    key = parts.netloc + (parts.path or '/')
+    if parts.query:
+        key += '?' + parts.query
+    return unquote(key)
+
+
+def load_pages(*archive_roots: str) -> Dict[str, Tuple[str, dict]]:
+    """Страницы архивов: {путь на стенде: (каталог архива, строка индекса)}, последняя загрузка URL"""
+    pages = {}
+    for root in archive_roots:
+        archive = HtmlArchive(root)
+        for entry in archive.entries():
+            if entry.get('kind', 'product') in SERVED_KINDS:
+                pages[page_key(entry['url'])] = (root, entry)
+        archive.close()
+    return pages
+
+
+def fixture_url(base_url: str, url: str) -> str:
+    """Адрес страницы url на стенде base_url"""
+    return f"{base_url}/{page_key(url)}"
+
+
+def page_validators(entry: dict) -> Dict[str, str]:
+    """ETag и Last-Modified записанной страницы"""
+    headers = {'ETag': f'"{entry["sha256"][:32]}"'}
+    fetched_at = datetime.fromisoformat(entry['fetched_at']).astimezone(timezone.utc)
+    headers['Last-Modified'] = format_datetime(fetched_at, usegmt=True)
+    return headers
+
+
+def not_modified(request: web.Request, validators: Dict[str, str]) -> bool:
+    """Условный запрос совпал с текущей версией страницы (ответ 304)"""
+    if_none_match = request.headers.get('If-None-Match')
+    if if_none_match is not None:
+        # If-None-Match важнее If-Modified-Since; слабые ETag (W/"...") сравниваются как обычные
+        tags = {tag.strip().removeprefix('W/') for tag in if_none_match.split(',')}
+        return '*' in tags or validators['ETag'] in tags
+    if_modified_since = request.headers.get('If-Modified-Since')
+    if if_modified_since is not None:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        return parsedate_to_datetime(validators['Last-Modified']) <= since
+    return False
+
+
+class FixtureServer:
+    """HTTP-сервер записанных страниц с задержкой и ошибками"""
+
+    def __init__(self, pages: Dict[str, Tuple[str, dict]], host: str = '127.0.0.1', port: int = 8765,
+                 latency: float = 0.0, jitter: float = 0.0, error_rate: float = 0.0,
+                 error_status: int = 503, stall_rate: float = 0.0, stall: float = 60.0,
+                 seed: Optional[int] = None, validators: bool = True):
+        self.pages = pages
+        self.host = host
+        self.port = port
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.stall_rate = stall_rate
+        self.stall = stall
+        self.validators = validators
+        self._random = random.Random(seed)
+        self._runner = None
+        self.requests = 0
+        self.served = 0
+        self.missing = 0
+        self.errors = 0
+        self.stalls = 0
+        self.not_modified = 0
+        self.bytes = 0
+
+    @property
+    def base_url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    def local_url(self, url: str) -> str:
+        """Адрес страницы на стенде (для FetchEngine(resolve=...))"""
+        return fixture_url(self.base_url, url)
+
+    async def start(self):
+        app = web.Application()
+        app.router.add_get('/{tail:.*}', self._handle)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, self.host, self.port).start()
+
+    async def stop(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.stop()
+
+    async def _handle(self, request: web.Request) -> web.Response:
+        if request.path == STATS_PATH:
+            return web.json_response(self.stats())
+        self.requests += 1
+        roll = self._random.random()
+        delay = self.latency + self._random.uniform(0, self.jitter)
+        if roll < self.stall_rate:
+            self.stalls += 1
+            delay += self.stall
+        await asyncio.sleep(delay)
+        if roll >= 1 - self.error_rate:
+            self.errors += 1
+            return web.Response(status=self.error_status, text='injected error')
+        page = self.pages.get(unquote(request.raw_path[1:]))
+        if page is None:
+            self.missing += 1
+            return web.Response(status=404, text='not recorded')
+        headers = page_validators(page[1]) if self.validators else {}
+        if headers and not_modified(request, headers):
+            self.not_modified += 1
+            return web.Response(status=304, headers=headers)
+        # Распаковка страницы не задерживает остальные ответы
+        html = await asyncio.to_thread(read_page, *page)
+        self.served += 1
+        self.bytes += len(html)
+        return web.Response(text=html, content_type='text/html', headers=headers)
+
+    def stats(self) -> dict:
+        return {'pages': len(self.pages), 'requests': self.requests, 'served': self.served, 'missing': self.missing,
+                'errors': self.errors, 'stalls': self.stalls, 'not_modified': self.not_modified,
+                'bytes': self.bytes}
+
+    def describe(self) -> str:
+        return (f"{self.base_url}, задержка {self.latency * 1000:g}"
+                f"+{self.jitter * 1000:g} мс, ошибки {self.error_rate:.0%} ({self.error_status}), "
+                f"зависания {self.stall_rate:.0%} ({self.stall:g} с)"
+                + (", ETag/Last-Modified и 304" if self.validators else ", без валидаторов"))
+
+    def summary(self) -> str:
+        return (f"запросов: {self.requests}, отдано страниц: {self.served}, не изменилось (304): "
+                f"{self.not_modified}, нет в записи: {self.missing}, ошибок: {self.errors}, зависаний: {self.stalls}")
+
+
+async def serve(archive_roots: Iterable[str], **options):
+    """Запускает стенд и держит его до остановки (Ctrl+C)"""
+    roots = []
+    for root in archive_roots:
+        if os.path.isdir(root):
+            roots.append(root)
+        else:
+            print(f"⚠ Архив не найден: {root}")
+    async with FixtureServer(load_pages(*roots), **options) as server:
+        print(f"✓ Стенд запущен: {server.describe()}, записанных страниц: {len(server.pages)}")
+        try:
+            await asyncio.Event().wait()
+        finally:
+            print(f"⚙ Стенд: {server.summary()}")
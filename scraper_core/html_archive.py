@@ -0,0 +1,182 @@
+"""
+Архив исходного HTML карточек товаров (необязательный режим)
+
+Каждая загруженная страница сжимается (zstd, если установлен пакет
+zstandard, иначе gzip) и дописывается в сегмент текущего дня:
+
+    html_archive/
+        2026-02-14.seg          — сжатые страницы подряд
+        2026-02-14.idx.jsonl    — по строке на загрузку: URL, файл данных,
+                                  время, sha256 страницы и её место в сегменте
+
+Страница адресуется хешем содержимого: если такой HTML уже есть в архиве
+(в том числе с прошлых запусков), в сегмент ничего не пишется, а строка
+индекса ссылается на уже сохранённую копию. Когда на сайте меняется вёрстка,
+данные можно пересобрать из архива без повторного обхода магазина.
+"""
+import gzip
+import hashlib
+import json
+import os
+import threading
+from datetime import datetime
+from typing import Dict, Iterator, Optional
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+CODECS = ('zstd', 'gzip')
+SEGMENT_SUFFIX = '.seg'
+INDEX_SUFFIX = '.idx.jsonl'
+
+
+def default_codec() -> str:
+    return 'zstd' if zstandard is not None else 'gzip'
+
+
+def compress(data: bytes, codec: str) -> bytes:
+    if codec == 'zstd':
+        if zstandard is None:
+            raise RuntimeError("Для сжатия zstd установите пакет zstandard")
+        return zstandard.ZstdCompressor(level=10).compress(data)
+    if codec == 'gzip':
+        return gzip.compress(data, compresslevel=6)
+    raise ValueError(f"Неизвестный формат сжатия: {codec} (доступны: {', '.join(CODECS)})")
+
+
+def decompress(data: bytes, codec: str) -> bytes:
+    if codec == 'zstd':
+        if zstandard is None:
+            raise RuntimeError("Для чтения страниц в zstd установите пакет zstandard")
+        return zstandard.ZstdDecompressor().decompress(data)
+    if codec == 'gzip':
+        return gzip.decompress(data)
+    raise ValueError(f"Неизвестный формат сжатия: {codec} (доступны: {', '.join(CODECS)})")
+
+
+def read_page(root: str, entry: dict) -> str:
+    """HTML страницы по строке индекса (без загрузки индекса архива — для пула процессов)"""
+    with open(os.path.join(root, entry['segment']), 'rb') as f:
+        f.seek(entry['offset'])
+        blob = f.read(entry['length'])
+    return decompress(blob, entry['codec']).decode('utf-8')
+
+
+class HtmlArchive:
+    """Архив страниц одного магазина (каталог с посуточными сегментами)"""
+
+    def __init__(self, root: str, codec: Optional[str] = None):
+        self.root = root
+        self.codec = codec or default_codec()
+        if self.codec not in CODECS:
+            raise ValueError(f"Неизвестный формат сжатия: {self.codec} (доступны: {', '.join(CODECS)})")
+        os.makedirs(root, exist_ok=True)
+        self._lock = threading.Lock()
+        self._day = None
+        self._segment = None
+        self._index = None
+        # sha256 -> место уже сохранённой копии (сегмент, смещение, длина, сжатие)
+        self._objects: Dict[str, dict] = {}
+        for entry in self.entries():
+            self._objects.setdefault(entry['sha256'], self._location(entry))
+        self.stored = 0
+        self.deduplicated = 0
+
+    @staticmethod
+    def _location(entry: dict) -> dict:
+        return {key: entry[key] for key in ('segment', 'offset', 'length', 'codec')}
+
+    def _index_files(self):
+        return sorted(name for name in os.listdir(self.root) if name.endswith(INDEX_SUFFIX))
+
+    def entries(self, day: Optional[str] = None, dataset: Optional[str] = None) -> Iterator[dict]:
+        """Строки индекса (по одной на загрузку) в порядке записи"""
+        for name in self._index_files():
+            if day is not None and name != day + INDEX_SUFFIX:
+                continue
+            with open(os.path.join(self.root, name), 'r', encoding='utf-8') as f:
+                for line in f:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        # Обрывок строки после аварийного завершения
+                        continue
+                    if dataset is not None and entry.get('dataset') != dataset:
+                        continue
+                    yield entry
+
+    def _open_day(self, day: str):
+        if self._day == day:
+            return
+        self._close_files()
+        self._segment = open(os.path.join(self.root, day + SEGMENT_SUFFIX), 'ab')
+        self._index = open(os.path.join(self.root, day + INDEX_SUFFIX), 'a', encoding='utf-8')
+        self._day = day
+
+    def put(self, url: str, html: str, dataset: Optional[str] = None, kind: str = 'product',
+            fetched_at: Optional[datetime] = None) -> Optional[str]:
+        """Сохраняет страницу в архив. Возвращает sha256 или None при ошибке записи"""
+        fetched_at = fetched_at or datetime.now()
+        raw = html.encode('utf-8')
+        digest = hashlib.sha256(raw).hexdigest()
+        try:
+            with self._lock:
+                self._open_day(fetched_at.strftime('%Y-%m-%d'))
+                location = self._objects.get(digest)
+                if location is None:
+                    blob = compress(raw, self.codec)
+                    offset = self._segment.seek(0, os.SEEK_END)
+                    self._segment.write(blob)
+                    # Сначала данные, потом строка индекса: индекс не ссылается на недописанное
+                    self._segment.flush()
+                    location = {'segment': self._day + SEGMENT_SUFFIX, 'offset': offset,
+                                'length': len(blob), 'codec': self.codec}
+                    self._objects[digest] = location
+                    self.stored += 1
+                else:
+                    self.deduplicated += 1
+                entry = {'url': url, 'dataset': dataset, 'kind': kind,
+                         'fetched_at': fetched_at.isoformat(timespec='seconds'),
+                         'sha256': digest, **location}
+                self._index.write(json.dumps(entry, ensure_ascii=False) + '\n')
+                self._index.flush()
+            return digest
+        except Exception as e:
+            # Архив вспомогательный: ошибка записи не должна останавливать парсинг
+            print(f"⚠ Не удалось сохранить HTML в архив: {e}")
+            return None
+
+    def read(self, entry: dict) -> str:
+        """HTML страницы по строке индекса"""
+        return read_page(self.root, entry)
+
+    def get(self, digest: str) -> Optional[str]:
+        """HTML страницы по sha256 содержимого"""
+        location = self._objects.get(digest)
+        if location is None:
+            return None
+        return self.read(location)
+
+    def _close_files(self):
+        for f in (self._segment, self._index):
+            if f is not None:
+                f.close()
+        self._segment = None
+        self._index = None
+        self._day = None
+
+    def close(self):
+        with self._lock:
+            self._close_files()
+
+
+def open_archive(root: Optional[str], codec: Optional[str] = None) -> Optional[HtmlArchive]:
+    """Открывает архив; None, если архивирование выключено (root не задан)"""
+    if not root:
+        return None
+    return HtmlArchive(root, codec=codec)
@@ -0,0 +1,238 @@
+"""
+Дисковый кеш страниц для условных запросов (ETag / Last-Modified)
+
+Для каждой загруженной страницы, в ответе на которую сайт прислал ETag или
+Last-Modified, сохраняются сжатое тело и эти валидаторы. При следующей
+загрузке того же URL (в том числе в следующем месяце) запрос уходит с
+If-None-Match / If-Modified-Since, и если страница не менялась, сайт отвечает
+304 без тела — страница берётся из кеша:
+
+    http_cache/
+        3f/3fa2...e1.json   — URL, ETag, Last-Modified, время сохранения, сжатие
+        3f/3fa2...e1.body   — сжатый HTML (zstd или gzip, как в html_archive)
+
+    cache = open_cache(os.path.join(SCRIPT_DIR, 'http_cache'))
+    headers = cache.validators(url)          # {} — страницы в кеше нет
+    ...                                      # 304 → cache.not_modified(url), 200 → cache.store(...)
+
+Карточка при этом разбирается заново (с текущей датой), экономится только
+загрузка. Счётчики попаданий печатаются в конце этапа (summary).
+
+Каталог создаётся при первой записи. С max_bytes объём сжатых тел
+ограничен: при превышении удаляются давно не использованные страницы
+(по времени последней записи или попадания) до 90% лимита.
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+from scraper_core.html_archive import CODECS, compress, decompress, default_codec
+
+META_SUFFIX = '.json'
+BODY_SUFFIX = '.body'
+# После превышения лимита кеш очищается до этой доли, чтобы не чистить его на каждой записи
+PRUNE_TO = 0.9
+
+
+def cache_key(url: str) -> str:
+    return hashlib.sha256(url.encode('utf-8')).hexdigest()
+
+
+class HttpCache:
+    """Кеш страниц одного магазина с валидаторами для условных запросов"""
+
+    def __init__(self, root: str, codec: Optional[str] = None, max_bytes: Optional[int] = None):
+        # max_bytes — лимит объёма сжатых тел (None — без лимита)
+        self.root = root
+        self.codec = codec or default_codec()
+        if self.codec not in CODECS:
+            raise ValueError(f"Неизвестный формат сжатия: {self.codec} (доступны: {', '.join(CODECS)})")
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._size = None        # объём тел на диске; считается при первой записи
+        self.pruned = 0          # страниц удалено из-за лимита
+        # Счётчики текущего запуска (по завершённым запросам, повторы не считаются)
+        self.hits = 0            # 304 — страница взята из кеша
+        self.changed = 0         # 200 на условный запрос — страница изменилась
+        self.new = 0             # 200 на обычный запрос, страница сохранена
+        self.no_validators = 0   # 200 без ETag и Last-Modified — кешировать нечего
+        self.bytes_saved = 0     # несжатых байт, которые не пришлось загружать
+
+    def _path(self, url: str, suffix: str) -> str:
+        key = cache_key(url)
+        return os.path.join(self.root, key[:2], key + suffix)
+
+    def _read_meta(self, url: str) -> Optional[dict]:
+        try:
+            with open(self._path(url, META_SUFFIX), 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return None
+        # Коллизия хеша или чужой файл — считаем, что страницы нет
+        return meta if meta.get('url') == url else None
+
+    def validators(self, url: str) -> Dict[str, str]:
+        """Заголовки условного запроса для URL ({} — страницы в кеше нет)"""
+        meta = self._read_meta(url)
+        if meta is None or not os.path.exists(self._path(url, BODY_SUFFIX)):
+            return {}
+        headers = {}
+        if meta.get('etag'):
+            headers['If-None-Match'] = meta['etag']
+        if meta.get('last_modified'):
+            headers['If-Modified-Since'] = meta['last_modified']
+        return headers
+
+    def not_modified(self, url: str) -> Optional[str]:
+        """HTML из кеша для ответа 304 (None — запись пропала, нужен обычный запрос)"""
+        meta = self._read_meta(url)
+        if meta is None:
+            return None
+        try:
+            with open(self._path(url, BODY_SUFFIX), 'rb') as f:
+                blob = f.read()
+            html = decompress(blob, meta['codec']).decode('utf-8')
+            # Время использования — для очистки по лимиту
+            os.utime(self._path(url, BODY_SUFFIX))
+        except (OSError, ValueError, KeyError, RuntimeError):
+            return None
+        with self._lock:
+            self.hits += 1
+            self.bytes_saved += meta.get('size', 0)
+        return html
+
+    def store(self, url: str, html: str, etag: Optional[str] = None,
+              last_modified: Optional[str] = None, conditional: bool = False):
+        """Сохраняет страницу из ответа 200 (conditional — запрос был условным)"""
+        with self._lock:
+            if conditional:
+                self.changed += 1
+            elif etag or last_modified:
+                self.new += 1
+            if not etag and not last_modified:
+                self.no_validators += 1
+        if not etag and not last_modified:
+            # Без валидаторов сохранять незачем, а старая запись уже не нужна
+            self.forget(url)
+            return
+        data = html.encode('utf-8')
+        meta = {
+            'url': url,
+            'etag': etag,
+            'last_modified': last_modified,
+            'stored': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'codec': self.codec,
+            'size': len(data),
+        }
+        body_path = self._path(url, BODY_SUFFIX)
+        meta_path = self._path(url, META_SUFFIX)
+        os.makedirs(os.path.dirname(body_path), exist_ok=True)
+        blob = compress(data, self.codec)
+        old_size = self._file_size(body_path)
+        # Сначала тело, потом описание: при обрыве посередине валидаторы
+        # не будут указывать на чужое или недописанное тело
+        self._replace(body_path, blob, binary=True)
+        self._replace(meta_path, json.dumps(meta, ensure_ascii=False))
+        if self.max_bytes is not None:
+            self._account(len(blob) - old_size)
+
+    def forget(self, url: str):
+        """Удаляет запись URL из кеша (если она есть)"""
+        size = self._file_size(self._path(url, BODY_SUFFIX))
+        for suffix in (META_SUFFIX, BODY_SUFFIX):
+            try:
+                os.remove(self._path(url, suffix))
+            except FileNotFoundError:
+                pass
+        if size and self.max_bytes is not None:
+            self._account(-size)
+
+    @staticmethod
+    def _file_size(path: str) -> int:
+        try:
+            return os.path.getsize(path)
+        except OSError:
+            return 0
+
+    def _bodies(self) -> List[Tuple[float, int, str]]:
+        """Тела на диске: [(время использования, размер, путь)]"""
+        bodies = []
+        if not os.path.isdir(self.root):
+            return bodies
+        for bucket in os.scandir(self.root):
+            if not bucket.is_dir():
+                continue
+            for entry in os.scandir(bucket.path):
+                if entry.name.endswith(BODY_SUFFIX):
+                    stat = entry.stat()
+                    bodies.append((stat.st_mtime, stat.st_size, entry.path))
+        return bodies
+
+    def size(self) -> int:
+        """Объём сжатых тел в кеше, байт"""
+        with self._lock:
+            if self._size is None:
+                self._size = sum(size for _, size, _ in self._bodies())
+            return self._size
+
+    def _account(self, delta: int):
+        total = self.size()
+        with self._lock:
+            self._size = total = total + delta
+        if total > self.max_bytes:
+            self._prune()
+
+    def _prune(self):
+        """Удаляет давно не использованные страницы, пока объём не станет меньше PRUNE_TO лимита"""
+        with self._lock:
+            bodies = sorted(self._bodies())
+            total = sum(size for _, size, _ in bodies)
+            target = self.max_bytes * PRUNE_TO
+            for _, size, body_path in bodies:
+                if total <= target:
+                    break
+                for path in (body_path, body_path[:-len(BODY_SUFFIX)] + META_SUFFIX):
+                    try:
+                        os.remove(path)
+                    except FileNotFoundError:
+                        pass
+                total -= size
+                self.pruned += 1
+            self._size = total
+
+    @staticmethod
+    def _replace(path: str, content, binary: bool = False):
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        if binary:
+            with open(tmp_path, 'wb') as f:
+                f.write(content)
+        else:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                f.write(content)
+        os.replace(tmp_path, path)
+
+    @property
+    def conditional(self) -> int:
+        """Завершённых условных запросов (304 и 200 с изменившейся страницей)"""
+        return self.hits + self.changed
+
+    def hit_rate(self) -> float:
+        return self.hits / self.conditional if self.conditional else 0.0
+
+    def summary(self) -> str:
+        return (f"условных запросов: {self.conditional}, не изменилось (304): {self.hits} "
+                f"({self.hit_rate():.0%}), изменилось: {self.changed}, новых: {self.new}, "
+                f"без валидаторов: {self.no_validators}, "
+                f"не загружено: {self.bytes_saved / 1024 / 1024:.1f} МБ"
+                + (f", удалено по лимиту: {self.pruned}" if self.pruned else ''))
+
+
+def open_cache(root: Optional[str], codec: Optional[str] = None,
+               max_bytes: Optional[int] = None) -> Optional[HttpCache]:
+    """Открывает кеш (каталог создаётся при первой записи); None, если кеширование выключено"""
+    if not root:
+        return None
+    return HttpCache(root, codec=codec, max_bytes=max_bytes)
@@ -0,0 +1,65 @@
+"""
+Общая HTTP-сессия aiohttp для асинхронных парсеров
+
+Одна сессия на весь запуск (сбор ссылок, основной и повторный проход), чтобы
+соединения и TLS-сессии переиспользовались: пул TCPConnector с ограничением
+на хост, keep-alive, кеш DNS и один ClientTimeout на все запросы. Ответы
+принимаются сжатыми (gzip/deflate, а при установленном пакете Brotli — и br):
+
+    async with create_session(HttpSettings(limit_per_host=8), headers) as session:
+        async with session.get(url) as response:
+            html = await response.text()
+"""
+from importlib.util import find_spec
+from typing import Optional
+
+import aiohttp
+
+# aiohttp распаковывает br сам, если установлен Brotli (или brotlicffi)
+BROTLI = find_spec('brotli') is not None or find_spec('brotlicffi') is not None
+ACCEPT_ENCODING = 'gzip, deflate, br' if BROTLI else 'gzip, deflate'
+
+
+class HttpSettings:
+    """Пул соединений и таймауты сессии"""
+
+    def __init__(self, limit: int = 100, limit_per_host: int = 8, keepalive_timeout: float = 60,
+                 dns_ttl: Optional[int] = 600, total_timeout: float = 30,
+                 connect_timeout: Optional[float] = 10):
+        # limit — соединений всего, limit_per_host — к одному сайту (не меньше числа воркеров),
+        # keepalive_timeout — сколько секунд держать простаивающее соединение открытым,
+        # dns_ttl — время жизни кеша DNS в секундах (None — без ограничения)
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.keepalive_timeout = keepalive_timeout
+        self.dns_ttl = dns_ttl
+        self.total_timeout = total_timeout
+        self.connect_timeout = connect_timeout
+
+    def timeout(self) -> aiohttp.ClientTimeout:
+        return aiohttp.ClientTimeout(total=self.total_timeout, connect=self.connect_timeout)
+
+    def __repr__(self):
+        return (f"HttpSettings(limit={self.limit}, limit_per_host={self.limit_per_host}, "
+                f"keepalive_timeout={self.keepalive_timeout}, dns_ttl={self.dns_ttl}, "
+                f"total_timeout={self.total_timeout}, connect_timeout={self.connect_timeout})")
+
+
+def create_session(settings: Optional[HttpSettings] = None, headers: Optional[dict] = None,
+                   cookies: Optional[dict] = None) -> aiohttp.ClientSession:
+    """Сессия с настроенным пулом соединений (создавать внутри работающего цикла asyncio).
+    cookies — {имя: значение}, например cookies браузера (hybrid_fetch.py)"""
+    settings = settings or HttpSettings()
+    connector = aiohttp.TCPConnector(
+        limit=settings.limit,
+        limit_per_host=settings.limit_per_host,
+        keepalive_timeout=settings.keepalive_timeout,
+        use_dns_cache=True,
+        ttl_dns_cache=settings.dns_ttl,
+    )
+    return aiohttp.ClientSession(
+        connector=connector,
+        timeout=settings.timeout(),
+        headers={'Accept-Encoding': ACCEPT_ENCODING, **(headers or {})},
+        cookies=cookies,
+    )
@@ -0,0 +1,127 @@
+"""
+Гибридная загрузка: браузер — только для сессии, страницы — по HTTP
+
+Парсерам на Selenium браузер нужен прежде всего ради сессии: cookies после
+капчи или выбора города. Сами страницы товаров часто отдаются сервером уже
+готовыми, и рендер каждой в Chrome — самая медленная часть прохода. Здесь
+браузер отдаёт cookies и User-Agent движку загрузки (fetch_engine.py), а
+страницы загружаются по HTTP параллельно:
+
+    hybrid = HybridFetcher(driver, load_in_browser, page_complete)
+    async with hybrid.open_engine(HTTP_SETTINGS, hosts={...}, retry=RETRY) as engine:
+        html, source = await hybrid.fetch(url)     # source — 'http' или 'browser'
+    hybrid.print_summary()
+
+Если ответ — капча или блокировка (403/429) или страница пришла неполной
+(page_complete(html) ложно: например, цена дорисовывается скриптом), та же
+страница загружается в браузере (load_in_browser(driver, url) -> HTML), а
+cookies браузера передаются движку: капча, пройденная браузером, снимает
+блокировку и для HTTP. Страницы в браузере грузятся по одной. После
+block_limit таких случаев подряд HTTP выключается до конца прохода — сайт
+не отдаёт страницы без браузера, и дальше всё идёт через него, как раньше.
+"""
+import asyncio
+from collections import Counter
+from typing import Callable, Dict, Optional, Tuple
+
+from scraper_core.failures import NOT_FOUND, PARSE_ERROR, classify_error, classify_page
+from scraper_core.fetch_engine import FetchEngine
+
+HTTP = 'http'
+BROWSER = 'browser'
+# Страница пришла, но без данных, которые дорисовывает браузер (не капча и не 404)
+INCOMPLETE = 'incomplete'
+
+
+def browser_cookies(driver) -> Dict[str, str]:
+    """Cookies открытой вкладки браузера: {имя: значение}"""
+    return {cookie['name']: cookie['value'] for cookie in driver.get_cookies()}
+
+
+def browser_headers(driver) -> Dict[str, str]:
+    """Заголовки запросов как у браузера (User-Agent той же версии Chrome, язык)"""
+    return {
+        'User-Agent': driver.execute_script('return navigator.userAgent'),
+        'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
+        'Accept-Language': 'ru-RU,ru;q=0.9,en;q=0.8',
+    }
+
+
+class HybridFetcher:
+    """Страницы по HTTP с cookies браузера; капча и неполные страницы — через браузер"""
+
+    def __init__(self, driver, load_in_browser: Callable[[object, str], str],
+                 page_complete: Callable[[str], bool], block_limit: int = 5):
+        # load_in_browser(driver, url) — загрузка в браузере с ожиданиями, возвращает HTML;
+        # page_complete(html) — на странице есть всё, что разбирается (иначе — в браузер)
+        self.driver = driver
+        self.load_in_browser = load_in_browser
+        self.page_complete = page_complete
+        self.block_limit = block_limit
+        self.engine: Optional[FetchEngine] = None
+        self.http_enabled = True
+        self._blocked_in_row = 0
+        self._browser_lock = asyncio.Lock()
+        self.sources = Counter()
+        self.reasons = Counter()
+
+    def open_engine(self, settings=None, **options) -> FetchEngine:
+        """Движок загрузки с cookies и заголовками браузера (остальные параметры — как у FetchEngine)"""
+        self.engine = FetchEngine(settings, {**browser_headers(self.driver), **options.pop('headers', {})},
+                                  cookies=browser_cookies(self.driver), **options)
+        return self.engine
+
+    async def _fetch_http(self, url: str) -> Optional[str]:
+        """Страница по HTTP или None, если её нужно загрузить в браузере (404 пробрасывается)"""
+        try:
+            html = await self.engine.fetch(url)
+        except Exception as e:
+            reason = classify_error(e)
+            if reason == NOT_FOUND:
+                # Товара нет — браузер этого не исправит
+                raise
+        else:
+            if self.page_complete(html):
+                self._blocked_in_row = 0
+                return html
+            reason = classify_page(html)
+            if reason == PARSE_ERROR:
+                reason = INCOMPLETE
+        self.reasons[reason] += 1
+        self._blocked_in_row += 1
+        if self.http_enabled and self._blocked_in_row >= self.block_limit:
+            self.http_enabled = False
+            print(f"⚠ {self._blocked_in_row} страниц подряд не получены по HTTP — "
+                  f"дальше только через браузер ({self.reason_summary()})")
+        return None
+
+    async def _fetch_browser(self, url: str) -> str:
+        async with self._browser_lock:
+            html = await asyncio.to_thread(self.load_in_browser, self.driver, url)
+            # Браузер мог пройти капчу или получить новую сессию — передаём её HTTP-запросам
+            self.engine.update_cookies(await asyncio.to_thread(browser_cookies, self.driver))
+        return html
+
+    async def fetch(self, url: str) -> Tuple[str, str]:
+        """(HTML, источник: 'http' или 'browser')"""
+        if self.http_enabled:
+            html = await self._fetch_http(url)
+            if html is not None:
+                self.sources[HTTP] += 1
+                return html, HTTP
+        html = await self._fetch_browser(url)
+        self.sources[BROWSER] += 1
+        return html, BROWSER
+
+    def reason_summary(self) -> str:
+        return ', '.join(f"{reason}: {count}" for reason, count in self.reasons.most_common()) or 'нет'
+
+    def summary(self) -> str:
+        state = '' if self.http_enabled else ', HTTP выключен'
+        return (f"по HTTP: {self.sources[HTTP]}, через браузер: {self.sources[BROWSER]} "
+                f"(причины: {self.reason_summary()}){state}")
+
+    def print_summary(self):
+        if self.engine is not None:
+            self.engine.print_summary()
+        print(f"⚙ Гибридная загрузка: {self.summary()}")
@@ -0,0 +1,265 @@
+"""
+Append-only журнал карточек (JSONL) для защиты от сбоев во время парсинга
+
+Каждая обработанная карточка дописывается в конец файла data_MM.YYYY_*.jsonl
+одной строкой, поэтому стоимость сохранения не зависит от размера базы.
+Если передана политика DurabilityPolicy, запись идёт в фоновом потоке
+пачками (см. durability.py), и append() не ждёт диска.
+Итоговый data_MM.YYYY_*.json (формат, который читает Main_scraping_Russia.py)
+собирается из журнала только в конце прохода или по запросу:
+
+    python -m scraper_core compact LeroyMerlin/data_02.2026_Tiles_LemanaPRO.json
+
+Список обработанных URL и число карточек берутся из индекса
+data_MM.YYYY_*.urls.idx (см. url_index.py), поэтому возобновление парсинга
+не читает ни итоговый JSON, ни журнал.
+"""
+import json
+import os
+from typing import List, Optional
+
+from scraper_core.durability import DurabilityPolicy, GroupCommitWriter
+from scraper_core.snapshots import DEFAULT_KEEP, find_snapshot, restore_files, snapshot_files, snapshot_root_for
+from scraper_core.url_index import ProcessedUrlIndex, index_path_for, url_hashes
+
+
+def journal_path_for(file_path: str) -> str:
+    """Путь к журналу для итогового JSON: data_X.json -> data_X.jsonl"""
+    root, _ = os.path.splitext(file_path)
+    return root + '.jsonl'
+
+
+def write_json_atomic(data, file_path: str):
+    """Атомарно записывает JSON: временный файл + fsync + os.replace"""
+    temp_file = file_path + '.tmp'
+    try:
+        with open(temp_file, 'w', encoding='utf-8') as json_file:
+            json.dump(data, json_file, indent=4, ensure_ascii=False)
+            json_file.flush()
+            os.fsync(json_file.fileno())
+        os.replace(temp_file, file_path)
+    except Exception:
+        if os.path.exists(temp_file):
+            try:
+                os.remove(temp_file)
+            except OSError:
+                pass
+        raise
+
+
+class CardJournal:
+    """Журнал карточек одного файла данных (data_MM.YYYY_*.json)"""
+
+    def __init__(self, file_path: str, policy: Optional[DurabilityPolicy] = None):
+        self.file_path = file_path
+        self.journal_path = journal_path_for(file_path)
+        self.policy = policy
+        self._file = None
+        self._writer = None
+        self._base_ok = True
+        self._index = None
+        self._count = 0
+
+    def exists(self) -> bool:
+        """Есть ли уже сохранённые данные (итоговый JSON или журнал)"""
+        return os.path.exists(self.file_path) or os.path.exists(self.journal_path)
+
+    def count(self) -> int:
+        """Число карточек (итоговый JSON + журнал + добавленные в этом запуске)"""
+        self._get_index()
+        return self._count
+
+    def processed_urls(self) -> ProcessedUrlIndex:
+        """Уже обработанные URL (поддерживает `url in ...` и len())"""
+        return self._get_index()
+
+    def is_processed(self, url: str) -> bool:
+        return url in self._get_index()
+
+    def _get_index(self) -> ProcessedUrlIndex:
+        if self._index is None:
+            self._index = self._open_index()
+            self._count = self._index.records
+        return self._index
+
+    def _open_index(self) -> ProcessedUrlIndex:
+        index_path = index_path_for(self.file_path)
+        if not self.exists():
+            # Данных месяца нет (например, удалены вручную) — старый индекс недействителен
+            if os.path.exists(index_path):
+                os.remove(index_path)
+            return ProcessedUrlIndex(index_path)
+        if self._index_is_fresh(index_path):
+            try:
+                return ProcessedUrlIndex(index_path)
+            except ValueError as e:
+                print(f"⚠ {e}")
+        # Индекса нет или он старше данных (сбой между записью карточки и индекса,
+        # ручная правка файлов) — один раз собираем его из карточек
+        index = self._rebuild_index(self.load())
+        print(f"✓ Индекс URL пересобран: {os.path.basename(index_path)}")
+        return index
+
+    def _rebuild_index(self, data: List[dict]) -> ProcessedUrlIndex:
+        index_path = index_path_for(self.file_path)
+        if self._index is not None:
+            self._index.close()
+        if os.path.exists(index_path):
+            os.remove(index_path)
+        index = ProcessedUrlIndex(index_path)
+        index.rebuild(card.get('Ссылка') for card in data)
+        return index
+
+    def reindex(self) -> int:
+        """Принудительно пересобирает индекс по итоговому JSON и журналу"""
+        self._index = self._rebuild_index(self.load())
+        self._count = self._index.records
+        return self._count
+
+    def _index_is_fresh(self, index_path: str) -> bool:
+        # Индекс дописывается после журнала, поэтому не может быть старше данных
+        if not os.path.exists(index_path):
+            return False
+        index_mtime = os.path.getmtime(index_path)
+        return all(os.path.getmtime(path) <= index_mtime
+                   for path in (self.file_path, self.journal_path) if os.path.exists(path))
+
+    def append(self, card: dict):
+        """Дописывает одну карточку в конец журнала"""
+        # Индекс открываем здесь, а не в фоновом потоке: пересборка читает журнал.
+        # URL попадает в индекс в памяти сразу, а в файл индекса — вместе с журналом,
+        # поэтому count() и is_processed() согласованы при любой частоте записи
+        self._get_index().remember(url_hashes([card.get('Ссылка')]))
+        self._count += 1
+        if self.policy is None:
+            self._write([card], fsync=False)
+            return
+        if self._writer is None:
+            self._writer = GroupCommitWriter(self._write, self.policy)
+        self._writer.submit(card)
+
+    def _write(self, cards: List[dict], fsync: bool):
+        if self._file is None:
+            self._file = self._open_for_append()
+        self._file.write(''.join(json.dumps(card, ensure_ascii=False) + '\n' for card in cards))
+        self._file.flush()
+        if fsync:
+            os.fsync(self._file.fileno())
+        self._index.write(url_hashes(card.get('Ссылка') for card in cards))
+
+    def _open_for_append(self):
+        # Если прошлый запуск упал посреди строки, начинаем с новой строки,
+        # иначе следующая карточка склеится с обрывком и тоже станет нечитаемой
+        needs_newline = False
+        if os.path.exists(self.journal_path) and os.path.getsize(self.journal_path) > 0:
+            with open(self.journal_path, 'rb') as f:
+                f.seek(-1, os.SEEK_END)
+                needs_newline = f.read(1) != b'\n'
+        journal_file = open(self.journal_path, 'a', encoding='utf-8')
+        if needs_newline:
+            journal_file.write('\n')
+        return journal_file
+
+    def close(self):
+        """Дописывает накопленные карточки и закрывает журнал"""
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        if self._index is not None:
+            self._index.close()
+
+    def _read_base(self) -> List[dict]:
+        if not os.path.exists(self.file_path):
+            return []
+        try:
+            with open(self.file_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except Exception as e:
+            print(f"⚠ Ошибка при чтении файла {os.path.basename(self.file_path)}: {e}")
+            self._base_ok = False
+            return []
+
+    def read_journal(self) -> List[dict]:
+        """Читает карточки из журнала, пропуская повреждённые строки"""
+        cards = []
+        if not os.path.exists(self.journal_path):
+            return cards
+        broken = 0
+        with open(self.journal_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    cards.append(json.loads(line))
+                except json.JSONDecodeError:
+                    broken += 1
+        if broken:
+            print(f"⚠ Пропущено повреждённых строк журнала: {broken}")
+        return cards
+
+    def load(self) -> List[dict]:
+        """Итоговый JSON + карточки из журнала, ещё не попавшие в него"""
+        # Дожидаемся записи карточек, ещё стоящих в очереди фонового потока
+        self.close()
+        data = self._read_base()
+        # URL обрабатывается один раз за месяц, поэтому карточки журнала с URL,
+        # уже присутствующим в итоговом файле, остались от прерванного сжатия
+        known_urls = {item.get('Ссылка') for item in data if item.get('Ссылка')}
+        for card in self.read_journal():
+            url = card.get('Ссылка')
+            if url and url in known_urls:
+                continue
+            data.append(card)
+        return data
+
+    def compact(self) -> Optional[int]:
+        """Собирает журнал в итоговый JSON и удаляет журнал. Возвращает число записей"""
+        self.close()
+        if not os.path.exists(self.journal_path):
+            return None
+        self._base_ok = True
+        data = self.load()
+        if not self._base_ok:
+            print(f"⚠ Итоговый файл повреждён, сжатие пропущено. Журнал сохранён: {self.journal_path}")
+            return None
+        return self.replace(data)
+
+    def replace(self, data: List[dict]) -> int:
+        """Записывает data как итоговый JSON, удаляет журнал. Возвращает число записей"""
+        self.close()
+        write_json_atomic(data, self.file_path)
+        if os.path.exists(self.journal_path):
+            os.remove(self.journal_path)
+        # Пересобираем индекс по итоговому файлу: он снова отсортирован и без хвоста
+        self._index = self._rebuild_index(data)
+        self._count = self._index.records
+        return len(data)
+
+    def snapshot(self, keep: int = DEFAULT_KEEP) -> str:
+        """Снимок данных (жёсткие ссылки на итоговый JSON и журнал). Возвращает путь снимка"""
+        # Дописываем карточки из очереди фонового потока, чтобы они попали в снимок
+        self.close()
+        journal_size = os.path.getsize(self.journal_path) if os.path.exists(self.journal_path) else None
+        return snapshot_files(snapshot_root_for(self.file_path),
+                              {self.file_path: None, self.journal_path: journal_size},
+                              {'backend': 'journal', 'cards': self.count()}, keep)
+
+    def restore(self, name: Optional[str] = None) -> dict:
+        """Восстанавливает итоговый JSON и журнал из снимка (по умолчанию — последнего)"""
+        self.close()
+        snapshot = find_snapshot(snapshot_root_for(self.file_path), name)
+        restore_files(snapshot, os.path.dirname(os.path.abspath(self.file_path)))
+        # Индекс описывает данные до восстановления — пересоберём при следующем обращении
+        self._index = None
+        index_path = index_path_for(self.file_path)
+        if os.path.exists(index_path):
+            os.remove(index_path)
+        return snapshot
+
+    def finalize(self) -> Optional[int]:
+        """Формирует итоговый data_MM.YYYY_*.json (для журнала — сжатие)"""
+        return self.compact()
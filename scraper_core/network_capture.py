@@ -0,0 +1,163 @@
+"""
+Перехват ответов сайта в браузере через Chrome DevTools Protocol (Selenium)
+
+Данные, которые страница показывает после клика (например, остатки по
+складам), обычно приходят ответом XHR/fetch в JSON или уже лежат в состоянии
+страницы (<script id="__NEXT_DATA__">, window.__INITIAL_STATE__ = {...}).
+Вместо клика, ожидания отрисовки и повторного разбора всей страницы парсер
+может прочитать этот JSON напрямую:
+
+    options = uc.ChromeOptions()
+    enable_performance_log(options)               # до запуска браузера
+    capture = NetworkCapture(driver, ('/api/', 'stock'))
+    capture.clear()                               # ответы прошлой страницы не нужны
+    driver.get(url)
+    for url, data in capture.responses():         # [(адрес, разобранный JSON)]
+        ...
+    state = embedded_state(tree)                  # JSON из <script> страницы
+
+Ответы берутся из журнала производительности Chrome (события Network.*),
+а тело — командой CDP Network.getResponseBody, пока вкладка его хранит.
+Журнал у каждого браузера свой, поэтому захват работает и в пуле браузеров
+(driver_pool.py) — по экземпляру NetworkCapture на браузер. Журнал при
+чтении очищается: другие получатели событий того же браузера (замер
+ресурсов, resource_blocking.py) подписываются через add_event_listener.
+"""
+import base64
+import json
+import re
+import threading
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from lxml import etree
+
+# Скрипты с состоянием страницы: JSON целиком или присваивание window.__ИМЯ__ = {...}
+_STATE_SCRIPTS = etree.XPath("//script[@id='__NEXT_DATA__' or @id='__NUXT_DATA__' "
+                             "or @type='application/json' or contains(., 'window.__')]/text()",
+                             smart_strings=False)
+_STATE_ASSIGNMENT = re.compile(r'window\.__[A-Z_]+__\s*=\s*')
+_JSON_TYPES = ('json', 'javascript')
+
+# id браузера -> получатели событий его журнала
+_listeners: Dict[int, List[Callable[[List[dict]], None]]] = {}
+_listeners_lock = threading.Lock()
+
+
+def enable_performance_log(options):
+    """Включает журнал производительности (события Network.*) в ChromeOptions"""
+    options.set_capability('goog:loggingPrefs', {'performance': 'ALL'})
+    return options
+
+
+def add_event_listener(driver, listener: Callable[[List[dict]], None]):
+    """listener(события) получает каждую пачку событий журнала браузера, кто бы её ни прочитал"""
+    with _listeners_lock:
+        _listeners.setdefault(id(driver), []).append(listener)
+
+
+def remove_event_listeners(driver):
+    """Отписывает всех получателей событий браузера (перед его закрытием)"""
+    with _listeners_lock:
+        _listeners.pop(id(driver), None)
+
+
+def performance_events(driver) -> List[dict]:
+    """Новые события журнала производительности браузера: [{'method': ..., 'params': ...}]"""
+    events = [json.loads(entry['message'])['message'] for entry in driver.get_log('performance')]
+    with _listeners_lock:
+        listeners = list(_listeners.get(id(driver), ()))
+    for listener in listeners:
+        listener(events)
+    return events
+
+
+def _load_json(body: str):
+    try:
+        return json.loads(body)
+    except ValueError:
+        return None
+
+
+def embedded_state(tree) -> List[object]:
+    """JSON-состояния страницы из <script> (Next.js, Nuxt, window.__INITIAL_STATE__ и т.п.)"""
+    states = []
+    for script in _STATE_SCRIPTS(tree):
+        body = script.strip()
+        match = _STATE_ASSIGNMENT.search(body)
+        if match:
+            # window.__STATE__ = {...}; — берём объект до конца присваивания
+            body = body[match.end():].rstrip().rstrip(';')
+        if body[:1] in '{[':
+            data = _load_json(body)
+            if data is not None:
+                states.append(data)
+    return states
+
+
+class NetworkCapture:
+    """JSON-ответы вкладки, адрес которых содержит один из patterns"""
+
+    def __init__(self, driver, patterns: Iterable[str] = ()):
+        self.driver = driver
+        self.patterns = tuple(patterns)
+        self._pending = {}  # requestId -> адрес: ответ пришёл, тело ещё грузится
+        self._finished: List[Tuple[str, str]] = []
+        self._enabled = False
+
+    def _enable(self):
+        if not self._enabled:
+            # Буфер тел ответов вкладки (по умолчанию Chrome мог бы выбросить их раньше)
+            self.driver.execute_cdp_cmd('Network.enable', {'maxResourceBufferSize': 50_000_000,
+                                                           'maxTotalBufferSize': 200_000_000})
+            self._enabled = True
+
+    def _matches(self, url: str) -> bool:
+        return not self.patterns or any(pattern in url for pattern in self.patterns)
+
+    def clear(self):
+        """Забывает события, накопленные до этого момента (например, прошлой страницы)"""
+        self._enable()
+        performance_events(self.driver)
+        self._pending.clear()
+        self._finished.clear()
+
+    def _drain(self):
+        for message in performance_events(self.driver):
+            method, params = message.get('method'), message.get('params', {})
+            if method == 'Network.responseReceived':
+                response = params['response']
+                if (self._matches(response['url'])
+                        and any(kind in response.get('mimeType', '') for kind in _JSON_TYPES)):
+                    self._pending[params['requestId']] = response['url']
+            elif method == 'Network.loadingFinished' and params['requestId'] in self._pending:
+                self._finished.append((params['requestId'], self._pending.pop(params['requestId'])))
+
+    def responses(self) -> List[Tuple[str, object]]:
+        """Завершённые с прошлого вызова ответы: [(адрес, JSON)]; не JSON и недоступные тела пропускаются"""
+        self._drain()
+        captured = []
+        for request_id, url in self._finished:
+            try:
+                body = self.driver.execute_cdp_cmd('Network.getResponseBody', {'requestId': request_id})
+            except Exception:
+                # Вкладка уже выбросила тело (переход на другую страницу, переполнен буфер)
+                continue
+            text = body['body']
+            if body.get('base64Encoded'):
+                text = base64.b64decode(text).decode('utf-8', errors='replace')
+            data = _load_json(text)
+            if data is not None:
+                captured.append((url, data))
+        self._finished.clear()
+        return captured
+
+
+def captured(capture: NetworkCapture, extract: Callable[[object], Optional[object]]) -> Callable:
+    """Условие для waits.py: пришёл ответ, из которого extract(JSON) достаёт данные; результат — (данные, JSON)"""
+    def condition(driver):
+        for _, data in capture.responses():
+            result = extract(data)
+            if result:
+                return result, data
+        return False
+    return condition
@@ -0,0 +1,66 @@
+"""
+Бюджет запросов к сайту: token bucket
+
+В корзине не больше burst жетонов, они пополняются со скоростью rate в
+секунду; каждый запрос забирает жетон, а если жетонов нет — ждёт ближайшего.
+В среднем к сайту уходит не больше rate запросов в секунду, при этом после
+паузы можно сразу отправить до burst запросов:
+
+    bucket = TokenBucket(rate=5, burst=10)
+    await bucket.acquire()      # перед каждым запросом
+
+Ожидающие обслуживаются по очереди (FIFO). Корзина переживает смену цикла
+asyncio (этапы парсера в разных asyncio.run).
+"""
+import asyncio
+import time
+from typing import Optional
+
+
+class TokenBucket:
+    """Не больше rate запросов в секунду в среднем и не больше burst подряд"""
+
+    def __init__(self, rate: Optional[float] = None, burst: Optional[int] = None):
+        # rate=None — без ограничения (acquire возвращается сразу)
+        if rate is not None and rate <= 0:
+            raise ValueError("rate должен быть больше нуля")
+        self.rate = rate
+        self.burst = burst or max(1, int(rate or 1))
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._loop = None
+        self._lock = None
+        self.acquired = 0
+        self.waits = 0
+        self.waited = 0.0
+
+    def _refill(self, now: float):
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self):
+        """Ждёт жетон на один запрос"""
+        self.acquired += 1
+        if self.rate is None:
+            return
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._lock = asyncio.Lock()
+        # Блокировка держит очередь: жетон достаётся тому, кто пришёл раньше
+        async with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            if self._tokens < 1:
+                delay = (1 - self._tokens) / self.rate
+                self.waits += 1
+                self.waited += delay
+                await asyncio.sleep(delay)
+                self._refill(time.monotonic())
+            self._tokens -= 1
+
+    def summary(self) -> str:
+        if self.rate is None:
+            return "без ограничения частоты"
+        return (f"{self.rate:g} зап/с (до {self.burst} подряд), ожиданий: {self.waits}, "
+                f"всего {self.waited:.1f} с")
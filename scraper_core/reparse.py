@@ -0,0 +1,205 @@
+"""
+Повторный разбор архива HTML (см. html_archive.py) без браузера
+
+Модуль разбора магазина (например, LeroyMerlin/LemanaPRO_parser.py) передаёт
+функцию parse_card(pages, url, dataset, cur_data, cur_time) -> dict | None,
+построенную на тех же функциях извлечения, что и основной парсер. Страницы
+разбираются в пуле процессов (ProcessPoolExecutor) на всех ядрах, а
+карточки записываются в data_MM.YYYY_*.json:
+
+    python LeroyMerlin/LemanaPRO_parser.py --month 02.2026
+
+Карточки с URL, для которых в архиве есть страница, заменяются результатом
+разбора; остальные карточки файла данных остаются без изменений.
+
+С ключом --bench ничего не записывается: на страницах архива сравниваются
+скорость и результат parse_card и эталонного разбора (reference, прежний код
+на BeautifulSoup):
+
+    python LeroyMerlin/LemanaPRO_parser.py --bench --limit 500
+"""
+import argparse
+import contextlib
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from functools import partial
+from typing import Callable, Dict, List, Optional
+
+from scraper_core.html_archive import HtmlArchive, read_page
+from scraper_core.journal import CardJournal
+
+# parse_card(pages, url, dataset, cur_data, cur_time): pages — {вид страницы: HTML},
+# вид 'product' есть всегда, остальные (например, 'stock' у LemanaPRO) — если сохранены
+ParseCard = Callable[[Dict[str, str], str, str, str, str], Optional[dict]]
+
+
+def collect_fetches(archive: HtmlArchive, month: Optional[str] = None) -> List[dict]:
+    """Загрузки страниц из архива: страница товара и сохранённые вслед за ней страницы того же URL"""
+    fetches = []
+    last = {}
+    for entry in archive.entries():
+        dataset = entry.get('dataset')
+        if not dataset or (month and not dataset.startswith(f'data_{month}_')):
+            continue
+        key = (dataset, entry['url'])
+        kind = entry.get('kind', 'product')
+        if kind == 'product':
+            fetch = {'dataset': dataset, 'url': entry['url'], 'fetched_at': entry['fetched_at'],
+                     'pages': {'product': entry}}
+            fetches.append(fetch)
+            last[key] = fetch
+        elif key in last:
+            last[key]['pages'][kind] = entry
+    return fetches
+
+
+def _quiet_worker():
+    # Функции извлечения печатают ход работы — в пуле процессов это только шум
+    sys.stdout = open(os.devnull, 'w', encoding='utf-8')
+
+
+def _parse_fetch(parse_card: ParseCard, root: str, fetch: dict) -> Optional[dict]:
+    try:
+        pages = {kind: read_page(root, entry) for kind, entry in fetch['pages'].items()}
+        fetched_at = datetime.fromisoformat(fetch['fetched_at'])
+        return parse_card(pages, fetch['url'], fetch['dataset'],
+                          fetched_at.strftime("%d.%m.%Y"), fetched_at.strftime("%H:%M"))
+    except Exception:
+        return None
+
+
+def reparse(parse_card: ParseCard, archive_root: str, out_dir: str, month: Optional[str] = None,
+            workers: Optional[int] = None) -> Dict[str, int]:
+    """Разбирает архив и обновляет файлы данных. Возвращает {файл данных: число карточек}"""
+    archive = HtmlArchive(archive_root)
+    fetches = collect_fetches(archive, month)
+    archive.close()
+    if not fetches:
+        print("Архив не содержит страниц за выбранный период")
+        return {}
+
+    workers = workers or os.cpu_count() or 1
+    print(f"Страниц к разбору: {len(fetches)}, процессов: {workers}")
+    started = time.time()
+
+    # Для каждого URL берём последнюю успешно разобранную загрузку
+    parsed: Dict[str, Dict[str, dict]] = {}
+    failed = 0
+    chunksize = max(1, len(fetches) // (workers * 8))
+    with ProcessPoolExecutor(max_workers=workers, initializer=_quiet_worker) as executor:
+        results = executor.map(partial(_parse_fetch, parse_card, archive_root), fetches, chunksize=chunksize)
+        for idx, (fetch, card) in enumerate(zip(fetches, results), 1):
+            if card is None:
+                failed += 1
+            else:
+                parsed.setdefault(fetch['dataset'], {})[fetch['url']] = card
+            if idx % 1000 == 0:
+                print(f"Разобрано: {idx}/{len(fetches)}")
+
+    elapsed = time.time() - started
+    print(f"✓ Разобрано за {round(elapsed, 2)} с ({round(len(fetches) / max(elapsed, 1e-9), 1)} стр/с), "
+          f"не удалось: {failed}")
+
+    totals = {}
+    for dataset, cards in parsed.items():
+        journal = CardJournal(os.path.join(out_dir, dataset))
+        existing = journal.load()
+        # Порядок существующих карточек сохраняем, новые URL добавляем в конец
+        merged = [cards.pop(card.get('Ссылка'), card) for card in existing]
+        merged.extend(cards.values())
+        totals[dataset] = journal.replace(merged)
+        print(f"✓ {dataset}: {totals[dataset]} записей")
+    return totals
+
+
+def _time_parser(parse_card: ParseCard, samples: List[tuple]) -> tuple:
+    """Разбирает все страницы в этом процессе: (карточки или исключения, секунды, секунды CPU)"""
+    results = []
+    started, cpu_started = time.perf_counter(), time.process_time()
+    with open(os.devnull, 'w', encoding='utf-8') as devnull, contextlib.redirect_stdout(devnull):
+        for pages, url, dataset, cur_data, cur_time in samples:
+            try:
+                results.append(parse_card(pages, url, dataset, cur_data, cur_time))
+            except Exception as e:
+                results.append(e)
+    return results, time.perf_counter() - started, time.process_time() - cpu_started
+
+
+def _diff_fields(card, expected) -> List[str]:
+    if isinstance(card, Exception) or isinstance(expected, Exception) or card is None or expected is None:
+        return [f"{type(expected).__name__} → {type(card).__name__}"]
+    keys = list(expected) + [key for key in card if key not in expected]
+    return [key for key in keys if card.get(key, '<нет>') != expected.get(key, '<нет>')]
+
+
+def bench(parse_card: ParseCard, reference: ParseCard, archive_root: str,
+          month: Optional[str] = None, limit: Optional[int] = 200) -> int:
+    """Сравнивает parse_card с эталоном на страницах архива. Возвращает число расхождений"""
+    archive = HtmlArchive(archive_root)
+    fetches = collect_fetches(archive, month)[:limit]
+    archive.close()
+    if not fetches:
+        print("Архив не содержит страниц за выбранный период")
+        return 0
+
+    # Страницы распаковываются заранее, чтобы время чтения архива не попало в замер
+    samples = []
+    for fetch in fetches:
+        fetched_at = datetime.fromisoformat(fetch['fetched_at'])
+        pages = {kind: read_page(archive_root, entry) for kind, entry in fetch['pages'].items()}
+        samples.append((pages, fetch['url'], fetch['dataset'],
+                        fetched_at.strftime("%d.%m.%Y"), fetched_at.strftime("%H:%M")))
+    size = sum(len(html) for pages, *_ in samples for html in pages.values())
+    print(f"Страниц: {len(samples)} ({round(size / len(samples) / 1024)} КБ в среднем)")
+
+    timings = {}
+    for name, func in (('BeautifulSoup', reference), ('lxml', parse_card)):
+        results, elapsed, cpu = _time_parser(func, samples)
+        timings[name] = (results, elapsed)
+        print(f"  {name:<14} {round(elapsed * 1000 / len(samples), 2):>8} мс/стр  "
+              f"{round(len(samples) / max(elapsed, 1e-9), 1):>8} стр/с  CPU {round(cpu, 2)} с")
+    print(f"✓ Ускорение: x{round(timings['BeautifulSoup'][1] / max(timings['lxml'][1], 1e-9), 1)}")
+
+    mismatches = 0
+    for sample, card, expected in zip(samples, timings['lxml'][0], timings['BeautifulSoup'][0]):
+        if isinstance(card, Exception) and isinstance(expected, Exception):
+            continue
+        fields = _diff_fields(card, expected)
+        if fields:
+            mismatches += 1
+            if mismatches <= 10:
+                print(f"✗ Расхождение {sample[1]}: {', '.join(fields[:5])}")
+    if mismatches:
+        print(f"✗ Карточек с расхождениями: {mismatches} из {len(samples)}")
+    else:
+        print("✓ Результаты совпадают с эталоном")
+    return mismatches
+
+
+def reparse_main(parse_card: ParseCard, store_dir: str, reference: Optional[ParseCard] = None):
+    """Точка входа `reparse` для модуля разбора магазина (reference — эталон для --bench)"""
+    parser = argparse.ArgumentParser(description='Повторный разбор архива HTML без браузера')
+    parser.add_argument('--archive', default=os.path.join(store_dir, 'html_archive'),
+                        help='Каталог архива (по умолчанию html_archive рядом со скриптом)')
+    parser.add_argument('--month', default=None,
+                        help='Месяц данных MM.YYYY (по умолчанию текущий, для --bench — все)')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='Число процессов (по умолчанию — число ядер)')
+    if reference is not None:
+        parser.add_argument('--bench', action='store_true',
+                            help='Сравнить скорость и результат с эталонным разбором (без записи)')
+        parser.add_argument('--limit', type=int, default=200,
+                            help='Страниц для --bench (по умолчанию 200)')
+    args = parser.parse_args()
+
+    if not os.path.isdir(args.archive):
+        print(f"✗ Архив не найден: {args.archive}")
+        return
+    if reference is not None and args.bench:
+        bench(parse_card, reference, args.archive, month=args.month, limit=args.limit)
+        return
+    args.month = args.month or datetime.now().strftime("%m.%Y")
+    reparse(parse_card, args.archive, store_dir, month=args.month, workers=args.workers)
@@ -0,0 +1,171 @@
+"""
+Блокировка ненужных ресурсов страницы в Chrome через DevTools (Selenium)
+
+Настройки prefs отключают только картинки и видео. Шрифты, счётчики
+аналитики, менеджеры тегов, видеоплееры и виджеты чатов по-прежнему
+загружаются на каждой карточке, хотя парсеру не нужны. Команда CDP
+Network.setBlockedURLs отсекает их по шаблонам адресов (* — любые символы):
+
+    RESOURCES = ResourceBlocker({**DEFAULT_BLOCKLIST, 'стили': STYLES})
+    driver = new_driver(DRIVER, resources=RESOURCES)   # chrome_driver.py: журнал для замера и apply()
+    with RESOURCES.page(driver):           # время загрузки и (в режиме замера) ресурсы страницы
+        driver.get(url)
+        ...
+    RESOURCES.print_summary()
+
+Режим замера (measure=True) ничего не блокирует, а по журналу
+производительности браузера (его включает chrome_driver.new_driver) считает,
+сколько запросов и байт на страницу пришлось бы на шаблоны каждой группы —
+это и есть ожидаемая экономия. Итог печатается вместе со средним временем
+загрузки страницы, поэтому два прохода (замер и блокировка) сравниваются
+напрямую.
+"""
+import re
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from scraper_core.network_capture import add_event_listener, performance_events, remove_event_listeners
+
+# Группы шаблонов (синтаксис Network.setBlockedURLs)
+FONTS = ('*.woff2*', '*.woff*', '*.ttf*', '*.otf*', '*.eot*')
+IMAGES = ('*.jpg*', '*.jpeg*', '*.png*', '*.gif*', '*.webp*', '*.avif*', '*.svg*', '*.ico*')
+MEDIA = ('*.mp4*', '*.webm*', '*.m3u8*', '*youtube.com/*', '*ytimg.com/*', '*rutube.ru/*',
+         '*vk.com/video_ext*', '*kinescope.io/*')
+ANALYTICS = ('*google-analytics.com/*', '*googletagmanager.com/*', '*doubleclick.net/*',
+             '*mc.yandex.ru/*', '*top-fwz1.mail.ru/*', '*counter.yadro.ru/*', '*vk.com/rtrg*',
+             '*connect.facebook.net/*', '*criteo.*', '*mindbox.ru/*', '*hotjar.com/*', '*clarity.ms/*',
+             '*analytics.tiktok.com/*', '*sentry.io/*', '*cdn.amplitude.com/*')
+WIDGETS = ('*jivosite.com/*', '*jivo.ru/*', '*carrotquest.io/*', '*livetex.ru/*', '*flocktory.com/*',
+           '*retailrocket.ru/*', '*admitad.com/*', '*gdeslon.ru/*', '*cdn.mango-office.ru/*',
+           '*widget.yandex.ru/*', '*api-maps.yandex.ru/*')
+# Стили: экономят много, но вёрстка без них может скрыть кнопки — включать по магазину
+STYLES = ('*.css*',)
+
+DEFAULT_BLOCKLIST = {
+    'шрифты': FONTS,
+    'картинки': IMAGES,
+    'видео': MEDIA,
+    'аналитика': ANALYTICS,
+    'виджеты': WIDGETS,
+}
+
+
+def pattern_regex(pattern: str) -> re.Pattern:
+    """Шаблон Network.setBlockedURLs как регулярное выражение (для замера)"""
+    return re.compile('.*'.join(re.escape(part) for part in pattern.split('*')), re.IGNORECASE)
+
+
+def block_urls(driver, patterns: Iterable[str]):
+    """Запрещает вкладке загружать адреса по шаблонам (действует до закрытия браузера)"""
+    driver.execute_cdp_cmd('Network.enable', {})
+    driver.execute_cdp_cmd('Network.setBlockedURLs', {'urls': list(patterns)})
+
+
+class ResourceBlocker:
+    """Блокировка групп ресурсов по шаблонам и замер их доли на странице"""
+
+    def __init__(self, groups: Optional[Dict[str, Tuple[str, ...]]] = None, measure: bool = False):
+        # groups — {название группы: шаблоны}; measure — не блокировать, а считать экономию
+        self.groups = dict(DEFAULT_BLOCKLIST if groups is None else groups)
+        self.measure = measure
+        self._matchers = [(group, pattern_regex(pattern))
+                          for group, patterns in self.groups.items() for pattern in patterns]
+        self._lock = threading.Lock()
+        # id браузера -> {requestId: адрес} и счётчики текущей страницы
+        self._requests: Dict[int, Dict[str, str]] = {}
+        self._current: Dict[int, Counter] = {}
+        self.pages = 0
+        self.load_time = 0.0
+        self.totals = Counter()
+
+    @property
+    def patterns(self) -> List[str]:
+        return [pattern for patterns in self.groups.values() for pattern in patterns]
+
+    def apply(self, driver):
+        """Включает блокировку (или замер) в только что запущенном браузере"""
+        if self.measure:
+            driver.execute_cdp_cmd('Network.enable', {})
+            with self._lock:
+                self._requests[id(driver)] = {}
+                self._current[id(driver)] = Counter()
+            add_event_listener(driver, lambda events: self._on_events(id(driver), events))
+        elif self.groups:
+            block_urls(driver, self.patterns)
+
+    def release(self, driver):
+        """Забывает браузер (перед закрытием)"""
+        if self.measure:
+            remove_event_listeners(driver)
+            with self._lock:
+                self._requests.pop(id(driver), None)
+                self._current.pop(id(driver), None)
+
+    def group_of(self, url: str) -> Optional[str]:
+        return next((group for group, regex in self._matchers if regex.fullmatch(url)), None)
+
+    def _on_events(self, key: int, events: List[dict]):
+        with self._lock:
+            requests, current = self._requests.get(key), self._current.get(key)
+            if requests is None:
+                return
+            for event in events:
+                method, params = event.get('method'), event.get('params', {})
+                if method == 'Network.requestWillBeSent':
+                    requests[params['requestId']] = params['request']['url']
+                elif method == 'Network.loadingFinished' and params['requestId'] in requests:
+                    url = requests.pop(params['requestId'])
+                    size = int(params.get('encodedDataLength', 0))
+                    current['requests'] += 1
+                    current['bytes'] += size
+                    group = self.group_of(url)
+                    if group is not None:
+                        current[f'requests:{group}'] += 1
+                        current[f'bytes:{group}'] += size
+
+    @contextmanager
+    def page(self, driver):
+        """Загрузка одной страницы: время и (в режиме замера) её запросы"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - started
+            if self.measure:
+                try:
+                    performance_events(driver)
+                except Exception:
+                    # Браузер упал — страница учитывается только по времени
+                    pass
+            with self._lock:
+                self.pages += 1
+                self.load_time += elapsed
+                current = self._current.get(id(driver))
+                if current is not None:
+                    self.totals.update(current)
+                    current.clear()
+
+    def summary(self) -> str:
+        with self._lock:
+            pages = max(self.pages, 1)
+            text = f"страниц: {self.pages}, загрузка в среднем {self.load_time / pages:.2f} с"
+            if not self.measure:
+                return text + f", блокируется групп: {len(self.groups)}"
+            requests, size = self.totals['requests'], self.totals['bytes']
+            saved_requests = sum(self.totals[f'requests:{group}'] for group in self.groups)
+            saved_bytes = sum(self.totals[f'bytes:{group}'] for group in self.groups)
+            text += (f"; на страницу: запросов {requests / pages:.0f}, из них под блокировку "
+                     f"{saved_requests / pages:.0f} ({saved_requests / max(requests, 1):.0%}); "
+                     f"{size / pages / 1024:.0f} КБ, из них под блокировку {saved_bytes / pages / 1024:.0f} КБ "
+                     f"({saved_bytes / max(size, 1):.0%})")
+            groups = ', '.join(f"{group} {self.totals[f'requests:{group}'] / pages:.0f} зап. / "
+                               f"{self.totals[f'bytes:{group}'] / pages / 1024:.0f} КБ"
+                               for group in self.groups if self.totals[f'requests:{group}'])
+            return text + (f"; по группам: {groups}" if groups else '')
+
+    def print_summary(self):
+        if self.pages:
+            print(f"⚙ Ресурсы страниц ({'замер' if self.measure else 'блокировка'}): {self.summary()}")
@@ -0,0 +1,94 @@
+"""
+Повтор временных ошибок загрузки прямо в слое запросов
+
+Таймаут, обрыв соединения, 429 и 5xx повторяются сразу, с экспоненциальной
+паузой и случайным разбросом (full jitter: пауза равномерно от 0 до
+base_delay * 2**попытка, но не больше max_delay), чтобы повторы разных
+воркеров не били в сайт одновременно. Для 429 учитывается Retry-After.
+Ограничения: не больше max_attempts попыток на URL и не больше run_budget
+повторов за запуск — если сайт лежит, запуск не превращается в бесконечные
+повторы, а URL уходят в журнал неудач (failures.py) к повторному проходу.
+
+    RETRY = RetryPolicy(max_attempts=4, base_delay=1.0, max_delay=30.0, run_budget=2000)
+    html = await RETRY.run(fetch_once, session, url, label=url)
+"""
+import asyncio
+import random
+from typing import Awaitable, Callable, Optional
+
+from scraper_core.failures import NETWORK, TIMEOUT, classify_error
+
+
+def is_transient(error: BaseException) -> bool:
+    """Имеет ли смысл повторить запрос сразу: таймаут, сеть, 429, 5xx"""
+    status = getattr(error, 'status', None)
+    if isinstance(status, int):
+        return status == 429 or status >= 500
+    return classify_error(error) in (TIMEOUT, NETWORK)
+
+
+def retry_after(error: BaseException) -> Optional[float]:
+    """Пауза из заголовка Retry-After (в секундах), если сайт её указал"""
+    headers = getattr(error, 'headers', None) or {}
+    try:
+        return float(headers.get('Retry-After'))
+    except (TypeError, ValueError):
+        return None
+
+
+class RetryPolicy:
+    """Сколько раз и с какими паузами повторять временные ошибки"""
+
+    def __init__(self, max_attempts: int = 4, base_delay: float = 1.0, max_delay: float = 30.0,
+                 run_budget: Optional[int] = 2000):
+        # max_attempts — попыток на URL всего (1 — без повторов),
+        # run_budget — повторов за запуск на все URL (None — без ограничения)
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.run_budget = run_budget
+        self.retries = 0
+        self.recovered = 0
+        self._budget_warned = False
+
+    def budget_left(self) -> bool:
+        return self.run_budget is None or self.retries < self.run_budget
+
+    def next_delay(self, error: BaseException, attempt: int) -> Optional[float]:
+        """Пауза перед следующей попыткой (attempt — номер неудачной, с 1) или None — не повторять"""
+        if attempt >= self.max_attempts or not is_transient(error):
+            return None
+        if not self.budget_left():
+            if not self._budget_warned:
+                self._budget_warned = True
+                print(f"⚠ Лимит повторов за запуск исчерпан ({self.run_budget}), "
+                      f"дальше ошибки сразу уходят в журнал неудач")
+            return None
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+        server_delay = retry_after(error)
+        if server_delay is not None:
+            delay = max(delay, min(server_delay, self.max_delay))
+        return delay
+
+    async def run(self, func: Callable[..., Awaitable], *args, label: str = ''):
+        """Вызывает func(*args), повторяя временные ошибки; последняя ошибка пробрасывается"""
+        attempt = 0
+        while True:
+            attempt += 1
+            try:
+                result = await func(*args)
+            except Exception as e:
+                delay = self.next_delay(e, attempt)
+                if delay is None:
+                    raise
+                self.retries += 1
+                print(f"↻ Повтор {attempt}/{self.max_attempts - 1} через {delay:.1f} с "
+                      f"({classify_error(e)}): {label}")
+                await asyncio.sleep(delay)
+                continue
+            if attempt > 1:
+                self.recovered += 1
+            return result
+
+    def summary(self) -> str:
+        return f"повторов: {self.retries}, успешных после повтора: {self.recovered}"
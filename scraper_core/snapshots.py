@@ -0,0 +1,141 @@
+"""
+Снимки (snapshots) данных парсера с ротацией поколений
+
+Снимок журнального хранилища почти ничего не стоит: итоговый JSON
+заменяется только атомарно (новый файл + os.replace), а журнал .jsonl
+только дописывается, поэтому в снимок кладутся жёсткие ссылки на оба файла
+и длина журнала в байтах на момент снимка. Поколения, сделанные между
+сжатиями журнала, разделяют одни и те же файлы на диске.
+Если файловая система не поддерживает жёсткие ссылки, файлы копируются.
+
+    LeroyMerlin/snapshots/data_02.2026_Tiles_LemanaPRO/
+        20260214-103000-000000/
+            data_02.2026_Tiles_LemanaPRO.json
+            data_02.2026_Tiles_LemanaPRO.jsonl
+            manifest.json       — время, число карточек, длина файлов
+
+Хранятся последние N снимков. Восстановление (парсер должен быть остановлен):
+
+    python -m scraper_core snapshots LeroyMerlin/data_02.2026_Tiles_LemanaPRO.json
+    python -m scraper_core restore LeroyMerlin/data_02.2026_Tiles_LemanaPRO.json [имя снимка]
+"""
+import json
+import os
+import shutil
+from datetime import datetime
+from typing import Dict, List, Optional
+
+DEFAULT_KEEP = 5
+MANIFEST = 'manifest.json'
+
+
+def snapshot_root_for(path: str) -> str:
+    """Каталог снимков файла: <папка магазина>/snapshots/<имя файла без расширения>"""
+    root, _ = os.path.splitext(path)
+    return os.path.join(os.path.dirname(path), 'snapshots', os.path.basename(root))
+
+
+def _link_or_copy(src: str, dst: str):
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copy2(src, dst)
+
+
+def new_snapshot_dir(root: str) -> str:
+    """Создаёт временный каталог для нового снимка (фиксируется в commit_snapshot)"""
+    name = datetime.now().strftime('%Y%m%d-%H%M%S-%f')
+    path = os.path.join(root, name + '.tmp')
+    os.makedirs(path)
+    return path
+
+
+def commit_snapshot(tmp_dir: str, manifest: dict, keep: int = DEFAULT_KEEP) -> str:
+    """Записывает manifest.json, делает снимок видимым и удаляет старые поколения"""
+    manifest = {'created': datetime.now().isoformat(timespec='seconds'), **manifest}
+    with open(os.path.join(tmp_dir, MANIFEST), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=4, ensure_ascii=False)
+    final_dir = tmp_dir[:-len('.tmp')]
+    os.rename(tmp_dir, final_dir)
+    prune_snapshots(os.path.dirname(final_dir), keep)
+    return final_dir
+
+
+def snapshot_files(root: str, files: Dict[str, Optional[int]], manifest: dict,
+                   keep: int = DEFAULT_KEEP) -> str:
+    """Снимок набора файлов: {путь: сколько байт считать частью снимка (None — весь файл)}"""
+    tmp_dir = new_snapshot_dir(root)
+    try:
+        entries = {}
+        for path, size in files.items():
+            name = os.path.basename(path)
+            if not os.path.exists(path):
+                # Файла не было — при восстановлении его нужно удалить
+                entries[name] = None
+                continue
+            _link_or_copy(path, os.path.join(tmp_dir, name))
+            entries[name] = os.path.getsize(path) if size is None else size
+        return commit_snapshot(tmp_dir, {**manifest, 'files': entries}, keep)
+    except Exception:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+
+
+def list_snapshots(root: str) -> List[dict]:
+    """Снимки от старых к новым: manifest + имя и путь каталога"""
+    if not os.path.isdir(root):
+        return []
+    snapshots = []
+    for name in sorted(os.listdir(root)):
+        path = os.path.join(root, name)
+        manifest_path = os.path.join(path, MANIFEST)
+        if name.endswith('.tmp') or not os.path.exists(manifest_path):
+            continue
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+        snapshots.append({**manifest, 'name': name, 'path': path})
+    return snapshots
+
+
+def prune_snapshots(root: str, keep: int):
+    """Оставляет keep последних снимков, удаляет незавершённые"""
+    for name in os.listdir(root):
+        if name.endswith('.tmp'):
+            shutil.rmtree(os.path.join(root, name), ignore_errors=True)
+    for snapshot in list_snapshots(root)[:-keep or None]:
+        shutil.rmtree(snapshot['path'], ignore_errors=True)
+
+
+def find_snapshot(root: str, name: Optional[str] = None) -> dict:
+    """Снимок по имени (по умолчанию — последний)"""
+    snapshots = list_snapshots(root)
+    if not snapshots:
+        raise FileNotFoundError(f"Снимков нет: {root}")
+    if name is None:
+        return snapshots[-1]
+    for snapshot in snapshots:
+        if snapshot['name'] == name:
+            return snapshot
+    raise FileNotFoundError(f"Снимок {name} не найден в {root}")
+
+
+def restore_files(snapshot: dict, target_dir: str):
+    """Возвращает файлы снимка в target_dir (каждый — атомарно, обрезая до длины в снимке)"""
+    for name, size in snapshot['files'].items():
+        target = os.path.join(target_dir, name)
+        if size is None:
+            if os.path.exists(target):
+                os.remove(target)
+            continue
+        temp_file = target + '.tmp'
+        with open(os.path.join(snapshot['path'], name), 'rb') as src, open(temp_file, 'wb') as dst:
+            remaining = size
+            while remaining > 0:
+                chunk = src.read(min(remaining, 1 << 20))
+                if not chunk:
+                    break
+                dst.write(chunk)
+                remaining -= len(chunk)
+            dst.flush()
+            os.fsync(dst.fileno())
+        os.replace(temp_file, target)
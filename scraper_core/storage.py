@@ -0,0 +1,243 @@
+"""
+Хранилища карточек парсеров: журнал JSONL или база SQLite в режиме WAL
+
+Оба хранилища имеют одинаковый набор методов, поэтому скрипт магазина
+выбирает бэкенд одной константой STORAGE_BACKEND:
+
+    'journal' — итоговый JSON + append-only журнал (см. journal.py)
+    'sqlite'  — одна база на магазин (например, LeroyMerlin/LemanaPRO.sqlite3),
+                ключ карточки — (файл данных, URL, дата мониторинга)
+
+Для SQLite проверка «URL уже обработан?» — запрос по индексу, без загрузки
+карточек в память; читать базу можно параллельно с работающим парсером.
+Итоговый data_MM.YYYY_*.json для Main_scraping_Russia.py выгружается
+в конце прохода (finalize) или вручную:
+
+    python -m scraper_core export LeroyMerlin/LemanaPRO.sqlite3 LeroyMerlin/data_02.2026_Tiles_LemanaPRO.json
+"""
+import contextlib
+import hashlib
+import json
+import os
+import shutil
+import sqlite3
+import threading
+from typing import List, Optional
+
+from scraper_core.durability import DurabilityPolicy, GroupCommitWriter
+from scraper_core.journal import CardJournal, write_json_atomic
+from scraper_core.snapshots import (DEFAULT_KEEP, commit_snapshot, find_snapshot, new_snapshot_dir,
+                                    restore_files, snapshot_root_for)
+
+STORAGE_BACKENDS = ('journal', 'sqlite')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS cards (
+    seq     INTEGER PRIMARY KEY AUTOINCREMENT,
+    dataset TEXT NOT NULL,
+    url     TEXT NOT NULL,
+    date    TEXT NOT NULL,
+    card    TEXT NOT NULL,
+    UNIQUE (dataset, url, date)
+);
+"""
+
+UPSERT_SQL = """
+INSERT INTO cards (dataset, url, date, card) VALUES (?, ?, ?, ?)
+ON CONFLICT (dataset, url, date) DO UPDATE SET card = excluded.card
+"""
+
+# Ключ карточки без ссылки: хеш её содержимого, иначе все такие карточки одной даты
+# заменяли бы друг друга. Не URL — в processed_urls не попадает
+NO_URL_PREFIX = 'без ссылки:'
+
+
+def dataset_name(file_path: str) -> str:
+    """Имя набора данных в базе: data_02.2026_Tiles_LemanaPRO.json -> data_02.2026_Tiles_LemanaPRO"""
+    return os.path.splitext(os.path.basename(file_path))[0]
+
+
+class SqliteStorage:
+    """Карточки одного файла данных в общей базе магазина"""
+
+    def __init__(self, db_path: str, file_path: str, policy: Optional[DurabilityPolicy] = None):
+        self.db_path = db_path
+        self.file_path = file_path
+        self.dataset = dataset_name(file_path)
+        self.policy = policy
+        # Хранилище открывается в одном потоке, а карточки может дописывать другой (поток записи
+        # AsyncWriter) — соединение общее для потоков, запросы к нему идут под блокировкой
+        self._conn_lock = threading.RLock()
+        self._conn = self._connect()
+        self._writer = None
+        self._writer_conn = None
+        # Ключи карточек, переданных фоновому потоку, но ещё не записанных в базу
+        self._pending = set()
+        self._pending_lock = threading.Lock()
+        self._count = self._select_count()
+        self._import_json()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, timeout=30, check_same_thread=False)
+        conn.execute('PRAGMA journal_mode=WAL')
+        # FULL — fsync при каждой фиксации, NORMAL — только при checkpoint
+        synchronous = 'FULL' if self.policy is None or self.policy.fsync else 'NORMAL'
+        conn.execute(f'PRAGMA synchronous={synchronous}')
+        conn.executescript(SCHEMA)
+        return conn
+
+    def _query(self, sql: str, params: tuple = ()) -> list:
+        with self._conn_lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    def _select_count(self) -> int:
+        return self._query('SELECT COUNT(*) FROM cards WHERE dataset = ?', (self.dataset,))[0][0]
+
+    def _import_json(self):
+        # Первый запуск на SQLite посреди месяца: переносим уже собранные карточки
+        if self._count:
+            return
+        journal = CardJournal(self.file_path)
+        if not journal.exists():
+            return
+        cards = journal.load()
+        if cards:
+            self._insert(self._conn, cards)
+            # Повторы (URL, дата) в старых данных сливаются в одну строку
+            self._count = self._select_count()
+            print(f"✓ Перенесено в {os.path.basename(self.db_path)}: {self._count} записей")
+
+    @staticmethod
+    def _key(card: dict, body: str) -> tuple:
+        url = card.get('Ссылка')
+        if not url:
+            url = NO_URL_PREFIX + hashlib.blake2b(body.encode('utf-8'), digest_size=8).hexdigest()
+        return url, card.get('Дата мониторинга') or ''
+
+    @classmethod
+    def _rows(cls, dataset: str, cards: List[dict]):
+        for card in cards:
+            body = json.dumps(card, ensure_ascii=False)
+            yield (dataset, *cls._key(card, body), body)
+
+    def _insert(self, conn: sqlite3.Connection, cards: List[dict]):
+        with self._conn_lock if conn is self._conn else contextlib.nullcontext(), conn:
+            conn.executemany(UPSERT_SQL, self._rows(self.dataset, cards))
+
+    def _write(self, cards: List[dict], fsync: bool):
+        # Вызывается из фонового потока: у потока своё соединение с базой
+        if self._writer_conn is None:
+            self._writer_conn = self._connect()
+        self._insert(self._writer_conn, cards)
+        # Строки уже в базе — дальше их видит запрос _stored
+        with self._pending_lock:
+            for card in cards:
+                self._pending.discard(self._key(card, json.dumps(card, ensure_ascii=False)))
+
+    def _stored(self, key: tuple) -> bool:
+        return bool(self._query('SELECT 1 FROM cards WHERE dataset = ? AND url = ? AND date = ?',
+                                (self.dataset, *key)))
+
+    def exists(self) -> bool:
+        return self._count > 0 or os.path.exists(self.file_path)
+
+    def count(self) -> int:
+        return self._count
+
+    def processed_urls(self) -> set:
+        # Карточки в очереди фонового потока тоже обработаны, хотя в базе их ещё нет.
+        # Очередь читается до базы: фоновый поток сначала пишет строку, потом убирает ключ
+        with self._pending_lock:
+            urls = {url for url, _ in self._pending}
+        rows = self._query('SELECT DISTINCT url FROM cards WHERE dataset = ?', (self.dataset,))
+        urls.update(url for (url,) in rows)
+        return {url for url in urls if url and not url.startswith(NO_URL_PREFIX)}
+
+    def is_processed(self, url: str) -> bool:
+        with self._pending_lock:
+            if any(key[0] == url for key in self._pending):
+                return True
+        return bool(self._query('SELECT 1 FROM cards WHERE dataset = ? AND url = ? LIMIT 1', (self.dataset, url)))
+
+    def append(self, card: dict):
+        # Карточка с тем же (URL, дата) заменяет прежнюю и число записей не меняет.
+        # Очередь проверяется до базы: фоновый поток сначала пишет строку, потом убирает ключ
+        key = self._key(card, json.dumps(card, ensure_ascii=False))
+        with self._pending_lock:
+            queued = key in self._pending
+        if not queued and not self._stored(key):
+            self._count += 1
+        if self.policy is None:
+            self._insert(self._conn, [card])
+            return
+        with self._pending_lock:
+            self._pending.add(key)
+        if self._writer is None:
+            self._writer = GroupCommitWriter(self._write, self.policy, name='sqlite-writer',
+                                             on_stop=self._close_writer_conn)
+        self._writer.submit(card)
+
+    def load(self) -> List[dict]:
+        """Все карточки набора в порядке добавления"""
+        self._drain()
+        rows = self._query('SELECT card FROM cards WHERE dataset = ? ORDER BY seq', (self.dataset,))
+        return [json.loads(card) for (card,) in rows]
+
+    def _close_writer_conn(self):
+        if self._writer_conn is not None:
+            self._writer_conn.close()
+            self._writer_conn = None
+
+    def _drain(self):
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+    def finalize(self) -> int:
+        """Выгружает набор в итоговый data_MM.YYYY_*.json"""
+        data = self.load()
+        write_json_atomic(data, self.file_path)
+        return len(data)
+
+    def snapshot(self, keep: int = DEFAULT_KEEP) -> str:
+        """Снимок базы магазина через backup API SQLite. Возвращает путь снимка"""
+        self._drain()
+        tmp_dir = new_snapshot_dir(snapshot_root_for(self.db_path))
+        try:
+            name = os.path.basename(self.db_path)
+            backup = sqlite3.connect(os.path.join(tmp_dir, name))
+            with self._conn_lock:
+                self._conn.backup(backup)
+            backup.close()
+            size = os.path.getsize(os.path.join(tmp_dir, name))
+            return commit_snapshot(tmp_dir, {'backend': 'sqlite', 'dataset': self.dataset,
+                                             'cards': self._count, 'files': {name: size}}, keep)
+        except Exception:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            raise
+
+    def close(self):
+        self._drain()
+
+
+def restore_sqlite(db_path: str, name: Optional[str] = None) -> dict:
+    """Восстанавливает базу магазина из снимка (парсер должен быть остановлен)"""
+    snapshot = find_snapshot(snapshot_root_for(db_path), name)
+    # Старые WAL-файлы иначе были бы применены поверх восстановленной базы
+    for suffix in ('-wal', '-shm'):
+        if os.path.exists(db_path + suffix):
+            os.remove(db_path + suffix)
+    restore_files(snapshot, os.path.dirname(os.path.abspath(db_path)))
+    return snapshot
+
+
+def open_storage(file_path: str, backend: str = 'journal', db_path: Optional[str] = None,
+                 policy: Optional[DurabilityPolicy] = None):
+    """Открывает хранилище карточек для файла данных data_MM.YYYY_*.json"""
+    if backend == 'journal':
+        return CardJournal(file_path, policy=policy)
+    if backend == 'sqlite':
+        if db_path is None:
+            raise ValueError("Для бэкенда 'sqlite' нужно указать db_path")
+        return SqliteStorage(db_path, file_path, policy=policy)
+    raise ValueError(f"Неизвестный бэкенд хранилища: {backend} (доступны: {', '.join(STORAGE_BACKENDS)})")
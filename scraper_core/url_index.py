@@ -0,0 +1,146 @@
+"""
+Компактный индекс обработанных URL (файл data_MM.YYYY_*.urls.idx рядом с данными)
+
+Вместо разбора всего JSON месяца (десятки МБ) при старте парсер читает
+индекс: по 8 байт (хеш blake2b от URL) на каждую сохранённую карточку.
+Формат файла:
+
+    8 байт  — сигнатура URLIDX01
+    8 байт  — число хешей в отсортированной части (little-endian)
+    N * 8   — отсортированные хеши, затем хеши, дописанные после последней
+              пересборки индекса (в порядке добавления)
+
+Проверка «URL уже обработан?» — бинарный поиск по отсортированной части
+плюс множество для хвоста; загрузка индекса на 20 тыс. карточек — миллисекунды.
+"""
+import hashlib
+import os
+import struct
+from array import array
+from bisect import bisect_left
+from typing import Iterable
+
+MAGIC = b'URLIDX01'
+HEADER = struct.Struct('<8sQ')
+
+
+def index_path_for(file_path: str) -> str:
+    """Путь к индексу для итогового JSON: data_X.json -> data_X.urls.idx"""
+    root, _ = os.path.splitext(file_path)
+    return root + '.urls.idx'
+
+
+def url_hash(url: str) -> int:
+    return int.from_bytes(hashlib.blake2b(url.encode('utf-8'), digest_size=8).digest(), 'little')
+
+
+def _hash_array(values: Iterable[int] = ()) -> array:
+    # 'Q' — беззнаковое 8-байтное целое
+    arr = array('Q', values)
+    if arr.itemsize != 8:
+        raise RuntimeError("array('Q') на этой платформе не 8-байтный")
+    return arr
+
+
+def url_hashes(urls: Iterable[str]) -> array:
+    """Хеши URL карточек (0 — карточка без ссылки)"""
+    return _hash_array(url_hash(url) if url else 0 for url in urls)
+
+
+class ProcessedUrlIndex:
+    """Индекс обработанных URL: поддерживает `url in index` и len(index)"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._sorted = _hash_array()
+        self._tail = set()
+        self.records = 0      # Всего записей (карточек) в индексе, включая повторы URL
+        self._distinct = 0
+        self._file = None
+        if os.path.exists(path):
+            self._load()
+
+    def _load(self):
+        with open(self.path, 'rb') as f:
+            raw = f.read()
+        if len(raw) < HEADER.size:
+            raise ValueError(f"Повреждён индекс {self.path}")
+        magic, sorted_count = HEADER.unpack_from(raw)
+        if magic != MAGIC:
+            raise ValueError(f"Неизвестный формат индекса {self.path}")
+        body = raw[HEADER.size:]
+        # Недописанный хвост после сбоя отбрасываем
+        body = body[:len(body) - len(body) % 8]
+        hashes = _hash_array()
+        hashes.frombytes(body)
+        self._sorted = hashes[:sorted_count]
+        self._tail = set(hashes[sorted_count:])
+        self.records = len(hashes)
+        self._distinct = len(set(self._sorted) | self._tail)
+
+    def _contains_hash(self, h: int) -> bool:
+        if h in self._tail:
+            return True
+        i = bisect_left(self._sorted, h)
+        return i < len(self._sorted) and self._sorted[i] == h
+
+    def __contains__(self, url) -> bool:
+        return bool(url) and self._contains_hash(url_hash(url))
+
+    def __len__(self) -> int:
+        """Число различных URL"""
+        return self._distinct
+
+    def add_many(self, urls: Iterable[str]):
+        """Добавляет URL в индекс и дописывает их хеши в конец файла (по одному на карточку)"""
+        hashes = url_hashes(urls)
+        self.remember(hashes)
+        self.write(hashes)
+
+    def remember(self, hashes: array):
+        """Добавляет хеши в индекс в памяти; в файл их дописывает write()"""
+        for h in hashes:
+            if h and not self._contains_hash(h):
+                self._distinct += 1
+            self._tail.add(h)
+        self.records += len(hashes)
+
+    def write(self, hashes: array):
+        """Дописывает хеши, уже добавленные remember(), в конец файла индекса"""
+        if not hashes:
+            return
+        if self._file is None:
+            if not os.path.exists(self.path):
+                self._write_full(self._sorted)
+            self._file = open(self.path, 'ab')
+            # Отрезаем недописанный хеш, если прошлый запуск упал посреди записи
+            size = self._file.tell()
+            extra = (size - HEADER.size) % 8
+            if extra:
+                self._file.truncate(size - extra)
+        self._file.write(hashes.tobytes())
+        self._file.flush()
+
+    def rebuild(self, urls: Iterable[str]):
+        """Полностью пересоздаёт индекс по списку URL карточек"""
+        self.close()
+        hashes = sorted(url_hash(url) if url else 0 for url in urls)
+        self._sorted = _hash_array(hashes)
+        self._tail = set()
+        self.records = len(hashes)
+        self._distinct = len({h for h in hashes if h})
+        self._write_full(self._sorted)
+
+    def _write_full(self, hashes: array):
+        temp_file = self.path + '.tmp'
+        with open(temp_file, 'wb') as f:
+            f.write(HEADER.pack(MAGIC, len(hashes)))
+            f.write(hashes.tobytes())
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_file, self.path)
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
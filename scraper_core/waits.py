@@ -0,0 +1,147 @@
+"""
+Ожидания по условиям для парсеров на Selenium вместо фиксированных пауз
+
+Вместо time.sleep(2) после загрузки страницы парсер ждёт конкретного
+события — появился блок цены, отрисовались строки окна складов, затихла
+сеть — и продолжает сразу, как только оно наступило. Быстрая страница не
+ждёт лишних секунд, медленная получает время до таймаута. Таймауты задаются
+по имени ожидания для каждого магазина, а фактическое время каждого
+ожидания записывается (summary — среднее, максимум, число таймаутов):
+
+    WAITS = Waits({'product': 15, 'stock': 10}, default=10)
+    WAITS.until(driver, 'product', present(NAME, PRICE))         # TimeoutException по истечении
+    rows = WAITS.until(driver, 'stock', rendered(STORE_ROW))
+    WAITS.until(driver, 'clicks', network_idle(), required=False)  # None по истечении
+
+Условия принимают XPath-строки или селекторы модулей разбора магазина
+(select(...) из scraper_core/extract.py): ждём те же узлы, которые потом
+разбираем. Waits можно использовать из нескольких потоков (пул браузеров).
+"""
+import threading
+import time
+from typing import Callable, Dict, Optional
+
+from selenium.common.exceptions import TimeoutException
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support.ui import WebDriverWait
+
+# Число загруженных ресурсов страницы (запросы fetch/XHR, скрипты, стили) и готовность документа
+_NETWORK_STATE = ("return [document.readyState, "
+                  "performance.getEntriesByType('resource').length];")
+
+
+def browser_xpath(selector) -> str:
+    """XPath для браузера: строка или селектор select(...) (относительный .// — от корня документа)"""
+    path = getattr(selector, 'path', selector)
+    return path[1:] if path.startswith('.//') else path
+
+
+def present(*selectors) -> Callable:
+    """Есть хотя бы один из элементов; результат — первый найденный"""
+    xpaths = [browser_xpath(selector) for selector in selectors]
+
+    def condition(driver):
+        for xpath in xpaths:
+            found = driver.find_elements(By.XPATH, xpath)
+            if found:
+                return found[0]
+        return False
+    return condition
+
+
+def rendered(selector, min_count: int = 1, stable: float = 0.3) -> Callable:
+    """Не меньше min_count элементов, и их число не менялось stable секунд; результат — элементы"""
+    xpath = browser_xpath(selector)
+    state = {'count': -1, 'since': 0.0}
+
+    def condition(driver):
+        found = driver.find_elements(By.XPATH, xpath)
+        now = time.monotonic()
+        if len(found) != state['count']:
+            state['count'], state['since'] = len(found), now
+            return False
+        return found if len(found) >= min_count and now - state['since'] >= stable else False
+    return condition
+
+
+def all_of(*conditions: Callable) -> Callable:
+    """Выполнены все условия (проверяются по порядку); результат — последнего"""
+    def condition(driver):
+        result = False
+        for check in conditions:
+            result = check(driver)
+            if not result:
+                return False
+        return result
+    return condition
+
+
+def document_ready() -> Callable:
+    """Документ и его ресурсы загружены (document.readyState == 'complete')"""
+    def condition(driver):
+        return driver.execute_script('return document.readyState') == 'complete'
+    return condition
+
+
+def network_idle(quiet: float = 0.5) -> Callable:
+    """Документ загружен и quiet секунд не начиналось новых запросов (XHR, скрипты, картинки)"""
+    state = {'resources': -1, 'since': 0.0}
+
+    def condition(driver):
+        ready, resources = driver.execute_script(_NETWORK_STATE)
+        now = time.monotonic()
+        if ready != 'complete' or resources != state['resources']:
+            state['resources'], state['since'] = resources, now
+            return False
+        return now - state['since'] >= quiet
+    return condition
+
+
+class Waits:
+    """Ожидания магазина: таймауты по имени ожидания и статистика фактического времени"""
+
+    def __init__(self, timeouts: Optional[Dict[str, float]] = None, default: float = 10.0,
+                 poll: float = 0.1):
+        # timeouts — {имя ожидания: секунд}, default — для остальных; poll — частота проверки
+        self.timeouts = dict(timeouts or {})
+        self.default = default
+        self.poll = poll
+        self._lock = threading.Lock()
+        # имя -> [число, всего секунд, максимум, таймаутов]
+        self.stats: Dict[str, list] = {}
+
+    def timeout(self, name: str) -> float:
+        return self.timeouts.get(name, self.default)
+
+    def until(self, driver, name: str, condition: Callable, timeout: Optional[float] = None,
+              required: bool = True):
+        """Ждёт condition(driver); результат условия. По таймауту — TimeoutException или None"""
+        timeout = timeout if timeout is not None else self.timeout(name)
+        started = time.monotonic()
+        try:
+            result = WebDriverWait(driver, timeout, poll_frequency=self.poll).until(condition)
+        except TimeoutException:
+            self._record(name, time.monotonic() - started, timed_out=True)
+            if required:
+                raise TimeoutException(f"Не дождались: {name} ({timeout:g} с)")
+            return None
+        self._record(name, time.monotonic() - started)
+        return result
+
+    def _record(self, name: str, elapsed: float, timed_out: bool = False):
+        with self._lock:
+            stat = self.stats.setdefault(name, [0, 0.0, 0.0, 0])
+            stat[0] += 1
+            stat[1] += elapsed
+            stat[2] = max(stat[2], elapsed)
+            stat[3] += timed_out
+
+    def summary(self) -> str:
+        with self._lock:
+            return '; '.join(f"{name}: {count} раз, в среднем {total / count:.2f} с, макс. {peak:.2f} с, "
+                             f"таймаутов {timeouts}"
+                             for name, (count, total, peak, timeouts) in self.stats.items())
+
+    def print_summary(self):
+        if self.stats:
+            print(f"⚙ Ожидания: {self.summary()}")
@@ -0,0 +1,122 @@
+"""
+Ограниченная очередь задач с фиксированным пулом воркеров для asyncio
+
+Вместо asyncio.gather по корутине на каждый URL (десятки тысяч ожидающих задач
+и все загруженные страницы в памяти разом) задачи идут через asyncio.Queue
+ограниченного размера, а обрабатывают их workers воркеров. Источник задач
+(например, генератор по файлу URL) читается по мере освобождения места в
+очереди, поэтому память не зависит от размера каталога:
+
+    queue = WorkQueue(handle_url, workers=6)
+    await queue.run(urls)
+
+Во время обхода обработчик может добавить новые задачи через queue.add(url) —
+воркер при этом не блокируется, даже если очередь заполнена.
+
+Если задачи появляются постепенно из другого источника (например, ссылки на
+товары по мере разбора страниц каталога), воркеры запускаются контекстом, а
+задачи подаются через put; при выходе из блока очередь дорабатывается до конца:
+
+    async with WorkQueue(handle_url, workers=6) as queue:
+        async for url in discover():
+            await queue.put(url)
+"""
+import asyncio
+from collections import deque
+from typing import Awaitable, Callable, Hashable, Iterable, Optional
+
+
+class WorkQueue:
+    """Очередь задач: handler(item) вызывается не более чем в workers задачах одновременно"""
+
+    def __init__(self, handler: Callable[[object], Awaitable], workers: int,
+                 maxsize: Optional[int] = None, dedup: bool = False):
+        self.handler = handler
+        self.workers = workers
+        self._queue = asyncio.Queue(maxsize or workers * 2)
+        # Задачи, добавленные при заполненной очереди (см. add)
+        self._added = deque()
+        # Ключи уже поставленных задач (если dedup=True)
+        self._seen = set() if dedup else None
+        self._tasks = []
+        self.done = 0
+
+    def _is_new(self, item) -> bool:
+        if self._seen is None:
+            return True
+        key = item if isinstance(item, Hashable) else id(item)
+        if key in self._seen:
+            return False
+        self._seen.add(key)
+        return True
+
+    def _refill(self):
+        while self._added and not self._queue.full():
+            self._queue.put_nowait(self._added.popleft())
+
+    async def put(self, item) -> bool:
+        """Ставит задачу в очередь, ожидая свободного места. False — задача уже была"""
+        if not self._is_new(item):
+            return False
+        await self._queue.put(item)
+        return True
+
+    def add(self, item) -> bool:
+        """Добавляет задачу во время обхода, не ожидая места в очереди. False — задача уже была"""
+        if not self._is_new(item):
+            return False
+        self._added.append(item)
+        self._refill()
+        return True
+
+    def pending(self) -> int:
+        """Задач в очереди, ещё не взятых воркерами"""
+        return self._queue.qsize() + len(self._added)
+
+    async def _worker(self):
+        while True:
+            item = await self._queue.get()
+            try:
+                await self.handler(item)
+            except Exception as e:
+                # Обработчики сами учитывают свои ошибки; сюда попадает только непредвиденное
+                print(f"✗ Ошибка обработки задачи {item}: {str(e)[:100]}")
+            finally:
+                self.done += 1
+                # Сначала переносим добавленные задачи, потом отмечаем выполнение,
+                # иначе join() может завершиться при непустом _added
+                self._refill()
+                self._queue.task_done()
+
+    def start(self):
+        """Запускает воркеры (задачи затем подаются через put/add)"""
+        if not self._tasks:
+            self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def join(self):
+        """Ждёт, пока все поставленные задачи не будут обработаны"""
+        await self._queue.join()
+
+    async def stop(self):
+        """Останавливает воркеры (необработанные задачи отбрасываются)"""
+        tasks, self._tasks = self._tasks, []
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def __aenter__(self):
+        self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        try:
+            if exc_type is None:
+                await self.join()
+        finally:
+            await self.stop()
+
+    async def run(self, items: Iterable = ()):
+        """Запускает воркеры, подаёт задачи из items и ждёт, пока очередь не опустеет"""
+        async with self:
+            for item in items:
+                await self.put(item)
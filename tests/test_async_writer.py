@@ -0,0 +1,64 @@
+"""
+Запись карточек через AsyncWriter в хранилища (журнал и SQLite)
+
+Хранилище открывается в потоке цикла asyncio, а карточки дописывает поток
+записи AsyncWriter; число карточек и итоговый JSON должны сходиться.
+"""
+import asyncio
+import json
+import os
+import sys
+
+import pytest
+
+# Общие модули (scraper_core) лежат в корне репозитория
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from scraper_core.async_writer import AsyncWriter
+from scraper_core.durability import DurabilityPolicy
+from scraper_core.storage import open_storage
+
+CARDS = [{'Ссылка': f'https://example.ru/product/{i}/', 'Дата мониторинга': '01.02.2026', 'Цена': i}
+         for i in range(250)]
+
+
+def open_test_storage(tmp_path, backend, policy):
+    return open_storage(str(tmp_path / 'data_02.2026_Tiles_test.json'), backend,
+                        db_path=str(tmp_path / 'test.sqlite3'), policy=policy)
+
+
+async def write_cards(storage, cards):
+    async with AsyncWriter(maxsize=10) as writer:
+        for card in cards:
+            await writer.submit(storage.append, card)
+            # Воркеры загрузки отдают управление между карточками — пачки получаются разными
+            await asyncio.sleep(0)
+
+
+@pytest.mark.parametrize('backend', ['sqlite', 'journal'])
+@pytest.mark.parametrize('policy', [None, DurabilityPolicy(every_records=7, fsync=False)])
+def test_cards_written_through_async_writer(tmp_path, backend, policy):
+    storage = open_test_storage(tmp_path, backend, policy)
+    asyncio.run(write_cards(storage, CARDS))
+
+    assert storage.count() == len(CARDS)
+    assert all(storage.is_processed(card['Ссылка']) for card in CARDS)
+    assert storage.finalize() == len(CARDS)
+    storage.close()
+
+    with open(tmp_path / 'data_02.2026_Tiles_test.json', encoding='utf-8') as f:
+        assert json.load(f) == CARDS
+
+
+@pytest.mark.parametrize('backend', ['sqlite', 'journal'])
+def test_queued_cards_are_processed(tmp_path, backend):
+    # Пачка из 1000 карточек не наберётся — все карточки остаются в очереди фонового потока
+    storage = open_test_storage(tmp_path, backend, DurabilityPolicy(every_records=1000, fsync=False))
+    for card in CARDS[:3]:
+        storage.append(card)
+
+    assert storage.count() == 3
+    assert storage.is_processed(CARDS[0]['Ссылка'])
+    assert not storage.is_processed(CARDS[3]['Ссылка'])
+    processed = storage.processed_urls()
+    assert all(card['Ссылка'] in processed for card in CARDS[:3])
+    storage.close()
@@ -0,0 +1,65 @@
+"""
+Гибридный режим Petrovich: разбор и запись карточек в потоке записи AsyncWriter
+
+Загрузка подменена: проверяется, что карточки и неудачи, которые save()
+записывает из потока записи, доходят до хранилища SQLite и журнала неудач.
+"""
+import asyncio
+import contextlib
+import os
+import sys
+
+import pytest
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+sys.path.insert(0, os.path.join(REPO_DIR, 'Petrovich'))
+Petrovich = pytest.importorskip('Petrovich')
+
+from scraper_core.durability import DurabilityPolicy
+from scraper_core.failures import FailureLedger
+from scraper_core.storage import open_storage
+
+URLS = [f'https://petrovich.ru/product/{i}/' for i in range(40)]
+BROKEN = {url for i, url in enumerate(URLS) if i % 10 == 9}
+
+
+class FakeHybrid:
+    """HybridFetcher без браузера и сети: страница по URL или ошибка загрузки"""
+
+    def __init__(self, driver, load_in_browser, page_complete, block_limit):
+        pass
+
+    def open_engine(self, *args, **kwargs):
+        return contextlib.nullcontext()
+
+    async def fetch(self, url):
+        await asyncio.sleep(0)
+        if url in BROKEN:
+            raise RuntimeError(f"Ошибка загрузки {url}")
+        return f'<html><body><h1>{url}</h1></body></html>', 'http'
+
+    def print_summary(self):
+        pass
+
+
+def fake_card(tree, url, cur_data, cur_time):
+    return {'Ссылка': url, 'Дата мониторинга': cur_data, 'Время мониторинга': cur_time}
+
+
+@pytest.mark.parametrize('policy', [None, DurabilityPolicy(every_records=5, fsync=False)])
+def test_hybrid_cards_saved_to_sqlite(tmp_path, monkeypatch, policy):
+    monkeypatch.setattr(Petrovich, 'HybridFetcher', FakeHybrid)
+    monkeypatch.setattr(Petrovich, 'parse_product', fake_card)
+    file_path = str(tmp_path / 'data_02.2026_Tiles_Petrovich.json')
+    storage = open_storage(file_path, 'sqlite', db_path=str(tmp_path / 'Petrovich.sqlite3'), policy=policy)
+    failures = FailureLedger(file_path)
+
+    processed = asyncio.run(Petrovich.process_urls_hybrid(None, URLS, storage, failures, file_path))
+
+    assert processed == len(URLS) - len(BROKEN)
+    assert storage.count() == processed
+    assert set(failures.failed_now) == BROKEN
+    assert storage.finalize() == processed
+    storage.close()
+    failures.close()